@@ -0,0 +1,131 @@
+"""
+Agent Configuration
+
+Central place for the XMPP server and agent credentials used by the lab scripts
+and the launcher. Defaults match the accounts created by `register_agents.sh`;
+any of them can be overridden by a JSON file, looked up in this order:
+
+1. the path passed to `load_config`
+2. the path in the DCIT403_AGENT_CONFIG environment variable
+3. `agents.json` in the current working directory
+
+File format:
+
+    {
+        "xmpp_server": "xmpp.jp",
+        "agents": {
+            "sensor": {"password": "sensor123"},
+            "coordinator_comm": {"jid": "coordinator@example.org", "password": "secret"}
+        }
+    }
+
+An agent entry without a "jid" uses its role name as the localpart on
+`xmpp_server`.
+
+Numbered agents of one role (the regional coordinators of Lab 4's
+contract-net mode) default to `<role>_<n>` with the role's password, and
+can be given entries of their own such as "coordinator_comm_2". The
+accounts provision_agents.py creates for a prefix group use the same
+names, so its credentials file supplies those entries.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+
+CONFIG_ENV_VAR = "DCIT403_AGENT_CONFIG"
+DEFAULT_CONFIG_FILE = Path("agents.json")
+DEFAULT_SERVER = "localhost"
+
+# Role name (also the default localpart) -> password
+DEFAULT_PASSWORDS = {
+    "basic_agent": "1234",
+    "sensor": "sensor123",
+    "response_agent": "response123",
+    "sensor_comm": "lab4pass",
+    "response_comm": "lab4pass",
+    "coordinator_comm": "lab4pass",
+}
+
+
+def numbered_name(role: str, index: int) -> str:
+    """Name of the index-th agent of a role (coordinator_comm, 2 -> coordinator_comm_2)"""
+    return f"{role}_{index}"
+
+
+@dataclass
+class AgentCredentials:
+    """JID and password for one agent account"""
+    jid: str
+    password: str
+
+
+class AgentConfig:
+    """
+    Resolved XMPP server and per-role agent credentials
+    """
+
+    def __init__(self, server: str, agents: Dict[str, AgentCredentials], source: Optional[Path] = None):
+        self.server = server
+        self.agents = agents
+        self.source = source
+
+    def credentials(self, role: str) -> AgentCredentials:
+        if role not in self.agents:
+            raise KeyError(f"No credentials configured for agent role '{role}'")
+        return self.agents[role]
+
+    def jid(self, role: str) -> str:
+        return self.credentials(role).jid
+
+    def password(self, role: str) -> str:
+        return self.credentials(role).password
+
+    def regional(self, role: str, index: int) -> AgentCredentials:
+        """
+        Credentials of the index-th agent of a role (e.g. coordinator_comm_2 in
+        contract-net mode): its own entry if configured, otherwise the role's
+        JID with `_<index>` appended to the localpart and the role's password
+        """
+        name = numbered_name(role, index)
+        if name in self.agents:
+            return self.agents[name]
+        base = self.credentials(role)
+        localpart, _, domain = base.jid.partition("@")
+        return AgentCredentials(jid=f"{numbered_name(localpart, index)}@{domain}", password=base.password)
+
+
+def _config_path(path: Optional[str]) -> Optional[Path]:
+    if path:
+        return Path(path)
+    if os.environ.get(CONFIG_ENV_VAR):
+        return Path(os.environ[CONFIG_ENV_VAR])
+    if DEFAULT_CONFIG_FILE.exists():
+        return DEFAULT_CONFIG_FILE
+    return None
+
+
+def load_config(path: Optional[str] = None) -> AgentConfig:
+    """Load agent configuration, falling back to the built-in lab defaults"""
+    source = _config_path(path)
+    data = {}
+    if source is not None:
+        with open(source, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    server = data.get("xmpp_server", DEFAULT_SERVER)
+    entries = {role: {"password": password} for role, password in DEFAULT_PASSWORDS.items()}
+    for role, entry in data.get("agents", {}).items():
+        entries.setdefault(role, {}).update(entry)
+
+    agents = {}
+    for role, entry in entries.items():
+        agents[role] = AgentCredentials(
+            jid=entry.get("jid", f"{role}@{server}"),
+            password=entry["password"]
+        )
+
+    return AgentConfig(server, agents, source)
@@ -0,0 +1,226 @@
+"""
+Agent Container: Many Logical Agents per Process
+
+A SPADE agent opens its own XMPP connection when started, so a thousand
+agents means a thousand client sessions, a thousand presence rosters and a
+thousand streams on the server, even when every agent runs in the same
+process. AgentContainer hosts agents on one event loop without starting
+their XMPP clients:
+
+    local  agent --send--> AgentContainer --queue--> matching behaviours of the local recipient
+    remote agent <--xmpp-- gateway k (k = hash(sender) % gateways) <-- AgentContainer
+
+A message between two hosted agents goes straight onto the recipient
+behaviour's queue and is never serialized. Anything else goes out through a
+small pool of connected gateway agents (a few XMPP sessions however many
+agents are hosted). The logical sender travels in the "container-sender"
+metadata. Replies are routed back in one of two ways. A peer that is itself
+a container addresses its gateway and names the recipient in
+"container-to". A plain SPADE agent replies to the gateway's JID, and the
+reply is matched to the original sender by conversation-id.
+
+The hosted agents are ordinary SPADE agents: setup(), add_behaviour(),
+templates and Behaviour.send() work unchanged.
+"""
+
+import asyncio
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Sequence, Tuple
+
+from spade.agent import Agent
+from spade.behaviour import CyclicBehaviour, FSMBehaviour
+from spade.container import Container
+from spade.message import Message
+
+
+SENDER_KEY = "container-sender"
+RECIPIENT_KEY = "container-to"
+
+
+@dataclass
+class ContainerStats:
+    """Counters since the container was created"""
+    local: int = 0                  # delivered in memory between hosted agents
+    outbound: int = 0               # sent to remote agents through a gateway
+    inbound: int = 0                # received from remote agents through a gateway
+    unmatched: int = 0              # delivered, but no behaviour template matched
+    undeliverable: int = 0          # no hosted recipient, or remote with no gateways
+
+
+class GatewayAgent(Agent):
+    """
+    A connected agent that carries the container's traffic to and from
+    remote agents
+    """
+
+    def __init__(self, jid: str, password: str, host: "AgentContainer"):
+        super().__init__(jid, password)
+        self.host = host
+
+    class RelayInboundBehaviour(CyclicBehaviour):
+        """Hand every message received over XMPP to the container"""
+
+        async def run(self):
+            msg = await self.receive(timeout=1)
+            if msg:
+                self.agent.host.deliver_inbound(msg)
+
+    async def forward(self, msg: Message):
+        """Send over this gateway's XMPP connection"""
+        msg.sender = str(self.jid)
+        await self.client.send(msg.prepare())
+
+    async def setup(self):
+        self.add_behaviour(self.RelayInboundBehaviour())
+
+
+class AgentContainer:
+    """
+    Hosts agents on the running event loop with in-memory local delivery
+    and a shared pool of gateway connections for remote delivery
+    """
+
+    def __init__(self, gateways: Sequence[Tuple[str, str]] = (), remember_conversations: int = 100_000):
+        """
+        gateways: (jid, password) of the XMPP accounts used for remote traffic;
+                  none means hosted agents can only talk to each other
+        remember_conversations: how many outbound conversation-ids to keep for
+                  routing replies from plain (non-container) agents
+        """
+        self.agents: Dict[str, Agent] = {}
+        self.gateways: List[GatewayAgent] = [GatewayAgent(jid, password, self) for jid, password in gateways]
+        self.remote_routes: Dict[str, str] = {}          # logical remote jid -> its container's gateway jid
+        self._reply_to: "OrderedDict[str, str]" = OrderedDict()    # conversation-id -> hosted sender
+        self._remember_conversations = remember_conversations
+        self.stats = ContainerStats()
+
+    def __len__(self) -> int:
+        return len(self.agents)
+
+    def __contains__(self, jid: str) -> bool:
+        return str(jid) in self.agents
+
+    def add(self, agent: Agent) -> Agent:
+        """
+        Host an agent. It is taken out of SPADE's process-wide container, so
+        all of its traffic goes through this one.
+        """
+        jid = str(agent.jid)
+        if jid in self.agents:
+            raise ValueError(f"{jid} is already hosted in this container")
+        Container().unregister(jid)
+        agent.set_container(self)
+        self.agents[jid] = agent
+        return agent
+
+    async def start(self):
+        """Connect the gateways, then start every hosted agent"""
+        for gateway in self.gateways:
+            await gateway.start(auto_register=True)
+        for agent in self.agents.values():
+            await self.start_agent(agent)
+
+    async def start_agent(self, agent: Agent):
+        """
+        Start a hosted agent the way Agent.start() does, minus the XMPP client:
+        setup(), mark it alive, start its behaviours
+        """
+        agent.set_loop(asyncio.get_running_loop())
+        await agent.setup()
+        agent._alive.set()
+        for behaviour in agent.behaviours:
+            if not behaviour.is_running:
+                behaviour.set_agent(agent)
+                if isinstance(behaviour, FSMBehaviour):
+                    for state in behaviour.get_states().values():
+                        state.set_agent(agent)
+                behaviour.start()
+
+    async def stop(self, timeout: float = 15.0):
+        """
+        Stop every hosted agent, then disconnect the gateways. Behaviours are
+        killed and given up to `timeout` seconds to finish (a receive() in
+        progress runs to its own timeout), so their on_end hooks run before
+        each agent's stop()
+        """
+        behaviours = [behaviour for agent in self.agents.values() for behaviour in agent.behaviours]
+        for behaviour in behaviours:
+            behaviour.kill()
+        await asyncio.gather(*(self._join(behaviour, timeout) for behaviour in behaviours))
+        for agent in self.agents.values():
+            # Not alive: Agent.stop() then skips the XMPP client a hosted agent never opened
+            agent._alive.clear()
+            await agent.stop()
+        for gateway in self.gateways:
+            await gateway.stop()
+
+    @staticmethod
+    async def _join(behaviour, timeout: float):
+        try:
+            await behaviour.join(timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def send(self, msg: Message, behaviour):
+        """Called by Behaviour.send() of every hosted agent"""
+        to = str(msg.to)
+        agent = self.agents.get(to)
+        if agent is not None:
+            self.stats.local += 1
+            self._deliver(agent, msg)
+            return
+
+        if not self.gateways:
+            self.stats.undeliverable += 1
+            return
+        sender = str(msg.sender)
+        # A copy, so the sender's own traces keep the logical addresses
+        # (SPADE has no public accessor for the whole metadata dict)
+        relayed = Message(to=self.remote_routes.get(to, to), body=msg.body, thread=msg.thread,
+                          metadata=dict(msg._metadata))
+        relayed.set_metadata(SENDER_KEY, sender)
+        if to in self.remote_routes:
+            relayed.set_metadata(RECIPIENT_KEY, to)
+        conversation_id = msg.get_metadata("conversation-id")
+        if conversation_id:
+            self._reply_to[conversation_id] = sender
+            self._reply_to.move_to_end(conversation_id)
+            if len(self._reply_to) > self._remember_conversations:
+                self._reply_to.popitem(last=False)
+        await self.gateways[zlib.crc32(sender.encode()) % len(self.gateways)].forward(relayed)
+        self.stats.outbound += 1
+
+    def deliver_inbound(self, msg: Message):
+        """Route a message a gateway received over XMPP to the hosted agent it is for"""
+        logical_sender = msg.get_metadata(SENDER_KEY)
+        if logical_sender:
+            # The sender is hosted in another container: reply through its gateway
+            self.remote_routes[logical_sender] = str(msg.sender.bare)
+            msg.sender = logical_sender
+        to = msg.get_metadata(RECIPIENT_KEY) or self._reply_to.get(msg.get_metadata("conversation-id") or "")
+        agent = self.agents.get(to or "")
+        if agent is None:
+            self.stats.undeliverable += 1
+            return
+        msg.to = to
+        for key in (SENDER_KEY, RECIPIENT_KEY):
+            msg._metadata.pop(key, None)
+        self.stats.inbound += 1
+        self._deliver(agent, msg)
+
+    def snapshot(self) -> Dict:
+        """Hosted agents, gateways and counters for monitoring"""
+        return {"agents": len(self.agents), "gateways": len(self.gateways), **asdict(self.stats)}
+
+    def _deliver(self, agent: Agent, msg: Message):
+        # Agent.dispatch() spawns a task per matching behaviour; the queues are
+        # unbounded, so putting directly is equivalent and much cheaper
+        matched = False
+        for behaviour in agent.behaviours:
+            if behaviour.match(msg):
+                behaviour.queue.put_nowait(msg)
+                matched = True
+        if not matched:
+            self.stats.unmatched += 1
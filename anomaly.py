@@ -0,0 +1,178 @@
+"""
+Streaming Anomaly Detection for Event Derivation
+
+Lab 3 raises TEMP_SPIKE at 42 °C and WATER_RISE at 1.5 m everywhere. A hot
+northern town sits near 42 °C on an ordinary day, while a coastal one is in
+trouble well below it; and a reading hovering at the threshold fires and
+clears on alternate ticks, bouncing the FSM between MONITORING and
+ASSESSING.
+
+AnomalyDetector instead learns each location's normal level online (an
+exponentially weighted mean and variance per location and metric) and
+flags readings that are unusually high for that location:
+
+    zscore   the reading is more than `z_on` standard deviations above the mean
+    cusum    the one-sided cumulative sum of standardized excesses passes `cusum_h`
+             (catches slow, steady rises a single z-score misses)
+
+An alarm stays raised until the score falls below `z_off` (z-score) or the
+cumulative sum drains back to zero (CUSUM), and only the onset of an alarm
+produces an event, so a reading that hovers near the limit no longer
+flaps. Every update is O(1) per sample and all locations are processed
+together as NumPy arrays of shape (metric, location).
+
+    detector = AnomalyDetector(method="cusum")
+    agent = GoalReactiveResponseAgent(jid, password, environment, anomaly_detector=detector)
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from environment import EnvironmentPercept
+
+
+# Event type raised for an upward anomaly of each metric (the Lab 3 names)
+METRIC_EVENTS = {
+    "temperature": "TEMP_SPIKE",
+    "water_level": "WATER_RISE",
+}
+
+# Smallest standard deviation assumed per metric, so a reading that has been
+# flat (water level 0.0 for many ticks) does not make every change infinite
+MIN_STD = {
+    "temperature": 0.5,
+    "humidity": 1.0,
+    "wind_speed": 1.0,
+    "air_quality": 5.0,
+    "seismic_activity": 0.1,
+    "water_level": 0.1,
+}
+
+DETAIL_FORMATS = {
+    "temperature": "Temperature at {value:.1f}°C ({score:.1f}σ above local normal {mean:.1f}°C)",
+    "water_level": "Water level at {value:.2f}m ({score:.1f}σ above local normal {mean:.2f}m)",
+}
+
+
+@dataclass(frozen=True)
+class Anomaly:
+    """Onset of an alarm for one metric at one location"""
+    metric: str
+    location: str
+    value: float
+    mean: float
+    score: float
+
+
+class AnomalyDetector:
+    """
+    Online per-location detector over (metric, location) arrays
+    """
+
+    def __init__(self, location_names: Optional[Sequence[str]] = None,
+                 metrics: Sequence[str] = tuple(METRIC_EVENTS), method: str = "zscore",
+                 alpha: float = 0.1, warmup: int = 5, z_on: float = 3.0, z_off: float = 1.5,
+                 cusum_k: float = 0.5, cusum_h: float = 5.0):
+        """
+        alpha: EWMA weight of the newest sample (about 2/alpha ticks of memory)
+        warmup: ticks to learn the baseline before any alarm can be raised
+        cusum_k, cusum_h: CUSUM slack and decision limit, in standard deviations
+        """
+        if method not in ("zscore", "cusum"):
+            raise ValueError("method must be 'zscore' or 'cusum'")
+        self.metrics = tuple(metrics)
+        self.method = method
+        self.alpha = alpha
+        self.warmup = warmup
+        self.z_on = z_on
+        self.z_off = z_off
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.samples = 0
+        self.location_names: List[str] = []
+        self.location_index: Dict[str, int] = {}
+        if location_names is not None:
+            self._allocate(location_names)
+
+    def _allocate(self, location_names: Sequence[str]):
+        self.location_names = list(location_names)
+        self.location_index = {name: i for i, name in enumerate(self.location_names)}
+        shape = (len(self.metrics), len(self.location_names))
+        self.mean = np.zeros(shape)
+        self.variance = np.zeros(shape)
+        self.cusum = np.zeros(shape)
+        self.alarm = np.zeros(shape, dtype=bool)
+        self.score = np.zeros(shape)
+        self._min_std = np.array([MIN_STD.get(metric, 0.0) for metric in self.metrics])[:, None]
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        """
+        Score one tick of readings, shape (metric, location), then fold them
+        into the baselines. Returns a boolean array marking alarm onsets.
+        """
+        if self.samples == 0:
+            self.mean[...] = values
+            self.samples = 1
+            return np.zeros(values.shape, dtype=bool)
+
+        deviation = values - self.mean
+        std = np.maximum(np.sqrt(self.variance), self._min_std)
+        self.score = deviation / std
+
+        if self.method == "zscore":
+            raised = self.score >= self.z_on
+            cleared = self.score < self.z_off
+        else:
+            self.cusum = np.maximum(0.0, self.cusum + self.score - self.cusum_k)
+            raised = self.cusum >= self.cusum_h
+            cleared = self.cusum == 0.0
+
+        warmed_up = self.samples >= self.warmup
+        onset = raised & ~self.alarm & warmed_up
+        self.alarm = (self.alarm | onset) & ~cleared
+
+        # EWMA mean and variance (West's incremental form)
+        increment = self.alpha * deviation
+        self.mean += increment
+        self.variance = (1 - self.alpha) * (self.variance + deviation * increment)
+        self.samples += 1
+        return onset
+
+    def observe(self, percepts: List[EnvironmentPercept]) -> List[Anomaly]:
+        """Update from one tick of percepts and return the alarms that started"""
+        if not self.location_names:
+            self._allocate([percept.location.name for percept in percepts])
+
+        baseline = self.mean.copy()
+        values = self.mean.copy()   # locations missing from this tick read as normal
+        for percept in percepts:
+            column = self.location_index.get(percept.location.name)
+            if column is not None:
+                for row, metric in enumerate(self.metrics):
+                    values[row, column] = getattr(percept, metric)
+
+        onset = self.update(values)
+        anomalies = []
+        for row, column in zip(*np.nonzero(onset)):
+            anomalies.append(Anomaly(
+                metric=self.metrics[row],
+                location=self.location_names[column],
+                value=float(values[row, column]),
+                mean=float(baseline[row, column]),
+                score=float(self.score[row, column]),
+            ))
+        return anomalies
+
+    def events(self, percepts: List[EnvironmentPercept]) -> List[Dict]:
+        """Lab 3 style event dicts for the alarms that started this tick"""
+        events = []
+        for anomaly in self.observe(percepts):
+            details = DETAIL_FORMATS.get(anomaly.metric, "{metric} at {value:.2f} ({score:.1f}σ above normal)")
+            events.append({
+                "type": METRIC_EVENTS.get(anomaly.metric, f"{anomaly.metric.upper()}_ANOMALY"),
+                "location": anomaly.location,
+                "details": details.format(**anomaly.__dict__),
+            })
+        return events
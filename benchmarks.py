@@ -0,0 +1,1033 @@
+"""
+Offline Benchmarks
+
+Headless benchmarks for the simulation and agent logic. None of them need an
+XMPP server and only `container` needs SPADE; run them with
+`python launcher.py bench <name>`. Every benchmark takes a `scale` (ticks,
+locations, messages... depending on the benchmark) and returns a flat dict of figures for the launcher to print.
+"""
+
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict
+
+
+BENCHMARKS: Dict[str, Callable[[int], Dict]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark under `name`"""
+    def register(func: Callable[[int], Dict]) -> Callable[[int], Dict]:
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+@benchmark("environment")
+def bench_environment(scale: int = 10000) -> Dict:
+    """Environment ticks per second, including a full percept sweep per tick"""
+    from environment import DisasterEnvironment
+
+    random.seed(403)
+    environment = DisasterEnvironment()
+
+    start = time.perf_counter()
+    for _ in range(scale):
+        environment.update_environment()
+        environment.get_all_percepts()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "ticks": scale,
+        "seconds": elapsed,
+        "ticks_per_second": scale / elapsed,
+        "active_disasters": len(environment.active_disasters),
+    }
+
+
+@benchmark("snapshot")
+def bench_snapshot(scale: int = 1000) -> Dict:
+    """Cost of warming up `scale` ticks versus saving and restoring the warmed state"""
+    from environment import DisasterEnvironment
+    from environment_snapshot import load_snapshot, save_snapshot
+
+    random.seed(403)
+    start = time.perf_counter()
+    environment = DisasterEnvironment()
+    # A non-ASCII name checks that names are restored by byte offset
+    first = environment.locations[0]
+    environment.current_conditions["Tamalé"] = environment.current_conditions.pop(first.name)
+    first.name = "Tamalé"
+    for _ in range(scale):
+        environment.update_environment()
+    warmup = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "environment.snap")
+        start = time.perf_counter()
+        save_snapshot(environment, path)
+        save = time.perf_counter() - start
+
+        start = time.perf_counter()
+        restored = load_snapshot(path)
+        restore = time.perf_counter() - start
+        size = os.path.getsize(path)
+
+    round_trip = (
+        [location.name for location in restored.locations] == [location.name for location in environment.locations]
+        and restored.current_conditions == environment.current_conditions
+        and [str(d) for d in restored.active_disasters] == [str(d) for d in environment.active_disasters]
+    )
+
+    return {
+        "warmup_ticks": scale,
+        "warmup_seconds": warmup,
+        "save_seconds": save,
+        "restore_seconds": restore,
+        "snapshot_bytes": size,
+        "round_trip_ok": round_trip,
+    }
+
+
+@benchmark("replay")
+def bench_replay(scale: int = 10000) -> Dict:
+    """Record `scale` ticks, then replay them at max speed through Lab 3 event derivation"""
+    from environment import DisasterEnvironment
+    from percept_recording import PerceptRecorder, PerceptRecording, ReplayEnvironment
+
+    random.seed(403)
+    environment = DisasterEnvironment()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "percepts.rec")
+        start = time.perf_counter()
+        with PerceptRecorder(path) as recorder:
+            for _ in range(scale):
+                environment.update_environment()
+                recorder.record(environment.get_all_percepts())
+        record = time.perf_counter() - start
+        size = os.path.getsize(path)
+
+        try:
+            import lab_3_goal_event_fsm_agent_spade as lab3
+            agent = lab3.GoalReactiveResponseAgent(lab3.RESPONSE_JID, lab3.RESPONSE_PASSWORD, None)
+            derive = agent._derive_events
+        except ImportError:
+            derive = None
+
+        with PerceptRecording(path) as recording:
+            replay = ReplayEnvironment(recording, pace="max")
+            events = 0
+            start = time.perf_counter()
+            while True:
+                replay.update_environment()
+                if replay.finished:
+                    break
+                percepts = replay.get_all_percepts()
+                if derive:
+                    events += len(derive(percepts))
+            elapsed = time.perf_counter() - start
+
+    return {
+        "ticks": scale,
+        "record_seconds": record,
+        "recording_bytes": size,
+        "bytes_per_tick": size / scale,
+        "replay_seconds": elapsed,
+        "replay_ticks_per_second": scale / elapsed,
+        "derived_events": events if derive else "n/a (SPADE not installed)",
+    }
+
+
+@benchmark("geography")
+def bench_geography(scale: int = 200000) -> Dict:
+    """Generate a `scale`-location geography cold, then load it from the cache"""
+    from environment import DisasterEnvironment
+    from geography import GeographyConfig, generate, load_or_generate
+
+    config = GeographyConfig(layout="clustered", n_locations=scale)
+    start = time.perf_counter()
+    generate(config)
+    cold = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        load_or_generate(config, cache_dir=directory)
+        start = time.perf_counter()
+        scenario = load_or_generate(config, cache_dir=directory)
+        cached = time.perf_counter() - start
+
+    random.seed(403)
+    start = time.perf_counter()
+    environment = DisasterEnvironment(scenario=scenario)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    environment.update_environment()
+    tick = time.perf_counter() - start
+
+    return {
+        "locations": scale,
+        "generate_seconds": cold,
+        "cached_load_seconds": cached,
+        "environment_build_seconds": build,
+        "tick_seconds": tick,
+    }
+
+
+@benchmark("spread")
+def bench_spread(scale: int = 200000) -> Dict:
+    """Neighbourhood graph build and per-tick spread cost on a `scale`-location geography"""
+    from environment import DisasterEnvironment
+    from geography import GeographyConfig, generate
+
+    random.seed(403)
+    environment = DisasterEnvironment(scenario=generate(GeographyConfig(layout="clustered", n_locations=scale)))
+
+    start = time.perf_counter()
+    model = environment.enable_spread(radius_km=15)
+    build = time.perf_counter() - start
+
+    # Drive only the disaster part of each tick; the per-location condition
+    # drift in update_environment would dominate the timing at this scale
+    environment.spread_model = None
+    ticks = 500
+    spent = 0.0
+    for _ in range(ticks):
+        if random.random() < 0.80:
+            environment._generate_disaster()
+        environment._update_disasters()
+        start = time.perf_counter()
+        model.step(environment)
+        spent += time.perf_counter() - start
+
+    return {
+        "locations": scale,
+        "edges": model.neighbourhood.n_edges,
+        "graph_build_seconds": build,
+        "spread_ticks": ticks,
+        "spread_seconds_per_tick": spent / ticks,
+        "locations_pressured": model.stats.pressured_locations,
+        "disasters_spread": sum(model.stats.spread_disasters.values()),
+        "active_disasters": len(environment.active_disasters),
+    }
+
+
+@benchmark("history")
+def bench_history(scale: int = 100000) -> Dict:
+    """Per-tick cost and fixed memory of a 32-tick condition history over `scale` locations"""
+    import numpy as np
+    from history import METRICS, ConditionHistory
+
+    history = ConditionHistory([f"L{i}" for i in range(scale)], capacity=32)
+    rng = np.random.default_rng(403)
+    values = rng.uniform(0, 100, (len(METRICS), scale))
+    ticks = 256
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        values += rng.normal(0, 1, values.shape)
+        history.record_array(values)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    history.slope("water_level")
+    history.maximum("water_level")
+    query = time.perf_counter() - start
+
+    return {
+        "locations": scale,
+        "ticks": ticks,
+        "seconds_per_tick": elapsed / ticks,
+        "all_location_query_seconds": query,
+        "history_megabytes": history.nbytes / 1e6,
+    }
+
+
+@benchmark("anomaly")
+def bench_anomaly(scale: int = 2000) -> Dict:
+    """
+    TEMP_SPIKE/WATER_RISE events from fixed thresholds versus anomaly alarms
+    over `scale` ticks of the lab environment, plus detector cost per tick
+    at 100k locations
+    """
+    import numpy as np
+    from anomaly import AnomalyDetector
+    from environment import DisasterEnvironment
+
+    random.seed(403)
+    environment = DisasterEnvironment()
+    detectors = {method: AnomalyDetector(method=method) for method in ("zscore", "cusum")}
+    threshold_events = 0
+    anomaly_events = {method: 0 for method in detectors}
+    for _ in range(scale):
+        environment.update_environment()
+        percepts = environment.get_all_percepts()
+        threshold_events += sum((p.temperature >= 42) + (p.water_level >= 1.5) for p in percepts)
+        for method, detector in detectors.items():
+            anomaly_events[method] += len(detector.observe(percepts))
+
+    n = 100_000
+    detector = AnomalyDetector([f"L{i}" for i in range(n)])
+    rng = np.random.default_rng(403)
+    values = rng.uniform(20, 40, (len(detector.metrics), n))
+    ticks = 100
+    start = time.perf_counter()
+    for _ in range(ticks):
+        detector.update(values + rng.normal(0, 1, values.shape))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "ticks": scale,
+        "threshold_events": int(threshold_events),
+        "zscore_events": anomaly_events["zscore"],
+        "cusum_events": anomaly_events["cusum"],
+        "seconds_per_tick_100k_locations": elapsed / ticks,
+    }
+
+
+@benchmark("percept-cache")
+def bench_percept_cache(scale: int = 1000) -> Dict:
+    """Three percept consumers per tick (as sensor, event derivation and a dashboard would) over `scale` ticks"""
+    from environment import DisasterEnvironment
+
+    random.seed(403)
+    environment = DisasterEnvironment()
+    start = time.perf_counter()
+    for _ in range(scale):
+        environment.update_environment()
+        for _consumer in range(3):
+            environment.get_all_percepts()
+        for location in environment.locations:
+            environment.sense(location)
+    elapsed = time.perf_counter() - start
+
+    stats = environment.percept_cache_stats()
+    return {
+        "ticks": scale,
+        "seconds": elapsed,
+        "cache_hits": stats["hits"],
+        "cache_misses": stats["misses"],
+        "hit_ratio": stats["hits"] / max(1, stats["hits"] + stats["misses"]),
+    }
+
+
+@benchmark("worker-pool")
+def bench_worker_pool(scale: int = 200) -> Dict:
+    """
+    Disasters handled per second by 1, 2, 4 and 8 workers sharing a
+    DisasterWorkQueue, with the Lab 3 ASSESSING, DISPATCHING and RECOVERY
+    states simulated as 10 ms sleeps; `scale` disasters per run
+    """
+    import asyncio
+    from datetime import datetime
+    from environment import DisasterEvent, DisasterType, Location, Severity
+    from work_queue import DisasterWorkQueue
+
+    state_delay = 0.01
+    location = Location(5.6037, -0.1870, "Accra")
+    rng = random.Random(403)
+    disasters = [
+        DisasterEvent(f"D{i:06d}", rng.choice(list(DisasterType)), location, rng.choice(list(Severity)),
+                      datetime.now(), 1.0, rng.randint(0, 50), rng.uniform(0, 100), {})
+        for i in range(scale)
+    ]
+
+    async def worker(queue: DisasterWorkQueue, name: str):
+        while True:
+            disaster = await queue.claim(name, timeout=state_delay)
+            if disaster is None:
+                if queue.closed and not len(queue):
+                    return
+                continue
+            for _state in range(3):
+                await asyncio.sleep(state_delay)
+            queue.complete(disaster.event_id, name)
+
+    async def run(workers: int) -> float:
+        queue = DisasterWorkQueue()
+        for disaster in disasters:
+            queue.push(disaster)
+        queue.close()
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(queue, f"worker-{i}") for i in range(workers)))
+        assert queue.stats.completed == scale
+        return time.perf_counter() - start
+
+    results: Dict = {"disasters": scale}
+    for workers in (1, 2, 4, 8):
+        results[f"handled_per_second_{workers}_workers"] = scale / asyncio.run(run(workers))
+    return results
+
+
+@benchmark("fsm-core")
+def bench_fsm_core(scale: int = 1_000_000) -> Dict:
+    """
+    Transitions per second of the headless Lab 3 response machine: with
+    trivial actions (the engine alone), and with the Lab 3 actions handling
+    one disaster event per cycle in single and batch mode (no logging)
+    """
+    from datetime import datetime
+    from environment import DisasterEvent, DisasterType, Location, Severity
+    from response_fsm import ResponseContext, ResponseMachine, ResponseState, Trigger
+
+    # Engine alone: every state completes at once, MONITORING always finds events
+    machine = ResponseMachine({
+        ResponseState.MONITORING: lambda context: Trigger.EVENTS,
+        ResponseState.ASSESSING: lambda context: Trigger.COMPLETE,
+        ResponseState.DISPATCHING: lambda context: Trigger.COMPLETE,
+        ResponseState.RECOVERY: lambda context: Trigger.IDLE,
+    })
+    context = ResponseContext()
+    step = machine.step
+    start = time.perf_counter()
+    for _ in range(scale):
+        step(context)
+    engine = time.perf_counter() - start
+
+    location = Location(5.6037, -0.1870, "Accra")
+    rng = random.Random(403)
+    events = [
+        [{"type": "DISASTER_DETECTED", "location": "Accra", "details": "",
+          "disaster": DisasterEvent(f"D{i:06d}", rng.choice(list(DisasterType)), location,
+                                    rng.choice(list(Severity)), datetime.now(), 1.0, rng.randint(0, 50),
+                                    rng.uniform(0, 100), {"rescue_teams": 4, "medical_kits": 20})}]
+        for i in range(1000)
+    ]
+    results: Dict = {"transitions": scale, "engine_transitions_per_second": scale / engine}
+    for mode, batch_size in (("single", 1), ("batch", 8)):
+        machine = ResponseMachine()
+        active = set()   # a disaster stays active for the cycle it is reported in
+        context = ResponseContext(batch_size=batch_size, active_event_ids=lambda: active)
+        transitions = 0
+        start = time.perf_counter()
+        while transitions < scale:
+            context.cycle += 1
+            context.events = events[context.cycle % len(events)]
+            active = {context.events[0]["disaster"].event_id}
+            transitions += machine.run_cycle(context)
+        elapsed = time.perf_counter() - start
+        results[f"{mode}_transitions_per_second"] = transitions / elapsed
+        results[f"{mode}_cycles"] = context.cycle
+    results["batch_handled"] = context.handled
+    return results
+
+
+@benchmark("conversations")
+def bench_conversations(scale: int = 100000) -> Dict:
+    """
+    `scale` REQUEST conversations through a ConversationTable on a simulated
+    clock: 90% answered (AGREE then CONFIRM), 10% lost and retried until they
+    escalate; plus the cost of a timeout check with every conversation open
+    """
+    from conversations import ConversationTable, RetryPolicy
+
+    now = [0.0]
+    table = ConversationTable(RetryPolicy(timeout=10.0, max_retries=2), clock=lambda: now[0])
+    rng = random.Random(403)
+    start = time.perf_counter()
+    for i in range(scale):
+        now[0] = i * 0.001
+        conversation_id = f"CONV-{i}"
+        table.start(conversation_id, {"event_id": f"E{i}"}, f"E{i}")
+        if rng.random() < 0.9:
+            table.on_reply(conversation_id, "agree")
+            table.on_reply(conversation_id, "confirm")
+        table.expire()
+    still_open = len(table)
+    while len(table):
+        now[0] += 10.0
+        table.expire()
+    elapsed = time.perf_counter() - start
+
+    busy = ConversationTable(clock=lambda: 0.0)
+    for i in range(scale):
+        busy.start(f"CONV-{i}", {})
+    checks = 1000
+    check_start = time.perf_counter()
+    for _ in range(checks):
+        busy.expire(now=1.0)
+    check = (time.perf_counter() - check_start) / checks
+
+    return {
+        "conversations": scale,
+        "open_after_last_request": still_open,
+        "seconds": elapsed,
+        "conversations_per_second": scale / elapsed,
+        "retried": table.stats.retried,
+        "escalated": table.stats.escalated,
+        f"expiry_check_microseconds_{scale}_open": check * 1e6,
+    }
+
+
+@benchmark("contract-net")
+def bench_contract_net(scale: int = 3000) -> Dict:
+    """
+    Resource requests from `scale` ticks of the lab environment, allocated by
+    1 coordinator (the Lab 4 REQUEST protocol) and by contract net across 2
+    and 5 regional coordinators. Allocations are returned when a disaster
+    resolves. The `split` runs divide the single pool between the regions,
+    so they have the same total capacity as the single coordinator.
+    """
+    from contract_net import ContractNetInitiator, commit_proposal, make_proposal
+    from environment import DisasterEnvironment
+
+    random.seed(403)
+    environment = DisasterEnvironment()
+    ticks = []
+    active_before = set()
+    for _ in range(scale):
+        environment.update_environment()
+        active = {disaster.event_id: disaster for disaster in environment.active_disasters}
+        new = [{
+            "event_id": event_id,
+            "resources_needed": disaster.resources_needed,
+            "latitude": disaster.location.latitude,
+            "longitude": disaster.location.longitude,
+        } for event_id, disaster in active.items() if event_id not in active_before]
+        ticks.append((new, active_before - active.keys()))
+        active_before = set(active)
+
+    pool = {"rescue_teams": 20, "medical_kits": 100, "fire_trucks": 10, "ambulances": 15}
+
+    def run(coordinators: int, split: bool = False) -> Dict:
+        names = [f"coordinator_{index}" for index in range(coordinators)]
+        locations = {name: environment.locations[index % len(environment.locations)]
+                     for index, name in enumerate(names)}
+        share = coordinators if split else 1
+        available = {name: {resource: amount // share for resource, amount in pool.items()} for name in names}
+        allocated = {name: {} for name in names}
+        initiator = ContractNetInitiator(names, clock=lambda: 0.0)
+        messages = {name: 0 for name in names}
+        winner = {}
+        requests = refused = requested_units = allocated_units = 0
+
+        start = time.perf_counter()
+        for new, resolved in ticks:
+            for event_id in resolved:
+                name = winner.pop(event_id, None)
+                if name is not None:
+                    for resource, amount in allocated[name].pop(event_id).items():
+                        available[name][resource] += amount
+
+            for request in new:
+                requests += 1
+                needed = {r: a for r, a in request["resources_needed"].items() if r in pool}
+                requested_units += sum(needed.values())
+                if coordinators == 1:
+                    # Lab 4 REQUEST: all of the managed resources or a REFUSE
+                    name = names[0]
+                    messages[name] += 1
+                    if needed and commit_proposal(available[name], allocated[name], request["event_id"], needed):
+                        winner[request["event_id"]] = name
+                        allocated_units += sum(needed.values())
+                    else:
+                        refused += 1
+                    continue
+
+                cfp = initiator.start(request["event_id"], request)
+                for name in names:
+                    messages[name] += 1
+                    location = locations[name]
+                    proposal = make_proposal(name, available[name], request, location.latitude, location.longitude)
+                    if proposal is None:
+                        initiator.on_refuse(cfp.conversation_id, name)
+                    else:
+                        initiator.on_propose(cfp.conversation_id, proposal)
+                proposal = initiator.award(cfp)
+                while proposal is not None:
+                    messages[proposal.participant] += 1
+                    if commit_proposal(available[proposal.participant], allocated[proposal.participant],
+                                       request["event_id"], proposal.resources):
+                        initiator.on_confirm(cfp.conversation_id, proposal.participant)
+                        winner[request["event_id"]] = proposal.participant
+                        allocated_units += sum(proposal.resources.values())
+                        break
+                    initiator.on_failure(cfp.conversation_id, proposal.participant)
+                    proposal = initiator.award(cfp)
+                else:
+                    refused += 1
+        elapsed = time.perf_counter() - start
+
+        return {
+            "refusal_rate": refused / max(1, requests),
+            "fill_ratio": allocated_units / max(1, requested_units),
+            "max_messages_per_coordinator": max(messages.values()),
+            "microseconds_per_request": elapsed / max(1, requests) * 1e6,
+        }
+
+    results: Dict = {"ticks": scale, "requests": sum(len(new) for new, _ in ticks)}
+    for label, coordinators, split in (("1", 1, False), ("2", 2, False), ("5", 5, False),
+                                       ("5_split", 5, True)):
+        for key, value in run(coordinators, split).items():
+            results[f"{key}_{label}"] = value
+    return results
+
+
+@benchmark("container")
+def bench_container(scale: int = 10000) -> Dict:
+    """
+    Memory and CPU per agent with 10, 1000 and `scale` SPADE agents hosted in
+    one AgentContainer (needs SPADE, but no XMPP server). Agents form a ring
+    and each sends its neighbour one INFORM per second, delivered in memory.
+    Memory is what tracemalloc sees allocated for creating and starting the
+    agents; CPU is process time over a 3 second window. A last run with
+    every neighbour remote sends the same traffic through one gateway
+    whose XMPP client only counts the stanzas it is given.
+    """
+    import asyncio
+    import tracemalloc
+    try:
+        from spade.agent import Agent
+        from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
+        from spade.message import Message
+        from spade.template import Template
+        from agent_container import AgentContainer
+    except ImportError:
+        return {"agents": "n/a (SPADE not installed)"}
+
+    window = 3.0
+
+    class RingAgent(Agent):
+        def __init__(self, jid: str, neighbour: str):
+            super().__init__(jid, "container")
+            self.neighbour = neighbour
+            self.received = 0
+
+        class InformBehaviour(PeriodicBehaviour):
+            async def run(self):
+                msg = Message(to=self.agent.neighbour, body="ping")
+                msg.set_metadata("performative", "inform")
+                await self.send(msg)
+
+        class ReceiveBehaviour(CyclicBehaviour):
+            async def run(self):
+                if await self.receive(timeout=window):
+                    self.agent.received += 1
+
+        async def setup(self):
+            self.add_behaviour(self.InformBehaviour(period=1.0))
+            self.add_behaviour(self.ReceiveBehaviour(), Template(metadata={"performative": "inform"}))
+
+    class CountingClient:
+        """Stands in for a gateway's XMPP client"""
+
+        def __init__(self):
+            self.sent = 0
+
+        async def send(self, stanza):
+            self.sent += 1
+
+    async def run(agents: int) -> Dict:
+        jids = [f"ring_{index}@localhost" for index in range(agents)]
+        tracemalloc.start()
+        container = AgentContainer()
+        for index, jid in enumerate(jids):
+            container.add(RingAgent(jid, jids[(index + 1) % agents]))
+        await container.start()
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        await asyncio.sleep(1.0)
+        cpu_start = time.process_time()
+        received_start = sum(agent.received for agent in container.agents.values())
+        await asyncio.sleep(window)
+        cpu = time.process_time() - cpu_start
+        received = sum(agent.received for agent in container.agents.values()) - received_start
+        await container.stop()
+        await asyncio.sleep(0)
+        return {
+            "kib_per_agent": allocated / agents / 1024,
+            "cpu_percent_per_1000_agents": cpu / window * 100 * 1000 / agents,
+            "messages_per_second": received / window,
+        }
+
+    async def run_remote(agents: int) -> Dict:
+        container = AgentContainer(gateways=[("gateway@localhost", "container")])
+        gateway = container.gateways[0]
+        gateway.client = CountingClient()
+        for index in range(agents):
+            container.add(RingAgent(f"ring_{index}@localhost", f"remote_{index}@elsewhere"))
+        # Hosted agents only: the gateway is never connected
+        for agent in container.agents.values():
+            await container.start_agent(agent)
+
+        await asyncio.sleep(1.0)
+        sent_start = gateway.client.sent
+        await asyncio.sleep(window)
+        sent = gateway.client.sent - sent_start
+        await container.stop()
+        await asyncio.sleep(0)
+        return {"forwarded_per_second": sent / window, "outbound": container.stats.outbound}
+
+    results: Dict = {}
+    for agents in (10, 1000, scale):
+        for key, value in asyncio.run(run(agents)).items():
+            results[f"{key}_{agents}"] = value
+    for key, value in asyncio.run(run_remote(1000)).items():
+        results[f"{key}_remote_1000"] = value
+    return results
+
+
+@benchmark("shared-percepts")
+def bench_shared_percepts(scale: int = 10000) -> Dict:
+    """
+    Handing `scale` ticks to four consumer agents: pickling the percepts once
+    per consumer (as a pipe or queue would) versus one shared-memory publish
+    per tick plus a reader taking the tick (reads run in this process, so the
+    figures are per-tick CPU cost, not end-to-end latency)
+    """
+    import pickle
+    from environment import DisasterEnvironment
+    from shared_percepts import SharedPerceptPublisher, SharedPerceptReader
+
+    consumers = 4
+    random.seed(403)
+    environment = DisasterEnvironment()
+    publisher = SharedPerceptPublisher(environment, name=f"dcit403_bench_{os.getpid()}")
+    reader = SharedPerceptReader(publisher.name)
+
+    pickle_seconds = shared_seconds = 0.0
+    pickled_bytes = 0
+    try:
+        for _ in range(scale):
+            environment.update_environment()
+
+            start = time.perf_counter()
+            percepts = environment.get_all_percepts()
+            for _ in range(consumers):
+                payload = pickle.dumps(percepts)
+                pickle.loads(payload)
+            pickle_seconds += time.perf_counter() - start
+            pickled_bytes += len(payload)
+
+            start = time.perf_counter()
+            publisher.publish()
+            for _ in range(consumers):
+                reader.read()
+            shared_seconds += time.perf_counter() - start
+    finally:
+        reader.close()
+        publisher.close()
+
+    return {
+        "ticks": scale,
+        "consumers": consumers,
+        "pickle_us_per_tick": pickle_seconds / scale * 1e6,
+        "pickle_bytes_per_consumer_tick": pickled_bytes // scale,
+        "shared_us_per_tick": shared_seconds / scale * 1e6,
+        "segment_bytes": publisher.layout.total,
+        "reader_retries": reader.retries,
+    }
+
+
+@benchmark("journal")
+def bench_journal(scale: int = 100000) -> Dict:
+    """
+    Coordinator write-ahead log: cost of record() on the request path for
+    `scale` allocations, group commits needed to make them durable, and the
+    time to recover the pool from the snapshot plus WAL tail
+    """
+    from resource_journal import ResourceJournal
+
+    initial = {"rescue_teams": 10 ** 9, "medical_kits": 10 ** 9, "fire_trucks": 10 ** 9, "ambulances": 10 ** 9}
+    with tempfile.TemporaryDirectory() as directory:
+        journal = ResourceJournal(directory, snapshot_every=10000)
+        journal.recover(initial)
+        start = time.perf_counter()
+        for index in range(scale):
+            journal.record(f"EVT_{index:06d}", {"rescue_teams": 2, "medical_kits": 5})
+        record_seconds = time.perf_counter() - start
+        journal.sync()
+        durable_seconds = time.perf_counter() - start
+        journal.close()
+
+        recovered = ResourceJournal(directory)
+        start = time.perf_counter()
+        available, allocated = recovered.recover(initial)
+        recover_seconds = time.perf_counter() - start
+        recovered.close()
+
+    assert len(allocated) == scale and available["rescue_teams"] == initial["rescue_teams"] - 2 * scale
+    return {
+        "allocations": scale,
+        "record_us_per_allocation": record_seconds / scale * 1e6,
+        "seconds_until_durable": durable_seconds,
+        "group_commits": journal.stats["commits"],
+        "snapshots": journal.stats["snapshots"],
+        "recover_ms": recover_seconds * 1000,
+        "wal_records_replayed": recovered.stats["replayed"],
+    }
+
+
+@benchmark("geo-index")
+def bench_geo_index(scale: int = 100000) -> Dict:
+    """
+    Grid index build, radius (5 and 50 km) and 10-nearest query latency over
+    a clustered `scale`-location geography, and disaster index upkeep while
+    disasters appear and resolve
+    """
+    from environment import DisasterEnvironment
+    from geography import GeographyConfig, generate
+
+    random.seed(403)
+    environment = DisasterEnvironment(scenario=generate(GeographyConfig(layout="clustered", n_locations=scale)))
+
+    start = time.perf_counter()
+    index = environment.enable_geo_index()
+    build = time.perf_counter() - start
+
+    queries = [random.randrange(scale) for _ in range(1000)]
+    results: Dict = {"locations": scale, "cell_km": index.cell_km, "build_seconds": build}
+    for radius_km in (5, 50):
+        found = 0
+        start = time.perf_counter()
+        for i in queries:
+            found += len(index.within(index.latitude[i], index.longitude[i], radius_km)[0])
+        results[f"radius_{radius_km}km_ms"] = (time.perf_counter() - start) / len(queries) * 1000
+        results[f"radius_{radius_km}km_mean_results"] = found / len(queries)
+
+    start = time.perf_counter()
+    for i in queries:
+        index.nearest(index.latitude[i], index.longitude[i], 10)
+    results["nearest_10_ms"] = (time.perf_counter() - start) / len(queries) * 1000
+
+    # Only the disaster part of each tick (condition drift over every location would dominate)
+    ticks = 2000
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for _ in range(20):
+            environment._generate_disaster()
+        environment._update_disasters()
+        environment.disasters_within(index.latitude[0], index.longitude[0], 50)
+    results["disaster_ticks_per_second"] = ticks / (time.perf_counter() - start)
+    results["active_disasters"] = len(index.disasters)
+    return results
+
+
+@benchmark("depots")
+def bench_depots(scale: int = 100000) -> Dict:
+    """
+    Nearest-depot dispatch over a clustered `scale`-location geography with
+    50 depots: travel-cost matrix build (cold and from the disk cache), then
+    dispatch decisions while depots run dry and get restocked
+    """
+    from depots import DepotNetwork, regional_depots
+    from geography import GeographyConfig, generate
+
+    random.seed(403)
+    locations = generate(GeographyConfig(layout="clustered", n_locations=scale)).locations()
+    depots = regional_depots(locations, 50, {"rescue_teams": 20000, "medical_kits": 50000})
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        DepotNetwork(depots, locations, cache_dir=cache_dir)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        network = DepotNetwork(depots, locations, cache_dir=cache_dir)
+        cached = time.perf_counter() - start
+
+    dispatches = 100000
+    shipments = 0
+    start = time.perf_counter()
+    for index in range(dispatches):
+        location = locations[random.randrange(scale)]
+        shipments += len(network.dispatch(location, {"rescue_teams": random.randint(0, 20),
+                                                     "medical_kits": random.randint(0, 50)}))
+        if index % 1000 == 0:
+            network.restock(depots[random.randrange(len(depots))].name, "rescue_teams", 200)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "locations": scale,
+        "depots": len(depots),
+        "matrix_build_seconds": cold,
+        "matrix_cached_seconds": cached,
+        "dispatch_us": elapsed / dispatches * 1e6,
+        "shipments_per_dispatch": shipments / dispatches,
+        "stock_left": sum(network.total_stock().values()),
+    }
+
+
+@benchmark("console")
+def bench_console(scale: int = 10000) -> Dict:
+    """
+    Lab 2 perception cycle time over `scale` locations: the old unbuffered
+    print per line, then the buffered console at detail, info and summary
+    level. Output goes to a line-buffered os.devnull, as a terminal would
+    flush, so the figures are formatting and write-call cost, not terminal
+    rendering.
+    """
+    from console import DETAIL, INFO, SUMMARY, Console, report_percepts
+    from environment import DisasterEnvironment
+    from geography import GeographyConfig, generate
+
+    random.seed(403)
+    environment = DisasterEnvironment(scenario=generate(GeographyConfig(n_locations=scale)))
+    for _ in range(20):
+        environment._generate_disaster()
+    percepts = environment.get_all_percepts()
+    cycles = 5
+    results: Dict = {"locations": scale, "active_disasters": len(environment.active_disasters)}
+
+    with open(os.devnull, "w", buffering=1) as sink:
+        start = time.perf_counter()
+        for _ in range(cycles):
+            for percept in percepts:
+                print(f"Location: {percept.location.name}", file=sink)
+                print(f"  Temperature: {percept.temperature:.1f}°C", file=sink)
+                print(f"  Humidity: {percept.humidity:.1f}%", file=sink)
+                print(f"  Water Level: {percept.water_level:.2f}m", file=sink)
+                print(f"  Air Quality: {percept.air_quality:.1f}", file=sink)
+                for disaster in percept.active_disasters:
+                    print(f"     - {disaster.disaster_type.value.upper()}", file=sink)
+                print(file=sink)
+        results["print_ms_per_cycle"] = (time.perf_counter() - start) / cycles * 1000
+
+        for name, level in (("detail", DETAIL), ("info", INFO), ("summary", SUMMARY)):
+            out = Console(level=level, stream=sink)
+            start = time.perf_counter()
+            for _ in range(cycles):
+                report_percepts(percepts, "bench", out)
+            out.flush()
+            results[f"{name}_ms_per_cycle"] = (time.perf_counter() - start) / cycles * 1000
+    return results
+
+
+@benchmark("hazard-rates")
+def bench_hazard_rates(scale: int = 100000) -> Dict:
+    """
+    Weighted disaster draws over a `scale`-location scenario: the previous
+    cumulative-weight binary search plus per-location type draw versus one
+    alias-table draw, and a whole tick of spawns at 100 expected per tick
+    (Python and NumPy batch)
+    """
+    import itertools
+    import numpy as np
+    from environment import DisasterType
+    from geography import GeographyConfig, generate
+    from hazard_rates import HazardRates
+
+    random.seed(403)
+    scenario = generate(GeographyConfig(n_locations=scale))
+    locations = scenario.locations()
+    draws = 100000
+
+    start = time.perf_counter()
+    rates = HazardRates.from_scenario(scenario)
+    sampler = rates.compile()
+    build = time.perf_counter() - start
+
+    cum_weights = list(itertools.accumulate(scenario.location_rates().tolist()))
+    types = list(DisasterType)
+    start = time.perf_counter()
+    for _ in range(draws):
+        index = random.choices(range(scale), cum_weights=cum_weights)[0]
+        random.choices(types, weights=scenario.type_rates[index].tolist())
+    bisect_us = (time.perf_counter() - start) / draws * 1e6
+
+    start = time.perf_counter()
+    for _ in range(draws):
+        sampler.draw()
+    alias_us = (time.perf_counter() - start) / draws * 1e6
+
+    busy = HazardRates(locations, (scenario.type_rates * (100 / rates.total_rate)).tolist()).compile()
+    ticks = 1000
+    spawns = 0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        spawns += len(busy.draw_tick())
+    tick_ms = (time.perf_counter() - start) / ticks * 1000
+    generator = np.random.default_rng(403)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        busy.draw_tick_arrays(generator)
+    tick_arrays_ms = (time.perf_counter() - start) / ticks * 1000
+
+    return {
+        "locations": scale,
+        "alias_build_seconds": build,
+        "bisect_draw_us": bisect_us,
+        "alias_draw_us": alias_us,
+        "spawns_per_tick": spawns / ticks,
+        "draw_tick_ms": tick_ms,
+        "draw_tick_arrays_ms": tick_arrays_ms,
+    }
+
+
+@benchmark("summary")
+def bench_summary(scale: int = 100000) -> Dict:
+    """
+    Environment summary with `scale` active disasters: the previous report
+    built by string += (time and peak memory), the running-tally summary,
+    and write_report() streaming the full listing to a file
+    """
+    import tracemalloc
+    from datetime import datetime
+    from environment import DISASTER_TYPES, SEVERITIES, DisasterEnvironment
+
+    random.seed(403)
+    environment = DisasterEnvironment()
+    for _ in range(scale):
+        environment._spawn_disaster(random.choice(environment.locations),
+                                    random.choice(DISASTER_TYPES), random.choice(SEVERITIES))
+
+    def concatenated() -> str:
+        summary = "\n" + "=" * 70 + "\n"
+        summary += "ENVIRONMENT STATUS SUMMARY\n"
+        summary += "=" * 70 + "\n"
+        summary += f"Active Disasters: {len(environment.active_disasters)}\n"
+        summary += f"Monitored Locations: {len(environment.locations)}\n"
+        summary += f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        summary += "=" * 70 + "\n\n"
+        summary += "ACTIVE DISASTERS:\n"
+        summary += "-" * 70 + "\n"
+        for disaster in environment.active_disasters:
+            summary += f"{disaster}\n"
+            summary += f"  Casualties: {disaster.casualties}, "
+            summary += f"Damage: {disaster.infrastructure_damage:.1f}%, "
+            summary += f"Area: {disaster.affected_area:.1f} km²\n"
+        summary += "-" * 70 + "\n"
+        return summary
+
+    def peak_bytes(render) -> int:
+        tracemalloc.start()
+        render()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    start = time.perf_counter()
+    concatenated()
+    concat_seconds = time.perf_counter() - start
+    concat_peak = peak_bytes(concatenated)
+
+    calls = 1000
+    start = time.perf_counter()
+    for _ in range(calls):
+        environment.get_summary()
+    summary_us = (time.perf_counter() - start) / calls * 1e6
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "report.txt")
+
+        def streamed():
+            with open(path, "w", encoding="utf-8") as f:
+                environment.write_report(f)
+
+        start = time.perf_counter()
+        streamed()
+        stream_seconds = time.perf_counter() - start
+        stream_peak = peak_bytes(streamed)
+        report_bytes = os.path.getsize(path)
+
+    return {
+        "active_disasters": scale,
+        "report_mb": report_bytes / 1e6,
+        "concat_report_seconds": concat_seconds,
+        "concat_peak_mb": concat_peak / 1e6,
+        "tally_summary_us": summary_us,
+        "stream_report_seconds": stream_seconds,
+        "stream_peak_mb": stream_peak / 1e6,
+    }
@@ -0,0 +1,136 @@
+"""
+Change-Only Disaster Alert Publishing
+
+Disasters stay active for several environment ticks, so publishing every
+active disaster on every tick repeats the same alert many times. This module
+keeps the last published severity of every event on the sensor side and
+turns each tick's percepts into NEW, ESCALATED and RESOLVED notices only. The matching
+`AlertLedger` lets the receiving side apply notices idempotently, so a repeated
+or reordered notice never triggers a second resource request.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List
+
+from environment import DisasterEvent, EnvironmentPercept, Severity
+
+
+NOTICE_NEW = "new"
+NOTICE_ESCALATED = "escalated"
+NOTICE_RESOLVED = "resolved"
+
+
+
+def disaster_content(disaster: DisasterEvent, notice: str) -> Dict:
+    """Build the INFORM body for a NEW or ESCALATED notice"""
+    return {
+        "message_type": "disaster_detected",
+        "notice": notice,
+        "location": disaster.location.name,
+        "latitude": disaster.location.latitude,
+        "longitude": disaster.location.longitude,
+        "disaster_type": disaster.disaster_type.value,
+        "severity": disaster.severity.name,
+        "casualties": disaster.casualties,
+        "infrastructure_damage": disaster.infrastructure_damage,
+        "resources_needed": disaster.resources_needed,
+        "event_id": disaster.event_id
+    }
+
+
+class ChangeOnlyPublisher:
+    """
+    Sensor-side severity cache that emits notices only when an event appears,
+    escalates or ends
+    """
+
+    def __init__(self):
+        self.severities: Dict[str, int] = {}
+
+    def diff(self, percepts: List[EnvironmentPercept]) -> List[Dict]:
+        """Compare this tick's percepts with the cache and return the notices to publish"""
+        notices = []
+        seen = set()
+
+        for percept in percepts:
+            for disaster in percept.active_disasters:
+                event_id = disaster.event_id
+                seen.add(event_id)
+                current = disaster.severity.value
+                previous = self.severities.get(event_id)
+
+                if previous is None:
+                    notices.append(disaster_content(disaster, NOTICE_NEW))
+                elif current > previous:
+                    notices.append(disaster_content(disaster, NOTICE_ESCALATED))
+                # A de-escalation is not published; it just refreshes the cache
+                self.severities[event_id] = current
+
+        for event_id in [e for e in self.severities if e not in seen]:
+            del self.severities[event_id]
+            notices.append({
+                "message_type": "disaster_resolved",
+                "notice": NOTICE_RESOLVED,
+                "event_id": event_id
+            })
+
+        return notices
+
+    def forget(self, event_id: str):
+        """Drop an event from the cache so it is announced again on the next tick"""
+        self.severities.pop(event_id, None)
+
+
+class AlertLedger:
+    """
+    Receiver-side record of handled events, used to apply notices idempotently.
+    Resolved event ids are remembered (the most recent `remember_resolved`),
+    so a NEW or ESCALATED that arrives after its RESOLVED is ignored instead
+    of requesting resources for a closed event.
+    """
+
+    def __init__(self, remember_resolved: int = 100_000):
+        self.severities: Dict[str, str] = {}
+        self.resolved: "OrderedDict[str, None]" = OrderedDict()
+        self.remember_resolved = remember_resolved
+        self.duplicates = 0
+
+    def apply(self, content: Dict) -> str:
+        """
+        Record a notice and return the action it calls for: "request" for an
+        event seen for the first time, "escalate" for a genuine severity
+        increase, "resolve" for a known event that ended, or "ignore".
+        """
+        event_id = content.get("event_id")
+        notice = content.get("notice", NOTICE_NEW)
+
+        if notice == NOTICE_RESOLVED:
+            # Remembered even when unknown: the NEW may still be on its way
+            self.resolved[event_id] = None
+            if len(self.resolved) > self.remember_resolved:
+                self.resolved.popitem(last=False)
+            if self.severities.pop(event_id, None) is None:
+                self.duplicates += 1
+                return "ignore"
+            return "resolve"
+
+        if event_id in self.resolved:
+            self.duplicates += 1
+            return "ignore"
+
+        severity = content.get("severity")
+        previous = self.severities.get(event_id)
+        if previous is None:
+            self.severities[event_id] = severity
+            return "request"
+
+        if _severity_rank(severity) > _severity_rank(previous):
+            self.severities[event_id] = severity
+            return "escalate"
+
+        self.duplicates += 1
+        return "ignore"
+
+
+def _severity_rank(name: str) -> int:
+    return Severity[name].value if name in Severity.__members__ else 0
@@ -0,0 +1,165 @@
+"""
+Buffered, Level-Gated Console Output
+
+The lab agents used to print every line straight to the terminal: a dozen
+lines per location per Lab 2 perception cycle, and one per trace entry in
+Labs 3 and 4. Under load the terminal writes took longer than the cycles.
+Console output now goes through one `Console`:
+
+    levels     DETAIL (per-location readings), INFO (agent traces) and
+               SUMMARY (one line per cycle, setup banners). Lines below the
+               active level are dropped before they are formatted: pass
+               %-style arguments instead of an f-string, or guard a block
+               with `if console.enabled(DETAIL)`.
+    buffering  lines are appended to a buffer and a writer thread writes
+               the batch to the stream in one call every `flush_interval`
+               seconds (sooner once `max_lines` are waiting), so an agent
+               never blocks on the terminal. flush() writes what is waiting
+               now; it also runs at exit.
+
+The shared instance `console` starts at DETAIL, which is what the labs
+always printed; `launcher.py --quiet` (SUMMARY) or `--log-level` lower it.
+
+    from console import DETAIL, console
+    console.detail("  Temperature: %.1f°C", percept.temperature)
+    console.summary("Cycle %d: %d disasters", cycle, count)
+"""
+
+import atexit
+import contextlib
+import sys
+import threading
+from typing import List, Optional, TextIO
+
+
+DETAIL = 10
+INFO = 20
+SUMMARY = 30
+SILENT = 100
+
+LEVELS = {"detail": DETAIL, "info": INFO, "summary": SUMMARY, "silent": SILENT}
+
+
+class Console:
+    """
+    Level filter in front of a buffered, background-flushed stream writer
+    """
+
+    def __init__(self, level: int = DETAIL, stream: Optional[TextIO] = None,
+                 flush_interval: float = 0.1, max_lines: int = 1000):
+        """stream: where lines go (default: sys.stdout at the time of each write)"""
+        self.level = level
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.max_lines = max_lines
+        self.lines_written = 0
+        self.lines_dropped = 0
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, level: int, message: str, *args):
+        """Queue `message % args` if `level` is enabled (nothing is formatted otherwise)"""
+        if level < self.level:
+            self.lines_dropped += 1
+            return
+        if args:
+            message = message % args
+        with self._lock:
+            self._buffer.append(message)
+            if len(self._buffer) >= self.max_lines:
+                self._ready.notify()
+        if self._writer is None:
+            self._start()
+
+    @contextlib.contextmanager
+    def at_level(self, level: int):
+        """Run a block at another level (SILENT to discard its output)"""
+        previous, self.level = self.level, level
+        try:
+            yield self
+        finally:
+            self.level = previous
+
+    def detail(self, message: str, *args):
+        self.log(DETAIL, message, *args)
+
+    def info(self, message: str, *args):
+        self.log(INFO, message, *args)
+
+    def summary(self, message: str, *args):
+        self.log(SUMMARY, message, *args)
+
+    def _start(self):
+        with self._lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(target=self._run, name="console-writer", daemon=True)
+            self._writer.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if len(self._buffer) < self.max_lines:
+                    self._ready.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write everything queued so far, in order"""
+        # One writer at a time keeps batches in order between the thread and callers
+        with self._write_lock:
+            with self._lock:
+                if not self._buffer:
+                    return
+                lines, self._buffer = self._buffer, []
+            stream = self.stream if self.stream is not None else sys.stdout
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+            self.lines_written += len(lines)
+
+
+console = Console()
+atexit.register(console.flush)
+
+
+def configure(level: Optional[int] = None, stream: Optional[TextIO] = None):
+    """Set the shared console's level and/or stream"""
+    console.flush()
+    if level is not None:
+        console.level = level
+    if stream is not None:
+        console.stream = stream
+
+
+def report_percepts(percepts, timestamp: str, out: Console = console) -> int:
+    """
+    The Lab 2 perception cycle report: every reading of every location at
+    DETAIL, one line for the cycle at SUMMARY. Returns the disasters seen.
+    """
+    disasters = sum(len(percept.active_disasters) for percept in percepts)
+    if out.enabled(DETAIL):
+        rule = "=" * 80
+        out.detail("%s\n[%s] PERCEPTION CYCLE\n%s\n", rule, timestamp, rule)
+        for percept in percepts:
+            out.detail("Location: %s\n  Temperature: %.1f°C\n  Humidity: %.1f%%\n"
+                       "  Water Level: %.2fm\n  Air Quality: %.1f",
+                       percept.location.name, percept.temperature, percept.humidity,
+                       percept.water_level, percept.air_quality)
+            if percept.active_disasters:
+                out.detail("  🚨 DISASTERS DETECTED:")
+                for disaster in percept.active_disasters:
+                    out.detail("     - %s\n       Severity: %s\n       Casualties: %d\n"
+                               "       Infrastructure Damage: %s%%\n       Affected Area: %.0f km²",
+                               disaster.disaster_type.value.upper(), disaster.severity.name,
+                               disaster.casualties, disaster.infrastructure_damage, disaster.affected_area)
+            else:
+                out.detail("  ✓ No active disasters")
+            out.detail("")
+        out.detail("%s\n", rule)
+    out.summary("[%s] Perception cycle: %d locations, %d active disasters", timestamp, len(percepts), disasters)
+    return disasters
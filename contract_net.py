@@ -0,0 +1,276 @@
+"""
+Contract-Net Resource Allocation
+
+With one CoordinatorAgent every REQUEST goes through a single mailbox and a
+single resource pool. In contract-net mode the response agent instead sends
+a CFP (call for proposals) to N regional coordinators:
+
+    response  --cfp-->             every coordinator
+    response  <--propose/refuse--  each coordinator: what it can commit, how far away
+    response  --accept-proposal--> the best bid (reject-proposal to the others)
+    response  <--confirm/failure-- the winner; on failure the next-best bid is accepted
+
+A winner that neither confirms nor fails within the confirm timeout is
+treated like a FAILURE, so a lost reply or a stopped coordinator cannot keep
+a CFP open for good.
+
+Bids are ranked by fit (the fraction of the requested units the coordinator
+can commit) and then by distance to the disaster, so a depleted region
+loses to one with spare capacity and capacity grows with the number of
+coordinators. Bidding closes when every coordinator has answered or when
+the bid deadline passes, whichever comes first.
+
+This module holds the protocol bookkeeping without SPADE: the initiator
+side (ContractNetInitiator) and the participant side (make_proposal and
+commit_proposal over a coordinator's resource dicts).
+"""
+
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass, asdict, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+CONTRACT_NET_PROTOCOL = "fipa-contract-net"
+EARTH_RADIUS_KM = 6371.0
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in km"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+@dataclass
+class Proposal:
+    """One coordinator's bid for a CFP"""
+    participant: str
+    resources: Dict[str, int]
+    fit: float                  # committed units / requested units of the resources it manages
+    distance_km: float
+
+    def rank(self) -> Tuple[float, float]:
+        return (self.fit, -self.distance_km)
+
+
+# --- Participant (coordinator) side ---
+
+def make_proposal(participant: str, available: Dict[str, int], request: Dict,
+                  latitude: Optional[float] = None, longitude: Optional[float] = None) -> Optional[Proposal]:
+    """
+    Bid for a CFP from a coordinator's available resources, or None to refuse
+    (none of the requested resources managed here, or none left)
+    """
+    needed = {resource: amount for resource, amount in request.get("resources_needed", {}).items()
+              if resource in available and amount > 0}
+    if not needed:
+        return None
+    offer = {resource: min(amount, available[resource]) for resource, amount in needed.items()}
+    committed = sum(offer.values())
+    if not committed:
+        return None
+
+    distance = 0.0
+    if None not in (latitude, longitude, request.get("latitude"), request.get("longitude")):
+        distance = distance_km(latitude, longitude, request["latitude"], request["longitude"])
+    return Proposal(
+        participant=participant,
+        resources={resource: amount for resource, amount in offer.items() if amount},
+        fit=committed / sum(needed.values()),
+        distance_km=distance,
+    )
+
+
+def commit_proposal(available: Dict[str, int], allocated: Dict[str, Dict[str, int]],
+                    event_id: str, resources: Dict[str, int]) -> bool:
+    """
+    Deduct an accepted proposal from the coordinator's pool. False if the
+    resources have gone since the bid; True again for an event already committed.
+    """
+    if event_id in allocated:
+        return True
+    if any(available.get(resource, 0) < amount for resource, amount in resources.items()):
+        return False
+    for resource, amount in resources.items():
+        available[resource] -= amount
+    allocated[event_id] = dict(resources)
+    return True
+
+
+# --- Initiator (response agent) side ---
+
+@dataclass
+class CallForProposals:
+    """Bids collected for one CFP"""
+    conversation_id: str
+    request: Dict
+    participants: Tuple[str, ...]
+    deadline: float             # bid deadline, then the awarded proposal's confirm deadline
+    proposals: List[Proposal] = field(default_factory=list)
+    replied: Set[str] = field(default_factory=set)
+    tried: Set[str] = field(default_factory=set)     # participants whose proposal was accepted
+    awarded: Optional[Proposal] = None
+
+
+@dataclass
+class ContractNetStats:
+    """Counters since the initiator was created"""
+    cfps: int = 0
+    proposals: int = 0
+    refusals: int = 0
+    awarded: int = 0            # CFPs that ended with a CONFIRM
+    failures: int = 0           # accepted proposals the winner could no longer honour
+    confirm_timeouts: int = 0   # accepted proposals the winner never answered
+    cancelled: int = 0          # CFPs closed because the disaster resolved
+    unfilled: int = 0           # CFPs that ended without any usable proposal
+    late_replies: int = 0
+
+
+class ContractNetInitiator:
+    """
+    Open CFPs by conversation-id, with a bid-deadline heap
+    """
+
+    def __init__(self, participants: List[str], bid_timeout: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic, confirm_timeout: float = 5.0):
+        """
+        bid_timeout: seconds to collect bids before awarding with what has arrived
+        confirm_timeout: seconds to wait for the winner's CONFIRM or FAILURE
+        before awarding the next-best bid
+        """
+        self.participants = tuple(participants)
+        self.bid_timeout = bid_timeout
+        self.confirm_timeout = confirm_timeout
+        self.clock = clock
+        self.open: Dict[str, CallForProposals] = {}
+        self.by_event: Dict[str, str] = {}
+        self._deadlines: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self.stats = ContractNetStats()
+
+    def __len__(self) -> int:
+        return len(self.open)
+
+    def start(self, conversation_id: str, request: Dict) -> CallForProposals:
+        """Record a CFP that is being sent to every participant"""
+        deadline = self.clock() + self.bid_timeout
+        cfp = CallForProposals(conversation_id, request, self.participants, deadline)
+        self.open[conversation_id] = cfp
+        if request.get("event_id"):
+            self.by_event[request["event_id"]] = conversation_id
+        heapq.heappush(self._deadlines, (deadline, next(self._sequence), conversation_id))
+        self.stats.cfps += 1
+        return cfp
+
+    def on_propose(self, conversation_id: str, proposal: Proposal) -> Optional[CallForProposals]:
+        """Record a bid. Returns the CFP once every participant has answered (ready to award)."""
+        cfp = self._bidding(conversation_id, proposal.participant)
+        if cfp is None:
+            return None
+        cfp.proposals.append(proposal)
+        self.stats.proposals += 1
+        return cfp if len(cfp.replied) == len(cfp.participants) else None
+
+    def on_refuse(self, conversation_id: str, participant: str) -> Optional[CallForProposals]:
+        """Record a refusal to bid. Returns the CFP once every participant has answered."""
+        cfp = self._bidding(conversation_id, participant)
+        if cfp is None:
+            return None
+        self.stats.refusals += 1
+        return cfp if len(cfp.replied) == len(cfp.participants) else None
+
+    def expired(self, now: Optional[float] = None) -> List[CallForProposals]:
+        """
+        CFPs to award now: those whose bid deadline passed before every
+        participant answered, and those whose winner missed its confirm
+        deadline (counted as a failure of that winner)
+        """
+        now = self.clock() if now is None else now
+        due = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, _, conversation_id = heapq.heappop(self._deadlines)
+            cfp = self.open.get(conversation_id)
+            if cfp is None or cfp.deadline != deadline:
+                continue   # closed, or superseded by a later deadline
+            if cfp.awarded is not None:
+                self.stats.confirm_timeouts += 1
+                cfp.awarded = None
+                due.append(cfp)
+            elif not cfp.tried:
+                due.append(cfp)
+        return due
+
+    def award(self, cfp: CallForProposals) -> Optional[Proposal]:
+        """
+        Pick the best proposal not yet tried. None means no usable proposal is
+        left and the CFP is closed unfilled.
+        """
+        candidates = [proposal for proposal in cfp.proposals if proposal.participant not in cfp.tried]
+        if not candidates:
+            cfp.awarded = None
+            self.stats.unfilled += 1
+            self._close(cfp)
+            return None
+        best = max(candidates, key=Proposal.rank)
+        cfp.awarded = best
+        cfp.tried.add(best.participant)
+        cfp.deadline = self.clock() + self.confirm_timeout
+        heapq.heappush(self._deadlines, (cfp.deadline, next(self._sequence), cfp.conversation_id))
+        return best
+
+    def losers(self, cfp: CallForProposals) -> List[str]:
+        """Participants that bid but were not awarded (to send REJECT-PROPOSAL)"""
+        return [proposal.participant for proposal in cfp.proposals
+                if cfp.awarded is None or proposal.participant != cfp.awarded.participant]
+
+    def on_failure(self, conversation_id: str, participant: str) -> Optional[CallForProposals]:
+        """The winner could not honour its bid; returns the CFP to award again, if still open"""
+        cfp = self.open.get(conversation_id)
+        if cfp is None or cfp.awarded is None or cfp.awarded.participant != participant:
+            self.stats.late_replies += 1
+            return None
+        self.stats.failures += 1
+        cfp.awarded = None
+        return cfp
+
+    def on_confirm(self, conversation_id: str, participant: str) -> Optional[CallForProposals]:
+        """The winner committed the resources; the CFP is done"""
+        cfp = self.open.get(conversation_id)
+        if cfp is None or cfp.awarded is None or cfp.awarded.participant != participant:
+            self.stats.late_replies += 1
+            return None
+        self.stats.awarded += 1
+        self._close(cfp)
+        return cfp
+
+    def cancel_event(self, event_id: str) -> Optional[CallForProposals]:
+        """Close the open CFP about a disaster that no longer needs resources"""
+        cfp = self.open.get(self.by_event.get(event_id, ""))
+        if cfp is None:
+            return None
+        self.stats.cancelled += 1
+        self._close(cfp)
+        return cfp
+
+    def _close(self, cfp: CallForProposals):
+        self.open.pop(cfp.conversation_id, None)
+        event_id = cfp.request.get("event_id")
+        if self.by_event.get(event_id) == cfp.conversation_id:
+            del self.by_event[event_id]
+
+    def snapshot(self) -> Dict:
+        """Open CFPs and counters for monitoring"""
+        bidding = sum(1 for cfp in self.open.values() if cfp.awarded is None)
+        return {"bidding": bidding, "awaiting_confirm": len(self.open) - bidding, **asdict(self.stats)}
+
+    def _bidding(self, conversation_id: str, participant: str) -> Optional[CallForProposals]:
+        """The CFP still collecting bids from this participant, or None for a late reply"""
+        cfp = self.open.get(conversation_id)
+        if cfp is None or cfp.tried or participant in cfp.replied or participant not in cfp.participants:
+            self.stats.late_replies += 1
+            return None
+        cfp.replied.add(participant)
+        return cfp
@@ -0,0 +1,241 @@
+"""
+Conversation Tracking for Resource Requests
+
+The Lab 4 response agent sends a REQUEST per new disaster and used to
+forget it at once: a lost AGREE, REFUSE or CONFIRM went unnoticed, and only
+log lines tied a reply to the INFORM that caused it. ConversationTable
+keeps one entry per conversation-id with its FIPA-request protocol state:
+
+    REQUESTED --agree--> AGREED --confirm--> CONFIRMED
+    REQUESTED --confirm--> CONFIRMED        (AGREE lost or overtaken)
+    REQUESTED --refuse--> REFUSED
+
+Each open conversation has a reply deadline. Deadlines live in a min-heap
+(with lazy deletion of superseded entries), so finding what has expired is
+O(log n) per expiry however many conversations are open. On expiry the
+RetryPolicy says whether to resend the REQUEST, with a growing timeout, or
+give up and escalate.
+"""
+
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class ConversationState(Enum):
+    """Protocol state of one resource-allocation conversation"""
+    REQUESTED = "REQUESTED"     # waiting for AGREE or REFUSE
+    AGREED = "AGREED"           # waiting for CONFIRM
+    CONFIRMED = "CONFIRMED"
+    REFUSED = "REFUSED"
+    ESCALATED = "ESCALATED"     # no reply after every retry
+    CANCELLED = "CANCELLED"     # the disaster resolved first
+
+
+OPEN_STATES = (ConversationState.REQUESTED, ConversationState.AGREED)
+
+# (state, performative received) -> new state
+REPLY_TRANSITIONS: Dict[Tuple[ConversationState, str], ConversationState] = {
+    (ConversationState.REQUESTED, "agree"): ConversationState.AGREED,
+    (ConversationState.REQUESTED, "refuse"): ConversationState.REFUSED,
+    (ConversationState.REQUESTED, "confirm"): ConversationState.CONFIRMED,
+    (ConversationState.AGREED, "confirm"): ConversationState.CONFIRMED,
+}
+
+RETRY = "retry"
+ESCALATE = "escalate"
+
+
+@dataclass
+class RetryPolicy:
+    """
+    timeout: seconds to wait for the next reply
+    max_retries: REQUEST resends before escalating (0 escalates on the first timeout)
+    backoff: each retry waits this many times longer than the previous attempt
+    """
+    timeout: float = 10.0
+    max_retries: int = 2
+    backoff: float = 2.0
+
+    def timeout_for(self, attempt: int) -> float:
+        """Reply timeout of the given attempt (1 for the original REQUEST)"""
+        return self.timeout * self.backoff ** (attempt - 1)
+
+
+@dataclass
+class Conversation:
+    """One REQUEST conversation and where it is in the protocol"""
+    conversation_id: str
+    event_id: Optional[str]
+    request: Dict                   # REQUEST content, kept for resends
+    state: ConversationState = ConversationState.REQUESTED
+    attempts: int = 1
+    opened_at: float = 0.0
+    updated_at: float = 0.0
+    deadline: float = 0.0
+
+
+@dataclass
+class ConversationStats:
+    """Counters since the table was created"""
+    opened: int = 0
+    confirmed: int = 0
+    refused: int = 0
+    retried: int = 0
+    escalated: int = 0
+    cancelled: int = 0
+    late_replies: int = 0           # reply for a conversation that already closed
+    unknown_replies: int = 0        # reply for a conversation-id never opened here
+    out_of_order: int = 0           # reply not valid in the conversation's state
+    reply_seconds_total: float = 0.0
+
+
+class ConversationTable:
+    """
+    Open conversations indexed by conversation-id and event id, with a
+    deadline heap for timeouts
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None,
+                 clock: Callable[[], float] = time.monotonic, remember_closed: int = 10_000):
+        """remember_closed: how many closed conversations to keep for recognizing late replies"""
+        self.policy = policy or RetryPolicy()
+        self.clock = clock
+        self.open: Dict[str, Conversation] = {}
+        self.by_event: Dict[str, str] = {}              # event_id -> conversation_id
+        self.closed: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._remember_closed = remember_closed
+        self._deadlines: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self.stats = ConversationStats()
+
+    def __len__(self) -> int:
+        return len(self.open)
+
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        return self.open.get(conversation_id) or self.closed.get(conversation_id)
+
+    def start(self, conversation_id: str, request: Dict, event_id: Optional[str] = None) -> Conversation:
+        """Record a REQUEST that has just been sent"""
+        now = self.clock()
+        conversation = Conversation(conversation_id, event_id, request, opened_at=now, updated_at=now)
+        self.open[conversation_id] = conversation
+        if event_id is not None:
+            self.by_event[event_id] = conversation_id
+        self._schedule(conversation, now + self.policy.timeout_for(1))
+        self.stats.opened += 1
+        return conversation
+
+    def on_reply(self, conversation_id: str, performative: str) -> Optional[Conversation]:
+        """
+        Apply an AGREE, REFUSE or CONFIRM. Returns the conversation if the
+        reply moved it on, or None for unknown, late and out-of-order replies.
+        """
+        conversation = self.open.get(conversation_id)
+        if conversation is None:
+            if conversation_id in self.closed:
+                self.stats.late_replies += 1
+            else:
+                self.stats.unknown_replies += 1
+            return None
+
+        new_state = REPLY_TRANSITIONS.get((conversation.state, performative))
+        if new_state is None:
+            self.stats.out_of_order += 1
+            return None
+
+        now = self.clock()
+        conversation.state = new_state
+        conversation.updated_at = now
+        if new_state is ConversationState.AGREED:
+            # The CONFIRM gets a fresh deadline
+            self._schedule(conversation, now + self.policy.timeout_for(conversation.attempts))
+        else:
+            if new_state is ConversationState.CONFIRMED:
+                self.stats.confirmed += 1
+            else:
+                self.stats.refused += 1
+            self.stats.reply_seconds_total += now - conversation.opened_at
+            self._close(conversation)
+        return conversation
+
+    def cancel_event(self, event_id: str) -> Optional[Conversation]:
+        """Close the open conversation about a disaster that no longer needs resources"""
+        conversation = self.open.get(self.by_event.get(event_id, ""))
+        if conversation is None:
+            return None
+        conversation.state = ConversationState.CANCELLED
+        conversation.updated_at = self.clock()
+        self.stats.cancelled += 1
+        self._close(conversation)
+        return conversation
+
+    def expire(self, now: Optional[float] = None) -> List[Tuple[Conversation, str]]:
+        """
+        Handle every deadline that has passed. Returns (conversation, RETRY)
+        for REQUESTs to resend and (conversation, ESCALATE) for conversations
+        given up on.
+        """
+        now = self.clock() if now is None else now
+        due = []
+        # self._deadlines, not a local: a retry can rebuild the heap
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, _, conversation_id = heapq.heappop(self._deadlines)
+            conversation = self.open.get(conversation_id)
+            if conversation is None or conversation.deadline != deadline:
+                continue   # closed, or superseded by a later deadline
+
+            conversation.updated_at = now
+            if conversation.attempts <= self.policy.max_retries:
+                conversation.attempts += 1
+                conversation.state = ConversationState.REQUESTED
+                self._schedule(conversation, now + self.policy.timeout_for(conversation.attempts))
+                self.stats.retried += 1
+                due.append((conversation, RETRY))
+            else:
+                conversation.state = ConversationState.ESCALATED
+                self.stats.escalated += 1
+                self._close(conversation)
+                due.append((conversation, ESCALATE))
+        return due
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest pending deadline (possibly a superseded one), or None"""
+        return self._deadlines[0][0] if self._deadlines else None
+
+    def counts(self) -> Dict[str, int]:
+        """Open conversations per protocol state"""
+        counts = {state.value: 0 for state in OPEN_STATES}
+        for conversation in self.open.values():
+            counts[conversation.state.value] += 1
+        return counts
+
+    def snapshot(self) -> Dict:
+        """In-flight counts and counters for monitoring"""
+        closed = self.stats.confirmed + self.stats.refused
+        return {
+            "in_flight": len(self.open),
+            **self.counts(),
+            **asdict(self.stats),
+            "mean_reply_seconds": self.stats.reply_seconds_total / closed if closed else 0.0,
+        }
+
+    def _schedule(self, conversation: Conversation, deadline: float):
+        conversation.deadline = deadline
+        heapq.heappush(self._deadlines, (deadline, next(self._sequence), conversation.conversation_id))
+        if len(self._deadlines) > 2 * len(self.open) + 64:
+            # Mostly superseded entries: rebuild from the live deadlines
+            self._deadlines = [(c.deadline, next(self._sequence), c.conversation_id) for c in self.open.values()]
+            heapq.heapify(self._deadlines)
+
+    def _close(self, conversation: Conversation):
+        del self.open[conversation.conversation_id]
+        if conversation.event_id is not None and self.by_event.get(conversation.event_id) == conversation.conversation_id:
+            del self.by_event[conversation.event_id]
+        self.closed[conversation.conversation_id] = conversation
+        if len(self.closed) > self._remember_closed:
+            self.closed.popitem(last=False)
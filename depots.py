@@ -0,0 +1,243 @@
+"""
+Resource Depots and Nearest-Depot Dispatch
+
+The Lab 3 DISPATCHING state used to log "Send N rescue teams" from nowhere in
+particular. A DepotNetwork gives resources a place: each Depot has a position
+and its own stock, and a dispatch draws every resource from the depots with
+stock nearest to the disaster, nearest first, until the need is met.
+
+Travel cost is great-circle distance times a road detour factor, in km,
+precomputed as a (location, depot) matrix once and cached on disk under a
+hash of the coordinates (like generated geographies). From the matrix each
+location gets its depots in cost order, so a dispatch never compares costs:
+
+    cursor[resource][location]  position in the location's depot order of the
+                                first depot that may hold the resource; the
+                                depots before it are known to be empty
+
+A lookup skips forward past depots that ran out since (each emptied depot
+is skipped once per location), so repeated dispatch decisions are O(1)
+amortized. Restocking an empty depot moves the cursors back to it for the
+locations that had passed it, in one vectorized update.
+
+Resources are lent, not consumed: a dispatch for an event_id is remembered,
+and return_shipments(event_id) restocks each depot with what it sent once
+the response to that disaster is over.
+
+    network = DepotNetwork(regional_depots(environment.locations, 3), environment.locations)
+    for shipment in network.dispatch(disaster.location, disaster.resources_needed, disaster.event_id):
+        print(shipment)
+    ...
+    network.return_shipments(disaster.event_id)
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from environment import Location
+from geography import DEFAULT_CACHE_DIR
+from spread import haversine_km
+
+
+MATRIX_VERSION = 1
+# Roads are longer than the great circle; a typical circuity for regional road networks
+DETOUR_FACTOR = 1.3
+DEFAULT_STOCK = {"rescue_teams": 20, "medical_kits": 100}
+
+
+@dataclass
+class Depot:
+    """A resource store at a fixed position"""
+    name: str
+    location: Location
+    stock: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_STOCK))
+
+
+@dataclass(frozen=True)
+class Shipment:
+    """Part of a dispatch: `amount` of one resource from one depot"""
+    depot: str
+    resource: str
+    amount: int
+    cost_km: float
+
+    def __str__(self):
+        return f"{self.amount} {self.resource.replace('_', ' ')} from {self.depot} ({self.cost_km:.0f} km)"
+
+
+def regional_depots(locations: Sequence[Location], count: int,
+                    stock: Optional[Dict[str, int]] = None) -> List[Depot]:
+    """`count` depots spread over the location list, each with a copy of `stock`"""
+    if not locations:
+        raise ValueError("depots need at least one location to be placed at")
+    stock = DEFAULT_STOCK if stock is None else stock
+    depots = []
+    for index in range(count):
+        location = locations[index * len(locations) // count]
+        depots.append(Depot(f"depot_{index + 1}", location, dict(stock)))
+    return depots
+
+
+def travel_cost_matrix(location_lat: np.ndarray, location_lon: np.ndarray,
+                       depot_lat: np.ndarray, depot_lon: np.ndarray,
+                       detour_factor: float = DETOUR_FACTOR,
+                       cache_dir: Optional[Path] = DEFAULT_CACHE_DIR) -> np.ndarray:
+    """(location, depot) road-km estimates, loaded from `cache_dir` when computed before"""
+    path = None
+    if cache_dir is not None:
+        digest = hashlib.sha1()
+        digest.update(np.array([MATRIX_VERSION, detour_factor], dtype=np.float64).tobytes())
+        for array in (location_lat, location_lon, depot_lat, depot_lon):
+            digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+        path = Path(cache_dir) / f"travel-{digest.hexdigest()[:16]}.npy"
+        if path.exists():
+            return np.load(path)
+
+    cost = np.empty((len(location_lat), len(depot_lat)), dtype=np.float32)
+    for depot in range(len(depot_lat)):
+        cost[:, depot] = haversine_km(location_lat, location_lon, depot_lat[depot], depot_lon[depot]) * detour_factor
+
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write under a temporary name so a concurrent reader never sees a partial file
+        partial = path.with_name(path.name + ".partial")
+        with open(partial, "wb") as f:
+            np.save(f, cost)
+        partial.replace(path)
+    return cost
+
+
+class DepotNetwork:
+    """
+    Depots with per-resource stock and cost-ordered depot lists per location
+    """
+
+    def __init__(self, depots: Sequence[Depot], locations: Sequence[Location],
+                 detour_factor: float = DETOUR_FACTOR, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR):
+        if not depots:
+            raise ValueError("a depot network needs at least one depot")
+        self.depots = list(depots)
+        self.depot_index = {depot.name: i for i, depot in enumerate(self.depots)}
+        self.location_index = {location.name: i for i, location in enumerate(locations)}
+        self.detour_factor = detour_factor
+        self._depot_lat = np.array([depot.location.latitude for depot in self.depots])
+        self._depot_lon = np.array([depot.location.longitude for depot in self.depots])
+
+        self.cost = travel_cost_matrix(
+            np.array([location.latitude for location in locations], dtype=np.float64),
+            np.array([location.longitude for location in locations], dtype=np.float64),
+            self._depot_lat, self._depot_lon, detour_factor, cache_dir
+        )
+        # order[l]: depots by cost from location l; rank[l, d]: position of depot d in it
+        self.order = np.argsort(self.cost, axis=1, kind="stable").astype(np.int32)
+        self.rank = np.empty_like(self.order)
+        np.put_along_axis(self.rank, self.order, np.arange(len(self.depots), dtype=np.int32)[None, :], axis=1)
+
+        resources = sorted({resource for depot in self.depots for resource in depot.stock})
+        self.stock = {
+            resource: np.array([depot.stock.get(resource, 0) for depot in self.depots], dtype=np.int64)
+            for resource in resources
+        }
+        self._cursor = {resource: np.zeros(len(locations), dtype=np.int32) for resource in resources}
+        # event_id -> shipments still out with that disaster
+        self.shipped: Dict[str, List[Shipment]] = {}
+
+    def _row(self, location: Location) -> Tuple[Optional[int], np.ndarray, np.ndarray]:
+        """(location index or None, depot order, costs) for a location, computed if it is not indexed"""
+        index = self.location_index.get(location.name)
+        if index is not None:
+            return index, self.order[index], self.cost[index]
+        cost = (haversine_km(location.latitude, location.longitude, self._depot_lat, self._depot_lon)
+                * self.detour_factor).astype(np.float32)
+        return None, np.argsort(cost, kind="stable").astype(np.int32), cost
+
+    def _first_stocked(self, resource: str, index: Optional[int], order: np.ndarray, start: int = 0) -> int:
+        """Position in `order` of the first depot from `start` on with stock (len(order) if none)"""
+        stock = self.stock[resource]
+        position = start
+        if index is not None and start == 0:
+            position = int(self._cursor[resource][index])
+        while position < len(order) and stock[order[position]] <= 0:
+            position += 1
+        if index is not None and start == 0:
+            self._cursor[resource][index] = position
+        return position
+
+    def nearest_stocked(self, location: Location, resource: str) -> Optional[Tuple[Depot, float]]:
+        """The cheapest depot to reach `location` from that holds any of `resource`, and its cost"""
+        if resource not in self.stock:
+            return None
+        index, order, cost = self._row(location)
+        position = self._first_stocked(resource, index, order)
+        if position == len(order):
+            return None
+        depot = int(order[position])
+        return self.depots[depot], float(cost[depot])
+
+    def plan(self, location: Location, needs: Dict[str, int], commit: bool = False) -> List[Shipment]:
+        """
+        Shipments that cover `needs` from the nearest stocked depots (as much as
+        the depots hold). With commit=True the stock is deducted.
+        """
+        index, order, cost = self._row(location)
+        shipments = []
+        for resource, needed in needs.items():
+            if needed <= 0 or resource not in self.stock:
+                continue
+            stock = self.stock[resource]
+            position = self._first_stocked(resource, index, order)
+            while needed > 0 and position < len(order):
+                depot = int(order[position])
+                amount = int(min(needed, stock[depot]))
+                shipments.append(Shipment(self.depots[depot].name, resource, amount, float(cost[depot])))
+                needed -= amount
+                if commit:
+                    stock[depot] -= amount
+                    self.depots[depot].stock[resource] = int(stock[depot])
+                position = self._first_stocked(resource, index, order, position + 1)
+        return shipments
+
+    def dispatch(self, location: Location, needs: Dict[str, int],
+                 event_id: Optional[str] = None) -> List[Shipment]:
+        """
+        plan() and deduct the shipped stock, remembered under event_id for
+        return_shipments(). A repeated dispatch for the same event_id only
+        ships the shortfall against what is already out with it, so its
+        returns are the new shipments only.
+        """
+        if event_id is not None and event_id in self.shipped:
+            sent: Dict[str, int] = {}
+            for shipment in self.shipped[event_id]:
+                sent[shipment.resource] = sent.get(shipment.resource, 0) + shipment.amount
+            needs = {resource: amount - sent.get(resource, 0) for resource, amount in needs.items()}
+        shipments = self.plan(location, needs, commit=True)
+        if event_id is not None and shipments:
+            self.shipped.setdefault(event_id, []).extend(shipments)
+        return shipments
+
+    def return_shipments(self, event_id: str) -> List[Shipment]:
+        """Put everything dispatched for event_id back into the depots it came from"""
+        shipments = self.shipped.pop(event_id, [])
+        for shipment in shipments:
+            self.restock(shipment.depot, shipment.resource, shipment.amount)
+        return shipments
+
+    def restock(self, depot_name: str, resource: str, amount: int):
+        """Add stock to a depot; locations that had skipped it see it again"""
+        depot = self.depot_index[depot_name]
+        if resource not in self.stock:
+            self.stock[resource] = np.zeros(len(self.depots), dtype=np.int64)
+            self._cursor[resource] = np.zeros(len(self.location_index), dtype=np.int32)
+        stock = self.stock[resource]
+        was_empty = stock[depot] <= 0
+        stock[depot] += amount
+        self.depots[depot].stock[resource] = int(stock[depot])
+        if was_empty and stock[depot] > 0:
+            np.minimum(self._cursor[resource], self.rank[:, depot], out=self._cursor[resource])
+
+    def total_stock(self) -> Dict[str, int]:
+        return {resource: int(stock.sum()) for resource, stock in self.stock.items()}
@@ -8,7 +8,7 @@ import random
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, TextIO
 
 class DisasterType(Enum):
     """
@@ -66,10 +66,12 @@ class DisasterEvent:
         return f"DisasterEvent(id={self.event_id}, type={self.disaster_type.value}, location={self.location}, severity={self.severity.name}, timestamp={self.timestamp.isoformat()}, affected_area={self.affected_area} sq km, casualties={self.casualties}, infrastructure_damage={self.infrastructure_damage}%, resources_needed={self.resources_needed})"
 
 
-@dataclass
+@dataclass(frozen=True)
 class EnvironmentPercept:
     """
-    Represents the percept of the environment for an autonomous agent
+    Represents the percept of the environment for an autonomous agent.
+    Percepts are read-only snapshots; within one tick the environment hands
+    the same instance to every caller.
     """
 
     timestamp: datetime
@@ -81,26 +83,170 @@ class EnvironmentPercept:
     seismic_activity: float
     water_level: float
     smoke_detected: bool
-    active_disasters: List[DisasterEvent]
+    active_disasters: Sequence[DisasterEvent]
 
     def __str__(self):
         return f"EnvironmentPercept(timestamp={self.timestamp.isoformat()}, location={self.location}, temperature={self.temperature}°C, humidity={self.humidity}%, wind_speed={self.wind_speed} km/h, air_quality={self.air_quality} AQI, seismic_activity={self.seismic_activity} Richter, water_level={self.water_level} m, smoke_detected={self.smoke_detected}, active_disasters=[{', '.join(str(d) for d in self.active_disasters)}])"
     
+DISASTER_TYPES = tuple(DisasterType)
+SEVERITIES = tuple(Severity)
+
+
+class DisasterTally:
+    """
+    Running aggregates over the active disasters, kept up to date as they
+    spawn and resolve so a summary never walks the disaster list
+    """
+
+    def __init__(self, disasters: Sequence[DisasterEvent] = ()):
+        self.spawned = 0
+        self.resolved = 0
+        self.sync(disasters)
+
+    def sync(self, disasters: Sequence[DisasterEvent]):
+        """Recount from scratch (after active_disasters was replaced directly)"""
+        self.count = 0
+        self.by_type: Dict[DisasterType, int] = dict.fromkeys(DISASTER_TYPES, 0)
+        self.by_severity: Dict[Severity, int] = dict.fromkeys(SEVERITIES, 0)
+        self.casualties = 0
+        self.damage_total = 0.0
+        self.affected_area = 0.0
+        for disaster in disasters:
+            self._count(disaster, 1)
+
+    def _count(self, disaster: DisasterEvent, sign: int):
+        self.count += sign
+        self.by_type[disaster.disaster_type] += sign
+        self.by_severity[disaster.severity] += sign
+        self.casualties += sign * disaster.casualties
+        self.damage_total += sign * disaster.infrastructure_damage
+        self.affected_area += sign * disaster.affected_area
+        if self.count == 0:
+            # Drop the rounding error left by adding and subtracting floats
+            self.damage_total = self.affected_area = 0.0
+
+    def add(self, disaster: DisasterEvent):
+        self.spawned += 1
+        self._count(disaster, 1)
+
+    def remove(self, disaster: DisasterEvent):
+        self.resolved += 1
+        self._count(disaster, -1)
+
+    @property
+    def average_damage(self) -> float:
+        return self.damage_total / self.count if self.count else 0.0
+
+
 class DisasterEnvironment:
     """
     Simulated disaster environment for testing autonomous agents
     """
 
-    def __init__(self):
+    def __init__(self, scenario=None, locations: Optional[List[Location]] = None,
+                 conditions: Optional[Dict[str, Dict]] = None):
+        """
+        scenario: optional geography.Scenario. When given, its generated locations,
+        climate baselines and disaster base rates replace the five lab locations.
+        locations, conditions: existing state (e.g. from a snapshot) to use
+        instead of initializing it
+        """
+        self.scenario = scenario
         self.event_counter = 0
         self.active_disasters: List[DisasterEvent] = []
-        self.locations: List[Location] = self.initialize_locations()
-        self.current_conditions: Dict[str, float] = self.initialize_conditions()
+        self.disaster_tally = DisasterTally()
+        self.locations: List[Location] = locations if locations is not None else self.initialize_locations()
+        self.current_conditions: Dict[str, float] = (
+            conditions if conditions is not None else self.initialize_conditions()
+        )
+        self.spread_model = None
+        self.history = None
+        self.geo_index = None
+
+        # Percepts built since the environment last changed, shared by all callers
+        self.percept_version = 0
+        self.percept_cache_hits = 0
+        self.percept_cache_misses = 0
+        self._percept_cache: Dict[str, EnvironmentPercept] = {}
+        self._all_percepts: Optional[List[EnvironmentPercept]] = None
+
+        # hazard_rates.DisasterSampler: set by enable_hazard_rates(), or built
+        # from the scenario's base rates on its first draw
+        self.disaster_sampler = None
+        self._scenario_sampler = None
+
+    def invalidate_percepts(self):
+        """
+        Drop cached percepts. The environment calls this itself whenever it
+        changes; call it after modifying current_conditions or
+        active_disasters directly (and disaster_tally.sync, plus
+        geo_index.sync_disasters if enabled, after replacing active_disasters).
+        """
+        self.percept_version += 1
+        self._percept_cache = {}
+        self._all_percepts = None
+
+    def percept_cache_stats(self) -> Dict[str, int]:
+        return {
+            "version": self.percept_version,
+            "hits": self.percept_cache_hits,
+            "misses": self.percept_cache_misses,
+        }
+
+    def enable_spread(self, radius_km: float = 15.0, **options):
+        """
+        Let fires, floods and storms propagate to locations within radius_km
+        (see spread.py; needs NumPy)
+        """
+        from spread import SpreadModel
+        self.spread_model = SpreadModel(self.locations, radius_km=radius_km, **options)
+        return self.spread_model
+
+    def enable_history(self, capacity: int = 32):
+        """
+        Keep the last `capacity` ticks of conditions at every location, with
+        rolling statistics (see history.py; needs NumPy)
+        """
+        from history import ConditionHistory
+        self.history = ConditionHistory([location.name for location in self.locations], capacity)
+        return self.history
+
+    def enable_hazard_rates(self, rates):
+        """
+        Spawn disasters from a hazard_rates.HazardRates table instead of the
+        single 80% draw: every tick draws all of its spawns at once, each
+        placed, typed and graded in proportion to the table
+        """
+        self.disaster_sampler = rates.compile()
+        return self.disaster_sampler
+
+    def enable_geo_index(self, cell_km: Optional[float] = None):
+        """
+        Index locations and active disasters by coordinates for radius and
+        nearest queries (see geo_index.py; needs NumPy)
+        """
+        from geo_index import GeoIndex
+        self.geo_index = GeoIndex(self.locations, cell_km=cell_km)
+        self.geo_index.sync_disasters(self.active_disasters)
+        return self.geo_index
+
+    def disasters_within(self, latitude: float, longitude: float, radius_km: float) -> List[DisasterEvent]:
+        """Active disasters within radius_km of a point, nearest first"""
+        index = self.geo_index or self.enable_geo_index()
+        return [disaster for disaster, _ in index.disasters_within(latitude, longitude, radius_km)]
+
+    def locations_affected(self, disaster: DisasterEvent) -> List[Location]:
+        """Locations inside the disaster's affected_area (km², as a circle around its location)"""
+        index = self.geo_index or self.enable_geo_index()
+        return index.locations_affected(disaster)
 
     def initialize_locations(self) -> List[Location]:
         """
         Initialize locations to monitor
         """
+        if self.scenario is not None:
+            return self.scenario.locations()
+
         return [
             Location(34.0522, -118.2437, "Accra"),
             Location(40.7128, -74.0060, "Kumasi"),
@@ -113,6 +259,9 @@ class DisasterEnvironment:
         """
         Initialize the environmental conditions with random values
         """
+        if self.scenario is not None:
+            return self.scenario.initial_conditions()
+
         conditions = {}
 
         for location in self.locations:
@@ -146,25 +295,47 @@ class DisasterEnvironment:
             condition["air_quality"] = max(0, min(500, condition["air_quality"]))
 
     
-        # Randomly generate new disasters
-        if random.random() < 0.80:
+        # Randomly generate new disasters: a Poisson number from a rate table
+        # (scenarios use their own base rates), else one with probability 0.8
+        sampler = self.disaster_sampler or self._scenario_disaster_sampler()
+        if sampler is not None:
+            for location, disaster_type, severity in sampler.draw_tick():
+                self._spawn_disaster(location, disaster_type, severity)
+        elif random.random() < 0.80:
             self._generate_disaster()
 
+        # Push active disasters onto neighbouring locations
+        if self.spread_model is not None:
+            self.spread_model.step(self)
         
         # Updte existing disasters
         self._update_disasters()
 
+        if self.history is not None:
+            self.history.record(self.current_conditions)
+
+        self.invalidate_percepts()
+
     
     def _generate_disaster(self):
         """
         Generate a new randown disaster
         """
 
-        self.event_counter += 1
 
-        disaster_type = random.choice(list(DisasterType))
+        if self.scenario is not None:
+            return self._spawn_disaster(*self._draw_scenario_disaster())
+
+        disaster_type = random.choice(DISASTER_TYPES)
         location = random.choice(self.locations)
-        severity = random.choice(list(Severity))
+        severity = random.choice(SEVERITIES)
+        return self._spawn_disaster(location, disaster_type, severity)
+
+    def _spawn_disaster(self, location: Location, disaster_type: DisasterType, severity: Severity) -> DisasterEvent:
+        """
+        Create a disaster of the given type at a location and apply its effect on conditions
+        """
+        self.event_counter += 1
 
         # Update conditons based on disaster type
         cond = self.current_conditions[location.name]
@@ -209,8 +380,31 @@ class DisasterEnvironment:
         )
 
         self.active_disasters.append(disaster_event)
+        self.disaster_tally.add(disaster_event)
+        if self.geo_index is not None:
+            self.geo_index.add_disaster(disaster_event)
+        self.invalidate_percepts()
         return disaster_event
     
+    def _scenario_disaster_sampler(self):
+        """
+        The sampler over the scenario's per-location, per-type base rates
+        (built on first use), or None without a scenario
+        """
+        if self.scenario is None:
+            return None
+        if self._scenario_sampler is None:
+            from hazard_rates import HazardRates
+            self._scenario_sampler = HazardRates.from_scenario(self.scenario).compile()
+        return self._scenario_sampler
+
+    def _draw_scenario_disaster(self):
+        """
+        A location, type and severity drawn in proportion to the scenario's
+        per-location, per-type base rates (one alias-table draw)
+        """
+        return self._scenario_disaster_sampler().draw()
+
     def _update_disasters(self):
         """
         Update existing disasters, maybe resolve some
@@ -246,14 +440,27 @@ class DisasterEnvironment:
         
         for disaster in disasters_to_remove:
             self.active_disasters.remove(disaster)  
+            self.disaster_tally.remove(disaster)
+            if self.geo_index is not None:
+                self.geo_index.remove_disaster(disaster)
+        if disasters_to_remove:
+            self.invalidate_percepts()
     
     def sense(self, location: Location) -> EnvironmentPercept:
         """
         Simulate sensing the environment at a given location
         """
-        cond = self.current_conditions[location.name]
+        percept = self._percept_cache.get(location.name)
+        if percept is not None:
+            self.percept_cache_hits += 1
+            return percept
+
         local_disasters = [d for d in self.active_disasters if d.location == location]
+        return self._build_percept(location, local_disasters)
 
+    def _build_percept(self, location: Location, local_disasters: List[DisasterEvent]) -> EnvironmentPercept:
+        self.percept_cache_misses += 1
+        cond = self.current_conditions[location.name]
         percept = EnvironmentPercept(
             timestamp=datetime.now(),
             location=location,
@@ -264,43 +471,88 @@ class DisasterEnvironment:
             seismic_activity=cond['seismic_activity'],
             water_level=cond['water_level'],
             smoke_detected=cond['smoke_detected'],
-            active_disasters=local_disasters
+            active_disasters=tuple(local_disasters)
         )
 
+        self._percept_cache[location.name] = percept
         return percept
     
     def get_all_percepts(self) -> List[EnvironmentPercept]:
         """
         Get percepts for all monitored locations
         """
+        if self._all_percepts is not None:
+            self.percept_cache_hits += len(self._all_percepts)
+            return list(self._all_percepts)
+
+        # Group disasters by location once instead of filtering them per location
+        by_location: Dict[str, List[DisasterEvent]] = {}
+        for disaster in self.active_disasters:
+            by_location.setdefault(disaster.location.name, []).append(disaster)
+
         percepts = []
         for location in self.locations:
-            percepts.append(self.sense(location))
-        return percepts
+            percept = self._percept_cache.get(location.name)
+            if percept is not None:
+                self.percept_cache_hits += 1
+            else:
+                local = [d for d in by_location.get(location.name, ()) if d.location == location]
+                percept = self._build_percept(location, local)
+            percepts.append(percept)
+        self._all_percepts = percepts
+        return list(percepts)
     
     def get_summary(self) -> str:
-        """Get a summary of the current environment state."""
-        summary = "\n" + "="*70 + "\n"
-        summary += "ENVIRONMENT STATUS SUMMARY\n"
-        summary += "="*70 + "\n"
-        summary += f"Active Disasters: {len(self.active_disasters)}\n"
-        summary += f"Monitored Locations: {len(self.locations)}\n"
-        summary += f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        summary += "="*70 + "\n\n"
-        
-        if self.active_disasters:
-            summary += "ACTIVE DISASTERS:\n"
-            summary += "-"*70 + "\n"
-            for disaster in self.active_disasters:
-                summary += f"{disaster}\n"
-                summary += f"  Casualties: {disaster.casualties}, "
-                summary += f"Damage: {disaster.infrastructure_damage:.1f}%, "
-                summary += f"Area: {disaster.affected_area:.1f} km²\n"
-            summary += "-"*70 + "\n"
+        """
+        Get a summary of the current environment state: counts by type and
+        severity, casualties and damage from the running tally, so the cost
+        does not grow with the number of active disasters. write_report()
+        adds the per-disaster listing.
+        """
+        tally = self.disaster_tally
+        if tally.count != len(self.active_disasters):
+            # active_disasters was replaced without a sync
+            tally.sync(self.active_disasters)
+
+        rule = "=" * 70
+        lines = [
+            "",
+            rule,
+            "ENVIRONMENT STATUS SUMMARY",
+            rule,
+            f"Active Disasters: {tally.count}",
+            f"Monitored Locations: {len(self.locations)}",
+            f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            rule,
+        ]
+        if tally.count:
+            lines += [
+                "By Type: " + ", ".join(f"{t.value} {n}" for t, n in tally.by_type.items() if n),
+                "By Severity: " + ", ".join(f"{s.name} {n}" for s, n in tally.by_severity.items() if n),
+                f"Casualties: {tally.casualties}",
+                f"Average Damage: {tally.average_damage:.1f}%",
+                f"Affected Area: {tally.affected_area:.1f} km²",
+            ]
         else:
-            summary += "No active disasters - All locations clear\n"
-            summary += "-"*70 + "\n"
-        
-        return summary
-
+            lines.append("No active disasters - All locations clear")
+        lines.append(f"Spawned: {tally.spawned}, Resolved: {tally.resolved}")
+        return "\n".join(lines) + "\n"
 
+    def write_report(self, stream: TextIO):
+        """
+        Write the summary and then every active disaster to `stream`, one
+        disaster at a time, so the report is never held in memory whole
+        """
+        stream.write(self.get_summary())
+        stream.write("\n")
+        rule = "-" * 70 + "\n"
+        if not self.active_disasters:
+            stream.write(rule)
+            return
+        stream.write("ACTIVE DISASTERS:\n")
+        stream.write(rule)
+        for disaster in self.active_disasters:
+            stream.write(f"{disaster}\n  Casualties: {disaster.casualties}, "
+                         f"Damage: {disaster.infrastructure_damage:.1f}%, "
+                         f"Area: {disaster.affected_area:.1f} km²\n")
+        stream.write(rule)
@@ -0,0 +1,171 @@
+"""
+Binary Snapshot and Restore of DisasterEnvironment State
+
+A new DisasterEnvironment starts from random conditions with no active
+disasters, so benchmarks and scenarios have to burn warm-up ticks first. This
+module writes the full simulation state (locations, current_conditions,
+active_disasters, event_counter and the `random` module state) to a compact
+fixed-layout binary file, and restores it through a read-only memory map so a
+warmed-up state can be checkpointed once and forked by many runs.
+
+File layout (little endian):
+
+    header       magic, version, event_counter, location/disaster counts, string table size
+    rng          version, 625 Mersenne Twister words, gauss_next
+    locations    latitude, longitude, name offset/length   (one fixed record each)
+    conditions   temperature ... water_level, smoke flag    (one fixed record each)
+    disasters    event_id, type, location index, severity, timestamp, area,
+                 casualties, damage, resources              (one fixed record each)
+    strings      UTF-8 location names
+"""
+
+import mmap
+import random
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from environment import DisasterEnvironment, DisasterEvent, DisasterType, Location, Severity
+
+
+MAGIC = b"DENV"
+VERSION = 1
+
+CONDITION_KEYS = ("temperature", "humidity", "wind_speed", "air_quality", "seismic_activity", "water_level")
+RESOURCE_KEYS = ("medical_kits", "food_supplies", "water", "shelter_materials", "rescue_teams")
+
+_HEADER = struct.Struct("<4sHxxQIII")
+_RNG = struct.Struct("<I625I?d")
+_LOCATION = struct.Struct("<ddII")
+_CONDITION = struct.Struct("<6d?")
+DISASTER_RECORD = struct.Struct("<16sBIBddid5i")
+
+_DISASTER_TYPES = list(DisasterType)
+_TYPE_INDEX = {disaster_type: i for i, disaster_type in enumerate(_DISASTER_TYPES)}
+
+
+def pack_disaster(disaster: DisasterEvent, location_index: int) -> bytes:
+    """Encode a disaster as a fixed-size DISASTER_RECORD"""
+    return DISASTER_RECORD.pack(
+        disaster.event_id.encode("ascii"),
+        _TYPE_INDEX[disaster.disaster_type],
+        location_index,
+        disaster.severity.value,
+        disaster.timestamp.timestamp(),
+        disaster.affected_area,
+        disaster.casualties,
+        disaster.infrastructure_damage,
+        *(disaster.resources_needed.get(key, 0) for key in RESOURCE_KEYS)
+    )
+
+
+def unpack_disaster(record: tuple, locations: List[Location]) -> DisasterEvent:
+    """Decode an unpacked DISASTER_RECORD, resolving its location index"""
+    event_id, type_index, location_index, severity, timestamp, area, casualties, damage = record[:8]
+    return DisasterEvent(
+        event_id=event_id.rstrip(b"\0").decode("ascii"),
+        disaster_type=_DISASTER_TYPES[type_index],
+        location=locations[location_index],
+        severity=Severity(severity),
+        timestamp=datetime.fromtimestamp(timestamp),
+        affected_area=area,
+        casualties=casualties,
+        infrastructure_damage=damage,
+        resources_needed=dict(zip(RESOURCE_KEYS, record[8:]))
+    )
+
+
+def save_snapshot(environment: DisasterEnvironment, path: str):
+    """Write the environment and RNG state to `path`"""
+    location_index = {id(location): i for i, location in enumerate(environment.locations)}
+    names = bytearray()
+    location_records = []
+    for location in environment.locations:
+        encoded = (location.name or "").encode("utf-8")
+        location_records.append(_LOCATION.pack(location.latitude, location.longitude, len(names), len(encoded)))
+        names += encoded
+
+    condition_records = []
+    for location in environment.locations:
+        cond = environment.current_conditions[location.name]
+        condition_records.append(_CONDITION.pack(*(cond[key] for key in CONDITION_KEYS), cond["smoke_detected"]))
+
+    disaster_records = []
+    for disaster in environment.active_disasters:
+        index = location_index.get(id(disaster.location))
+        if index is None:
+            index = environment.locations.index(disaster.location)
+        disaster_records.append(pack_disaster(disaster, index))
+
+    rng_version, rng_words, gauss_next = random.getstate()
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, environment.event_counter, len(environment.locations),
+                             len(environment.active_disasters), len(names)))
+        f.write(_RNG.pack(rng_version, *rng_words, gauss_next is not None, gauss_next or 0.0))
+        f.write(b"".join(location_records))
+        f.write(b"".join(condition_records))
+        f.write(b"".join(disaster_records))
+        f.write(names)
+
+
+def load_snapshot(path: str, reseed: Optional[int] = None, scenario=None) -> DisasterEnvironment:
+    """
+    Restore an environment saved with `save_snapshot`.
+
+    The `random` module state is restored too, so the restored run continues
+    exactly like the original would have. Pass `reseed` to give each fork of
+    one warmed-up snapshot its own random stream instead. Pass the
+    geography.Scenario the snapshot was taken from to keep its disaster base
+    rates (its locations are shared with the restored environment).
+    """
+    with open(Path(path), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        # Records are decoded straight from the mapped pages, without copying the file
+        view = memoryview(mapped)
+        magic, version, event_counter, n_locations, n_disasters, names_size = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} environment snapshot")
+        offset = _HEADER.size
+
+        rng = _RNG.unpack_from(view, offset)
+        offset += _RNG.size
+
+        locations_at = offset
+        conditions_at = locations_at + n_locations * _LOCATION.size
+        disasters_at = conditions_at + n_locations * _CONDITION.size
+        names_at = disasters_at + n_disasters * DISASTER_RECORD.size
+
+        # Offsets are in bytes: slice the encoded names, then decode each one
+        names = bytes(view[names_at:names_at + names_size])
+        if scenario is not None and len(scenario) == n_locations:
+            locations: List[Location] = scenario.locations()
+        else:
+            locations = []
+            for latitude, longitude, start, length in _LOCATION.iter_unpack(view[locations_at:conditions_at]):
+                locations.append(Location(latitude, longitude, names[start:start + length].decode("utf-8") or None))
+
+        conditions: Dict[str, Dict] = {}
+        for location, record in zip(locations, _CONDITION.iter_unpack(view[conditions_at:disasters_at])):
+            cond = dict(zip(CONDITION_KEYS, record))
+            cond["smoke_detected"] = record[-1]
+            conditions[location.name] = cond
+
+        disasters = [
+            unpack_disaster(record, locations)
+            for record in DISASTER_RECORD.iter_unpack(view[disasters_at:names_at])
+        ]
+        view.release()
+
+    # Handing over locations and conditions skips initializing them only to overwrite them
+    environment = DisasterEnvironment(scenario=scenario, locations=locations, conditions=conditions)
+    environment.active_disasters = disasters
+    environment.disaster_tally.sync(disasters)
+    environment.event_counter = event_counter
+    environment.invalidate_percepts()
+
+    rng_version, *rng_words, has_gauss, gauss_next = rng
+    random.setstate((rng_version, tuple(rng_words), gauss_next if has_gauss else None))
+    if reseed is not None:
+        random.seed(reseed)
+
+    return environment
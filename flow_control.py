@@ -0,0 +1,145 @@
+"""
+Flow Control for Sensor -> Response Alert Traffic
+
+This module implements credit-based backpressure between the Lab 4 sensor and
+response agents. The sensor may only have a fixed window of INFORMs in flight;
+the response agent hands credit back as it drains its mailbox. While the sensor
+is out of credit, pending alerts are parked per location and a newer alert for
+the same location replaces the older one, so the queue never grows beyond the
+number of monitored locations (or `max_pending`, whichever is smaller). Alerts
+marked as kept (e.g. RESOLVED notices, whose loss would leave the receiver
+holding resources for good) are never evicted; the oldest other alert goes.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
+
+
+FLOW_CONTROL_PROTOCOL = "flow-control"
+DEFAULT_WINDOW = 8
+
+
+@dataclass
+class FlowStats:
+    """Counters describing the state of one side of the flow-control link"""
+    sent: int = 0
+    coalesced: int = 0
+    dropped: int = 0
+    credits_granted: int = 0
+    grants_withheld: int = 0
+    max_queue_depth: int = 0
+
+
+class CreditWindow:
+    """
+    Sensor-side credit counter with a coalescing per-location alert queue
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, max_pending: int = 64,
+                 keep: Optional[Callable[[Dict], bool]] = None):
+        """
+        keep: alerts for which it returns True are never evicted (the queue
+        may then exceed max_pending while only kept alerts are pending)
+        """
+        self.credit = window
+        self.max_pending = max_pending
+        self.keep = keep
+        self.pending: "OrderedDict[str, Dict]" = OrderedDict()
+        self.stats = FlowStats()
+
+    def offer(self, key: str, alert: Dict) -> Optional[Dict]:
+        """
+        Queue an alert, replacing any pending alert with the same key (normally
+        the location). Returns the alert evicted to make room, if any: the
+        oldest one that is not kept.
+        """
+        if key in self.pending:
+            # Keep the original queue position so busy locations cannot starve others
+            self.pending[key] = alert
+            self.stats.coalesced += 1
+            return None
+
+        evicted = None
+        if len(self.pending) >= self.max_pending:
+            victim = next((pending_key for pending_key, pending in self.pending.items()
+                           if self.keep is None or not self.keep(pending)), None)
+            if victim is not None:
+                evicted = self.pending.pop(victim)
+                self.stats.dropped += 1
+
+        self.pending[key] = alert
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, len(self.pending))
+        return evicted
+
+    def drain(self) -> List[Dict]:
+        """Release as many pending alerts as the current credit allows"""
+        released = []
+        while self.pending and self.credit > 0:
+            _, alert = self.pending.popitem(last=False)
+            released.append(alert)
+            self.credit -= 1
+        self.stats.sent += len(released)
+        return released
+
+    def grant(self, credit: int):
+        """Apply a credit grant received from the response side"""
+        self.credit += credit
+        self.stats.credits_granted += credit
+
+    def snapshot(self) -> Dict:
+        """Queue depth, remaining credit and counters for monitoring"""
+        return {"queue_depth": len(self.pending), "credit": self.credit, **asdict(self.stats)}
+
+
+class CreditGranter:
+    """
+    Response-side bookkeeping that decides when to hand credit back to a sender.
+
+    Credit is returned in batches of half the window, and only while the local
+    mailbox backlog is below the window, so a slow responder naturally throttles
+    the sensor instead of accumulating an unbounded mailbox.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self.batch = max(1, window // 2)
+        self.processed = 0
+        self.backlog = 0
+        self.stats = FlowStats()
+
+    def on_processed(self, backlog: int) -> int:
+        """Record one handled alert and return the credit to grant (0 for none)"""
+        self.processed += 1
+        self.backlog = backlog
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, backlog)
+
+        if self.processed < self.batch:
+            return 0
+        if backlog >= self.window:
+            self.stats.grants_withheld += 1
+            return 0
+        return self._grant()
+
+    def release(self, backlog: int) -> int:
+        """
+        Re-check credit withheld earlier against the current backlog and
+        return what can be granted now (0 for none). Call it periodically:
+        the backlog is the mailbox shared by all senders, so a sender whose
+        last in-flight alert was withheld sends nothing that would trigger
+        on_processed again and would otherwise stall for good.
+        """
+        self.backlog = backlog
+        if self.processed < self.batch or backlog >= self.window:
+            return 0
+        return self._grant()
+
+    def _grant(self) -> int:
+        credit = self.processed
+        self.processed = 0
+        self.stats.credits_granted += credit
+        return credit
+
+    def snapshot(self) -> Dict:
+        """Mailbox backlog, unreturned credit and counters for monitoring"""
+        return {"queue_depth": self.backlog, "owed_credit": self.processed, **asdict(self.stats)}
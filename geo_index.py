@@ -0,0 +1,175 @@
+"""
+Geo-Radius Queries over Locations and Active Disasters
+
+`Location` coordinates were only ever displayed, so nothing could answer
+"which active disasters lie within R km of here" or "which locations does
+this event cover". GeoIndex answers both with NumPy:
+
+    locations  a static grid: every location gets a cell `cell_km` wide and
+               the locations are sorted by cell key (row-major), so one cell
+               row of a query box is one contiguous slice found by binary
+               search. Candidates from the box are then filtered by exact
+               haversine distance, all rows at once.
+    disasters  parallel coordinate arrays of the active disasters, updated
+               in O(1) as disasters appear (append) and resolve (swap with
+               the last entry), and scanned with one vectorized haversine.
+
+k-nearest queries grow a radius query until it holds k locations. An event
+covers the locations within the radius of a circle of its `affected_area`
+(km²). Query boxes do not wrap across the ±180° meridian.
+
+    environment.enable_geo_index()
+    environment.disasters_within(5.6, -0.2, radius_km=50)
+    environment.locations_affected(disaster)
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from environment import DisasterEvent, Location
+from spread import KM_PER_DEGREE, haversine_km
+
+
+class GeoIndex:
+    """
+    Grid index over location coordinates, plus the active disasters
+    """
+
+    def __init__(self, locations: Sequence[Location], cell_km: Optional[float] = None):
+        """cell_km: grid cell size (default: about four locations per cell)"""
+        self.locations = list(locations)
+        self.location_index = {location.name: i for i, location in enumerate(self.locations)}
+        self.latitude = np.array([location.latitude for location in self.locations], dtype=np.float64)
+        self.longitude = np.array([location.longitude for location in self.locations], dtype=np.float64)
+        n = len(self.locations)
+
+        if n:
+            lat_min, lat_max = self.latitude.min(), self.latitude.max()
+            lon_min, lon_max = self.longitude.min(), self.longitude.max()
+        else:
+            lat_min = lat_max = lon_min = lon_max = 0.0
+        # Degrees of longitude shrink towards the poles; size cells for the widest latitude
+        self._min_cos = max(math.cos(math.radians(max(abs(lat_min), abs(lat_max)))), 0.01)
+        if cell_km is None:
+            height_km = (lat_max - lat_min) * KM_PER_DEGREE
+            width_km = (lon_max - lon_min) * KM_PER_DEGREE * self._min_cos
+            cell_km = math.sqrt(max(height_km * width_km, 1.0) * 4 / max(n, 1))
+        self.cell_km = max(cell_km, 1e-3)
+        self._lat_step = self.cell_km / KM_PER_DEGREE
+        self._lon_step = self.cell_km / (KM_PER_DEGREE * self._min_cos)
+        self._lon_origin = math.floor(lon_min / self._lon_step)
+        self._span = int(math.floor(lon_max / self._lon_step)) - self._lon_origin + 1
+
+        cell_lat = np.floor(self.latitude / self._lat_step).astype(np.int64)
+        cell_lon = np.floor(self.longitude / self._lon_step).astype(np.int64) - self._lon_origin
+        keys = cell_lat * self._span + cell_lon
+        self._order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[self._order]
+
+        # Active disasters: coordinate arrays with swap-remove, and event_id -> slot
+        self.disasters: List[DisasterEvent] = []
+        self._slot: Dict[str, int] = {}
+        self._disaster_lat = np.empty(16)
+        self._disaster_lon = np.empty(16)
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def _candidates(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Locations in the grid cells of the box around a circle"""
+        lat_reach = radius_km / KM_PER_DEGREE
+        lon_reach = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(abs(latitude) + lat_reach, 90.0))), 0.01))
+        row_lo = math.floor((latitude - lat_reach) / self._lat_step)
+        row_hi = math.floor((latitude + lat_reach) / self._lat_step)
+        col_lo = max(math.floor((longitude - lon_reach) / self._lon_step) - self._lon_origin, 0)
+        col_hi = min(math.floor((longitude + lon_reach) / self._lon_step) - self._lon_origin, self._span - 1)
+        if col_lo > col_hi:
+            return np.empty(0, dtype=np.int64)
+
+        rows = np.arange(row_lo, row_hi + 1, dtype=np.int64) * self._span
+        lo = np.searchsorted(self._sorted_keys, rows + col_lo, side="left")
+        hi = np.searchsorted(self._sorted_keys, rows + col_hi, side="right")
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        # The row slices gathered without a Python loop
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self._order[np.repeat(lo, counts) + within]
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(location indices, distances in km) within radius_km of a point, nearest first"""
+        candidates = self._candidates(latitude, longitude, radius_km)
+        distance = haversine_km(latitude, longitude, self.latitude[candidates], self.longitude[candidates])
+        keep = distance <= radius_km
+        candidates, distance = candidates[keep], distance[keep]
+        by_distance = np.argsort(distance, kind="stable")
+        return candidates[by_distance], distance[by_distance]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """(location indices, distances in km) of the k locations nearest a point, nearest first"""
+        k = min(k, len(self.locations))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        radius_km = self.cell_km * max(1.0, math.sqrt(k / 4))
+        while True:
+            indices, distance = self.within(latitude, longitude, radius_km)
+            if len(indices) >= k:
+                return indices[:k], distance[:k]
+            radius_km *= 2
+
+    def locations_within(self, latitude: float, longitude: float, radius_km: float) -> List[Location]:
+        return [self.locations[i] for i in self.within(latitude, longitude, radius_km)[0]]
+
+    def nearest_locations(self, latitude: float, longitude: float, k: int = 1) -> List[Location]:
+        return [self.locations[i] for i in self.nearest(latitude, longitude, k)[0]]
+
+    def locations_affected(self, disaster: DisasterEvent) -> List[Location]:
+        """Locations inside the circle of the disaster's affected_area around its location"""
+        radius_km = math.sqrt(max(disaster.affected_area, 0.0) / math.pi)
+        return self.locations_within(disaster.location.latitude, disaster.location.longitude, radius_km)
+
+    # --- Active disasters ---
+
+    def add_disaster(self, disaster: DisasterEvent):
+        if disaster.event_id in self._slot:
+            return
+        slot = len(self.disasters)
+        if slot == len(self._disaster_lat):
+            self._disaster_lat = np.resize(self._disaster_lat, 2 * slot)
+            self._disaster_lon = np.resize(self._disaster_lon, 2 * slot)
+        self._disaster_lat[slot] = disaster.location.latitude
+        self._disaster_lon[slot] = disaster.location.longitude
+        self._slot[disaster.event_id] = slot
+        self.disasters.append(disaster)
+
+    def remove_disaster(self, disaster: DisasterEvent):
+        slot = self._slot.pop(disaster.event_id, None)
+        if slot is None:
+            return
+        last = len(self.disasters) - 1
+        if slot != last:
+            moved = self.disasters[last]
+            self.disasters[slot] = moved
+            self._disaster_lat[slot] = self._disaster_lat[last]
+            self._disaster_lon[slot] = self._disaster_lon[last]
+            self._slot[moved.event_id] = slot
+        self.disasters.pop()
+
+    def sync_disasters(self, active: Sequence[DisasterEvent]):
+        """Reindex from scratch (after active_disasters was replaced directly)"""
+        self.disasters = []
+        self._slot = {}
+        for disaster in active:
+            self.add_disaster(disaster)
+
+    def disasters_within(self, latitude: float, longitude: float,
+                         radius_km: float) -> List[Tuple[DisasterEvent, float]]:
+        """(disaster, distance in km) for the active disasters within radius_km, nearest first"""
+        n = len(self.disasters)
+        distance = haversine_km(latitude, longitude, self._disaster_lat[:n], self._disaster_lon[:n])
+        inside = np.flatnonzero(distance <= radius_km)
+        inside = inside[np.argsort(distance[inside], kind="stable")]
+        return [(self.disasters[i], float(distance[i])) for i in inside]
@@ -0,0 +1,227 @@
+"""
+Large-Scale Synthetic Geography
+
+DisasterEnvironment normally monitors five hard-coded locations. This module
+builds scenarios with hundreds of thousands of locations, laid out either as a
+regular latitude/longitude grid or as clustered regions (towns scattered
+around regional centres), each with its own climate baseline and per-type
+disaster base rates. Everything is computed with NumPy array operations, and
+generated scenarios are cached on disk under a hash of their parameters so a
+repeat run loads them instead of rebuilding.
+
+    from geography import GeographyConfig, load_or_generate
+    scenario = load_or_generate(GeographyConfig(layout="clustered", n_locations=200_000))
+    environment = DisasterEnvironment(scenario=scenario)
+"""
+
+import hashlib
+import json
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from environment import DisasterType, Location
+
+
+GENERATOR_VERSION = 1
+DEFAULT_CACHE_DIR = Path(".scenario_cache")
+
+# Column order of Scenario.type_rates
+DISASTER_TYPES: List[DisasterType] = list(DisasterType)
+
+# Rough bounding box of Ghana, matching the lab location names
+GHANA_LATITUDE = (4.7, 11.2)
+GHANA_LONGITUDE = (-3.3, 1.2)
+
+
+@dataclass(frozen=True)
+class GeographyConfig:
+    """Parameters of a synthetic geography; also the cache key"""
+    layout: str = "grid"                 # "grid" or "clustered"
+    n_locations: int = 10_000
+    latitude_range: Tuple[float, float] = GHANA_LATITUDE
+    longitude_range: Tuple[float, float] = GHANA_LONGITUDE
+    n_clusters: int = 24                 # clustered layout only
+    cluster_spread_km: float = 20.0      # clustered layout only
+    disaster_rate: float = 0.80          # expected new disasters per tick across all locations
+    seed: int = 403
+
+    def cache_key(self) -> str:
+        payload = json.dumps({"version": GENERATOR_VERSION, **asdict(self)}, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+class Scenario:
+    """
+    Generated geography: coordinates, climate baselines and disaster base rates,
+    one array element per location
+    """
+
+    def __init__(self, config: GeographyConfig, arrays: Dict[str, np.ndarray]):
+        self.config = config
+        self.latitude = arrays["latitude"]
+        self.longitude = arrays["longitude"]
+        self.region = arrays["region"]
+        self.baseline_temperature = arrays["baseline_temperature"]
+        self.baseline_humidity = arrays["baseline_humidity"]
+        self.baseline_wind_speed = arrays["baseline_wind_speed"]
+        self.baseline_air_quality = arrays["baseline_air_quality"]
+        # (n_locations, len(DISASTER_TYPES)) expected new disasters per tick
+        self.type_rates = arrays["type_rates"]
+        self._locations: Optional[List[Location]] = None
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "region": self.region,
+            "baseline_temperature": self.baseline_temperature,
+            "baseline_humidity": self.baseline_humidity,
+            "baseline_wind_speed": self.baseline_wind_speed,
+            "baseline_air_quality": self.baseline_air_quality,
+            "type_rates": self.type_rates,
+        }
+
+    def location_name(self, index: int) -> str:
+        if self.config.layout == "clustered":
+            return f"R{int(self.region[index]):03d}-{index:06d}"
+        return f"G{index:06d}"
+
+    def locations(self) -> List[Location]:
+        """Location objects for DisasterEnvironment (built once, then shared)"""
+        if self._locations is None:
+            names = [self.location_name(i) for i in range(len(self))]
+            self._locations = [
+                Location(latitude, longitude, name)
+                for latitude, longitude, name in zip(self.latitude.tolist(), self.longitude.tolist(), names)
+            ]
+        return self._locations
+
+    def location_rates(self) -> np.ndarray:
+        """Expected new disasters per tick at each location, all types together"""
+        return self.type_rates.sum(axis=1)
+
+    def initial_conditions(self) -> Dict[str, Dict]:
+        """
+        Starting conditions around each location's baseline. Draws its jitter
+        from a generator seeded by `random`, so random.seed() keeps runs repeatable.
+        """
+        rng = np.random.default_rng(random.getrandbits(64))
+        n = len(self)
+        temperature = self.baseline_temperature + rng.uniform(-5, 5, n)
+        humidity = np.clip(self.baseline_humidity + rng.uniform(-15, 15, n), 30, 100)
+        wind_speed = np.maximum(0, self.baseline_wind_speed + rng.uniform(-5, 5, n))
+        air_quality = np.clip(self.baseline_air_quality + rng.uniform(-25, 25, n), 0, 500)
+
+        conditions = {}
+        for location, t, h, w, a in zip(self.locations(), temperature.tolist(), humidity.tolist(),
+                                        wind_speed.tolist(), air_quality.tolist()):
+            conditions[location.name] = {
+                'temperature': t,
+                'humidity': h,
+                'wind_speed': w,
+                'air_quality': a,
+                'seismic_activity': 0.0,
+                'water_level': 0.0,
+                'smoke_detected': False,
+            }
+        return conditions
+
+
+def _coordinates(config: GeographyConfig, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    lat_min, lat_max = config.latitude_range
+    lon_min, lon_max = config.longitude_range
+    n = config.n_locations
+
+    if config.layout == "grid":
+        # Near-square grid covering the bounding box, trimmed to n points
+        aspect = (lon_max - lon_min) / (lat_max - lat_min)
+        rows = max(1, int(np.ceil(np.sqrt(n / aspect))))
+        cols = max(1, int(np.ceil(n / rows)))
+        lat_grid, lon_grid = np.meshgrid(
+            np.linspace(lat_min, lat_max, rows), np.linspace(lon_min, lon_max, cols), indexing="ij"
+        )
+        region = np.zeros(n, dtype=np.int32)
+        return lat_grid.ravel()[:n], lon_grid.ravel()[:n], region
+
+    if config.layout == "clustered":
+        centres_lat = rng.uniform(lat_min, lat_max, config.n_clusters)
+        centres_lon = rng.uniform(lon_min, lon_max, config.n_clusters)
+        # Regions differ in size: a few large cities, many small towns
+        weights = rng.pareto(1.5, config.n_clusters) + 1
+        region = rng.choice(config.n_clusters, size=n, p=weights / weights.sum()).astype(np.int32)
+        spread_deg = config.cluster_spread_km / 111.0
+        latitude = np.clip(centres_lat[region] + rng.normal(0, spread_deg, n), lat_min, lat_max)
+        longitude = np.clip(centres_lon[region] + rng.normal(0, spread_deg, n), lon_min, lon_max)
+        return latitude, longitude, region
+
+    raise ValueError(f"Unknown layout '{config.layout}' (expected 'grid' or 'clustered')")
+
+
+def generate(config: GeographyConfig) -> Scenario:
+    """Build a scenario from its configuration"""
+    rng = np.random.default_rng(config.seed)
+    latitude, longitude, region = _coordinates(config, rng)
+    n = len(latitude)
+
+    # Climate: hotter and drier towards the north, wetter along the coast
+    lat_min, lat_max = config.latitude_range
+    north = (latitude - lat_min) / max(lat_max - lat_min, 1e-9)
+    baseline_temperature = 26 + 8 * north + rng.normal(0, 1.0, n)
+    baseline_humidity = np.clip(88 - 35 * north + rng.normal(0, 4.0, n), 30, 100)
+    baseline_wind_speed = np.clip(8 + 10 * (1 - north) + rng.normal(0, 3.0, n), 0, None)
+    baseline_air_quality = np.clip(70 + rng.gamma(2.0, 20.0, n), 0, 500)
+
+    # Relative hazard per type, driven by the baseline climate
+    coast = np.exp(-north * 6)
+    fault = np.exp(-((longitude - rng.uniform(*config.longitude_range)) ** 2) / 0.1)
+    relative = np.empty((n, len(DISASTER_TYPES)))
+    for column, disaster_type in enumerate(DISASTER_TYPES):
+        if disaster_type == DisasterType.FLOOD:
+            relative[:, column] = baseline_humidity / 100 + coast
+        elif disaster_type == DisasterType.EARTHQUAKE:
+            relative[:, column] = 0.1 + fault
+        elif disaster_type == DisasterType.FIRE:
+            relative[:, column] = north + (100 - baseline_humidity) / 100
+        elif disaster_type == DisasterType.DROUGHT:
+            relative[:, column] = north ** 2 + 0.05
+        elif disaster_type == DisasterType.STORM:
+            relative[:, column] = 0.5 + coast
+        elif disaster_type == DisasterType.HURRICANE:
+            relative[:, column] = 0.05 + coast ** 2
+    relative *= rng.lognormal(0, 0.3, relative.shape)
+    type_rates = relative * (config.disaster_rate / relative.sum())
+
+    return Scenario(config, {
+        "latitude": latitude.astype(np.float64),
+        "longitude": longitude.astype(np.float64),
+        "region": region,
+        "baseline_temperature": baseline_temperature,
+        "baseline_humidity": baseline_humidity,
+        "baseline_wind_speed": baseline_wind_speed,
+        "baseline_air_quality": baseline_air_quality,
+        "type_rates": type_rates,
+    })
+
+
+def load_or_generate(config: GeographyConfig, cache_dir: Path = DEFAULT_CACHE_DIR) -> Scenario:
+    """Return the cached scenario for `config`, generating and caching it on a miss"""
+    path = Path(cache_dir) / f"geography-{config.cache_key()}.npz"
+    if path.exists():
+        with np.load(path) as data:
+            return Scenario(config, {key: data[key] for key in data.files})
+
+    scenario = generate(config)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write under a temporary name so a concurrent reader never sees a partial file
+    partial = path.with_name(path.name + ".partial")
+    with open(partial, "wb") as f:
+        np.savez(f, **scenario.arrays())
+    partial.replace(path)
+    return scenario
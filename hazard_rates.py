@@ -0,0 +1,231 @@
+"""
+Per-Location Hazard Rates and Alias-Method Disaster Sampling
+
+By default DisasterEnvironment spawns at most one disaster per tick (80% of
+ticks), at a uniformly chosen location, of a uniformly chosen type and
+severity. Real hazard rates differ a lot by place and type: floods along the
+coast, fires in the dry north. `HazardRates` holds a configurable table of
+expected new disasters per tick for every (location, type) cell, plus
+severity weights per type, and compiles into a `DisasterSampler`. Scenario
+environments spawn from HazardRates.from_scenario(), so the scenario's
+disaster_rate is the expected number of spawns per tick.
+
+    cells      one alias table over all location x type cells, weighted by
+               rate: a weighted draw of where and what is O(1) (one uniform
+               picks a column, a second picks the column's own cell or its
+               alias), however many locations there are
+    severity   one alias table per disaster type
+    per tick   draw_tick() draws every spawn of a tick at once: the number of
+               spawns is Poisson with the total rate (independent Poisson
+               spawns in every cell are the same as one Poisson total
+               spread over the cells by rate), then one cell draw per spawn,
+               so a tick costs O(spawns), not O(locations)
+
+    rates = HazardRates.from_table(environment.locations, {
+        "Accra": {"flood": 0.2, "fire": 0.05},
+        "Tarkwa": {"earthquake": 0.01},
+    })
+    environment.enable_hazard_rates(rates)
+
+Tables can also come from JSON (load_hazard_rates) with the same shape,
+plus optional "default" per-type rates and "severity" weights per type.
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import List, Mapping, Optional, Sequence, Tuple
+
+from environment import DISASTER_TYPES, SEVERITIES, DisasterType, Location, Severity
+
+
+_TYPE_BY_NAME = {disaster_type.value: disaster_type for disaster_type in DISASTER_TYPES}
+
+
+class AliasSampler:
+    """
+    Walker/Vose alias table: O(n) to build, O(1) per weighted draw
+    """
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("an alias table needs at least one positive weight")
+        if any(weight < 0 for weight in weights):
+            raise ValueError("weights must not be negative")
+        self.n = n
+        self.total = total
+        scaled = [weight * n / total for weight in weights]
+        self.probability = [1.0] * n
+        self.alias = list(range(n))
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            low = small.pop()
+            high = large.pop()
+            self.probability[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            (small if scaled[high] < 1.0 else large).append(high)
+        # Whatever is left is 1.0 up to rounding error: keep its own column
+        self._arrays = None
+
+    def sample(self, rng=random) -> int:
+        u = rng.random() * self.n
+        column = int(u)
+        return column if u - column < self.probability[column] else self.alias[column]
+
+    def sample_array(self, generator, count: int):
+        """`count` draws at once from a numpy.random.Generator, as an int64 array"""
+        import numpy as np
+
+        if self._arrays is None:
+            self._arrays = (np.array(self.probability), np.array(self.alias, dtype=np.int64))
+        probability, alias = self._arrays
+        u = generator.random(count) * self.n
+        column = u.astype(np.int64)
+        return np.where(u - column < probability[column], column, alias[column])
+
+
+def _poisson(rate: float, rng=random) -> int:
+    """Poisson count by summing exponential gaps: O(count), no underflow for large rates"""
+    count = 0
+    elapsed = rng.expovariate(rate) if rate > 0 else 2.0
+    while elapsed <= 1.0:
+        count += 1
+        elapsed += rng.expovariate(rate)
+    return count
+
+
+class HazardRates:
+    """
+    Expected new disasters per tick for every location x type cell, and
+    severity weights per type (uniform unless given)
+    """
+
+    def __init__(self, locations: Sequence[Location], type_rates: Sequence[Sequence[float]],
+                 severity_weights: Optional[Mapping[DisasterType, Sequence[float]]] = None):
+        """type_rates: one row per location, one column per DISASTER_TYPES entry"""
+        if len(type_rates) != len(locations):
+            raise ValueError(f"{len(type_rates)} rate rows for {len(locations)} locations")
+        self.locations = list(locations)
+        self.type_rates = [list(map(float, row)) for row in type_rates]
+        for row in self.type_rates:
+            if len(row) != len(DISASTER_TYPES):
+                raise ValueError(f"rate rows need {len(DISASTER_TYPES)} columns, one per disaster type")
+        self.severity_weights = {
+            disaster_type: list((severity_weights or {}).get(disaster_type, [1.0] * len(SEVERITIES)))
+            for disaster_type in DISASTER_TYPES
+        }
+
+    @property
+    def total_rate(self) -> float:
+        return sum(sum(row) for row in self.type_rates)
+
+    @classmethod
+    def uniform(cls, locations: Sequence[Location], total_rate: float = 0.80) -> "HazardRates":
+        """The default environment's mix: every location and type equally likely"""
+        cell = total_rate / (len(locations) * len(DISASTER_TYPES))
+        return cls(locations, [[cell] * len(DISASTER_TYPES) for _ in locations])
+
+    @classmethod
+    def from_scenario(cls, scenario) -> "HazardRates":
+        """The per-location, per-type base rates of a geography.Scenario"""
+        return cls(scenario.locations(), scenario.type_rates.tolist())
+
+    @classmethod
+    def from_table(cls, locations: Sequence[Location], table: Mapping[str, Mapping[str, float]],
+                   default: Optional[Mapping[str, float]] = None,
+                   severity: Optional[Mapping[str, Mapping[str, float]]] = None) -> "HazardRates":
+        """
+        table: location name -> {disaster type value: rate}; locations not in
+        the table get `default` (type value -> rate, else zero). severity:
+        disaster type value -> {severity name: weight}.
+        """
+        unknown = set(table) - {location.name for location in locations}
+        if unknown:
+            raise ValueError(f"rates for unknown locations: {sorted(unknown)}")
+
+        def check_types(names):
+            for name in names:
+                if name not in _TYPE_BY_NAME:
+                    raise ValueError(f"unknown disaster type '{name}'")
+
+        def row(rates: Mapping[str, float]) -> List[float]:
+            check_types(rates)
+            return [float(rates.get(disaster_type.value, 0.0)) for disaster_type in DISASTER_TYPES]
+
+        default_row = row(default or {})
+        type_rates = [row(table[location.name]) if location.name in table else default_row
+                      for location in locations]
+
+        severity_weights = {}
+        check_types(severity or {})
+        for type_name, weights in (severity or {}).items():
+            disaster_type = _TYPE_BY_NAME[type_name]
+            severity_weights[disaster_type] = [
+                float(weights.get(level.name.lower(), weights.get(level.name, 0.0))) for level in SEVERITIES
+            ]
+        return cls(locations, type_rates, severity_weights)
+
+    def compile(self) -> "DisasterSampler":
+        return DisasterSampler(self)
+
+
+def load_hazard_rates(path: str, locations: Sequence[Location]) -> HazardRates:
+    """
+    Read a rate table from JSON:
+
+        {"default": {"flood": 0.01},
+         "locations": {"Accra": {"flood": 0.2, "fire": 0.05}},
+         "severity": {"earthquake": {"low": 4, "moderate": 3, "high": 2, "critical": 1}}}
+    """
+    data = json.loads(Path(path).read_text())
+    return HazardRates.from_table(locations, data.get("locations", {}), data.get("default"), data.get("severity"))
+
+
+class DisasterSampler:
+    """
+    Compiled HazardRates: O(1) weighted draws of (location, type, severity)
+    """
+
+    def __init__(self, rates: HazardRates):
+        self.locations = rates.locations
+        self.total_rate = rates.total_rate
+        width = len(DISASTER_TYPES)
+        self._width = width
+        self._cells = AliasSampler([rate for row in rates.type_rates for rate in row])
+        self._severity = {
+            disaster_type: AliasSampler(weights)
+            for disaster_type, weights in rates.severity_weights.items()
+        }
+
+    def draw(self, rng=random) -> Tuple[Location, DisasterType, Severity]:
+        """One spawn, placed and typed in proportion to the rates"""
+        cell = self._cells.sample(rng)
+        disaster_type = DISASTER_TYPES[cell % self._width]
+        return (self.locations[cell // self._width], disaster_type,
+                SEVERITIES[self._severity[disaster_type].sample(rng)])
+
+    def draw_tick(self, rng=random) -> List[Tuple[Location, DisasterType, Severity]]:
+        """Every spawn of one tick, across all locations"""
+        return [self.draw(rng) for _ in range(_poisson(self.total_rate, rng))]
+
+    def draw_tick_arrays(self, generator):
+        """
+        draw_tick for a numpy.random.Generator, as arrays (location index,
+        type index, severity index), for callers that keep state in arrays
+        """
+        import numpy as np
+
+        count = int(generator.poisson(self.total_rate))
+        cells = self._cells.sample_array(generator, count)
+        types = cells % self._width
+        severities = np.empty(count, dtype=np.int64)
+        for type_index, disaster_type in enumerate(DISASTER_TYPES):
+            of_type = np.flatnonzero(types == type_index)
+            if len(of_type):
+                severities[of_type] = self._severity[disaster_type].sample_array(generator, len(of_type))
+        return cells // self._width, types, severities
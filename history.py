@@ -0,0 +1,183 @@
+"""
+Per-Location Condition History
+
+DisasterEnvironment.current_conditions only holds the latest values, so an
+agent cannot tell rising water from high water. ConditionHistory keeps the
+last `capacity` ticks of every condition metric at every location in one
+preallocated ring buffer, and maintains rolling statistics over that window
+as each tick is recorded:
+
+    mean       running sum
+    slope      least-squares trend per tick, from running sums of x and i*x
+    min / max  van Herk/Gil-Werman blocks: a prefix extreme of the current
+               block plus suffix extremes of the previous one
+
+Every update is O(1) per location and metric (the suffix extremes and an
+exact resum to cancel floating-point drift are recomputed once per
+`capacity` ticks), and all locations are updated together with NumPy.
+Memory is fixed at construction, however long the run:
+
+    environment.enable_history(capacity=32)
+    ...
+    environment.history.stats("Accra", "water_level").slope   # metres per tick
+    environment.history.window("Accra", "water_level", 10)    # last 10 values
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from environment import EnvironmentPercept
+
+
+METRICS = ("temperature", "humidity", "wind_speed", "air_quality", "seismic_activity", "water_level")
+
+
+@dataclass(frozen=True)
+class RollingStats:
+    """Statistics of one metric at one location over the history window"""
+    count: int
+    mean: float
+    minimum: float
+    maximum: float
+    slope: float
+
+
+class ConditionHistory:
+    """
+    Fixed-size ring buffer of condition metrics, shape (metric, location, slot)
+    """
+
+    def __init__(self, location_names: Sequence[str], capacity: int = 32,
+                 metrics: Sequence[str] = METRICS, dtype=np.float32):
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2")
+        self.location_names = list(location_names)
+        self.location_index = {name: i for i, name in enumerate(self.location_names)}
+        self.metrics = tuple(metrics)
+        self.metric_index = {metric: i for i, metric in enumerate(self.metrics)}
+        self.capacity = capacity
+        self.ticks = 0
+
+        shape = (len(self.metrics), len(self.location_names))
+        self._buffer = np.zeros(shape + (capacity,), dtype=dtype)
+        self._suffix_min = np.zeros(shape + (capacity,), dtype=dtype)
+        self._suffix_max = np.zeros(shape + (capacity,), dtype=dtype)
+        self._prefix_min = np.zeros(shape)
+        self._prefix_max = np.zeros(shape)
+        self._sum = np.zeros(shape)
+        self._weighted_sum = np.zeros(shape)   # sum of i * x_i, i = 0 for the oldest sample
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self._buffer, self._suffix_min, self._suffix_max, self._prefix_min,
+                  self._prefix_max, self._sum, self._weighted_sum)
+        return sum(a.nbytes for a in arrays)
+
+    @property
+    def count(self) -> int:
+        """Samples currently in the window"""
+        return min(self.ticks, self.capacity)
+
+    def record(self, conditions: Dict[str, Dict]):
+        """Append one tick from DisasterEnvironment.current_conditions"""
+        n = len(self.location_names)
+        values = np.empty((len(self.metrics), n))
+        for row, metric in enumerate(self.metrics):
+            values[row] = np.fromiter((conditions[name][metric] for name in self.location_names),
+                                      dtype=np.float64, count=n)
+        self.record_array(values)
+
+    def record_percepts(self, percepts: List[EnvironmentPercept]):
+        """Append one tick from get_all_percepts() (e.g. from a ReplayEnvironment)"""
+        self.record({p.location.name: {m: getattr(p, m) for m in self.metrics} for p in percepts})
+
+    def record_array(self, values: np.ndarray):
+        """Append one tick given as an array of shape (metric, location)"""
+        w = self.capacity
+        slot = self.ticks % w
+        values = values.astype(self._buffer.dtype).astype(np.float64)
+
+        if slot == 0 and self.ticks:
+            # The ring holds exactly the previous block: take its suffix extremes
+            reversed_block = self._buffer[..., ::-1]
+            self._suffix_min[...] = np.minimum.accumulate(reversed_block, axis=-1)[..., ::-1]
+            self._suffix_max[...] = np.maximum.accumulate(reversed_block, axis=-1)[..., ::-1]
+
+        if self.ticks < w:
+            self._weighted_sum += self.ticks * values
+            self._sum += values
+        else:
+            oldest = self._buffer[..., slot].astype(np.float64)
+            self._weighted_sum += -(self._sum - oldest) + (w - 1) * values
+            self._sum += values - oldest
+
+        self._buffer[..., slot] = values
+        if slot == 0:
+            self._prefix_min[...] = values
+            self._prefix_max[...] = values
+        else:
+            np.minimum(self._prefix_min, values, out=self._prefix_min)
+            np.maximum(self._prefix_max, values, out=self._prefix_max)
+        self.ticks += 1
+
+        if slot == w - 1:
+            # Once per block, resum exactly so the running sums never drift
+            # (the ring is in chronological order right after its last slot)
+            self._sum[...] = self._buffer.sum(axis=-1, dtype=np.float64)
+            self._weighted_sum[...] = self._buffer @ np.arange(w, dtype=np.float64)
+
+    def _slots(self, n: Optional[int] = None) -> np.ndarray:
+        """Ring slots of the last n samples, oldest first"""
+        n = self.count if n is None else min(n, self.count)
+        newest = (self.ticks - 1) % self.capacity
+        return np.arange(newest - n + 1, newest + 1) % self.capacity
+
+    # --- Vectorized queries over all locations ---
+
+    # `columns` selects locations; the default is all of them
+
+    def mean(self, metric: str, columns=slice(None)) -> np.ndarray:
+        return self._sum[self.metric_index[metric], columns] / max(self.count, 1)
+
+    def slope(self, metric: str, columns=slice(None)) -> np.ndarray:
+        """Least-squares change per tick over the window"""
+        row = self.metric_index[metric]
+        k = self.count
+        if k < 2:
+            return np.zeros_like(self._sum[row, columns])
+        sum_i = k * (k - 1) / 2
+        sum_ii = (k - 1) * k * (2 * k - 1) / 6
+        return (k * self._weighted_sum[row, columns] - sum_i * self._sum[row, columns]) / (k * sum_ii - sum_i ** 2)
+
+    def minimum(self, metric: str, columns=slice(None)) -> np.ndarray:
+        return self._extreme(metric, columns, self._prefix_min, self._suffix_min, np.minimum)
+
+    def maximum(self, metric: str, columns=slice(None)) -> np.ndarray:
+        return self._extreme(metric, columns, self._prefix_max, self._suffix_max, np.maximum)
+
+    def _extreme(self, metric, columns, prefix, suffix, combine) -> np.ndarray:
+        row = self.metric_index[metric]
+        newest = (self.ticks - 1) % self.capacity
+        if self.ticks <= self.capacity or newest == self.capacity - 1:
+            # The window is the current block alone
+            return np.array(prefix[row, columns])
+        return combine(prefix[row, columns], suffix[row, columns, newest + 1])
+
+    # --- Per-location queries ---
+
+    def window(self, location_name: str, metric: str, n: Optional[int] = None) -> np.ndarray:
+        """Last n values (all retained values by default), oldest first"""
+        row = self.metric_index[metric]
+        return self._buffer[row, self.location_index[location_name], self._slots(n)].astype(np.float64)
+
+    def stats(self, location_name: str, metric: str) -> RollingStats:
+        column = self.location_index[location_name]
+        return RollingStats(
+            count=self.count,
+            mean=float(self.mean(metric, column)),
+            minimum=float(self.minimum(metric, column)),
+            maximum=float(self.maximum(metric, column)),
+            slope=float(self.slope(metric, column)),
+        )
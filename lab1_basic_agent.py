@@ -1,6 +1,7 @@
 from spade.agent import Agent
 from spade.behaviour import CyclicBehaviour
 import asyncio
+from agent_config import load_config
 
 
 class BasicAgent(Agent):
@@ -24,7 +25,8 @@ class BasicAgent(Agent):
 
 
 if __name__ == "__main__":
-    agent = BasicAgent("basic_agent@localhost", "1234")
+    config = load_config()
+    agent = BasicAgent(config.jid("basic_agent"), config.password("basic_agent"))
     
     future = agent.start()
     future.result()
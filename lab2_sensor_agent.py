@@ -10,13 +10,16 @@ from spade.behaviour import PeriodicBehaviour
 from datetime import datetime
 import asyncio
 import random
+from agent_config import load_config
+from console import console, report_percepts
 from environment import DisasterEnvironment, Location
 
 
-# XMPP Configuration - Update these for your server
-XMPP_SERVER = "localhost"  # Change to remote server like "xmpp.jp" if needed
-SENSOR_JID = f"sensor@{XMPP_SERVER}"
-SENSOR_PASSWORD = "sensor123"
+# XMPP Configuration - override in agents.json (see agent_config.py)
+_config = load_config()
+XMPP_SERVER = _config.server
+SENSOR_JID = _config.jid("sensor")
+SENSOR_PASSWORD = _config.password("sensor")
 
 
 class SensorAgent(Agent):
@@ -34,51 +37,27 @@ class SensorAgent(Agent):
             """Initialize the environment when behavior starts"""
             self.environment = DisasterEnvironment()
             self.log_file = "logs/LAB2_sensor_logs.txt"
-            print(f"\n[{self.agent.jid}] Perception behavior started")
-            print(f"[{self.agent.jid}] Monitoring locations: {[loc.name for loc in self.environment.locations]}\n")
+            console.summary("\n[%s] Perception behavior started", self.agent.jid)
+            console.info("[%s] Monitoring locations: %s\n", self.agent.jid,
+                         [loc.name for loc in self.environment.locations])
         
         async def run(self):
             """Execute perception cycle"""
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            print(f"{'='*80}")
-            print(f"[{timestamp}] PERCEPTION CYCLE")
-            print(f"{'='*80}\n")
-            
             # Update environment state
             self.environment.update_environment()
             
             # Get all percepts
             percepts = self.environment.get_all_percepts()
             
-            # Process each location's percept
-            for percept in percepts:
-                location = percept.location
-                
-                print(f"Location: {location.name}")
-                print(f"  Temperature: {percept.temperature:.1f}°C")
-                print(f"  Humidity: {percept.humidity:.1f}%")
-                print(f"  Water Level: {percept.water_level:.2f}m")
-                print(f"  Visibility: {percept.visibility:.1f}m")
-                
-                # Check for disasters
-                if percept.active_disasters:
-                    print(f"  🚨 DISASTERS DETECTED:")
-                    for disaster in percept.active_disasters:
-                        print(f"     - {disaster.disaster_type.value.upper()}")
-                        print(f"       Severity: {disaster.severity.name}")
-                        print(f"       Casualties: {disaster.casualties}")
-                        print(f"       Infrastructure Damage: {disaster.infrastructure_damage}%")
-                        print(f"       Affected Population: {disaster.affected_population}")
-                        
-                        # Log disaster event
-                        self._log_disaster(timestamp, disaster)
-                else:
-                    print(f"  ✓ No active disasters")
-                
-                print()
+            # Report each location's percept (buffered, filtered by the console level)
+            report_percepts(percepts, timestamp)
             
-            print(f"{'='*80}\n")
+            # Log disaster events
+            for percept in percepts:
+                for disaster in percept.active_disasters:
+                    self._log_disaster(timestamp, disaster)
         
         def _log_disaster(self, timestamp, disaster):
             """Log disaster events to file"""
@@ -88,18 +67,18 @@ class SensorAgent(Agent):
                     f.write(f"{disaster.disaster_type.value} | ")
                     f.write(f"Severity: {disaster.severity.name} | ")
                     f.write(f"Casualties: {disaster.casualties} | ")
-                    f.write(f"Affected: {disaster.affected_population}\n")
+                    f.write(f"Affected: {disaster.affected_area:.0f} km²\n")
             except Exception as e:
-                print(f"Error logging disaster: {e}")
+                console.summary(f"Error logging disaster: {e}")
     
     async def setup(self):
         """Agent setup - called when agent starts"""
-        print(f"\n{'='*80}")
-        print(f"SensorAgent Setup")
-        print(f"{'='*80}")
-        print(f"Agent JID: {self.jid}")
-        print(f"Starting perception behavior with 5-second interval")
-        print(f"{'='*80}\n")
+        console.summary(f"\n{'='*80}")
+        console.summary(f"SensorAgent Setup")
+        console.summary(f"{'='*80}")
+        console.summary(f"Agent JID: {self.jid}")
+        console.summary(f"Starting perception behavior with 5-second interval")
+        console.summary(f"{'='*80}\n")
         
         # Add periodic behavior (runs every 5 seconds)
         b = self.PerceptionBehaviour(period=5)
@@ -108,30 +87,30 @@ class SensorAgent(Agent):
 
 async def main():
     """Main entry point for Lab 2"""
-    print("\nLAB 2: Perception and Environment Modeling")
-    print("Disaster Response & Relief Coordination System\n")
+    console.summary("\nLAB 2: Perception and Environment Modeling")
+    console.summary("Disaster Response & Relief Coordination System\n")
     
     # Configuration info
-    print(f"XMPP Configuration:")
-    print(f"  Server: {XMPP_SERVER}")
-    print(f"  Agent JID: {SENSOR_JID}")
-    print(f"  Note: Update XMPP_SERVER variable for remote servers\n")
+    console.summary(f"XMPP Configuration:")
+    console.summary(f"  Server: {XMPP_SERVER}")
+    console.summary(f"  Agent JID: {SENSOR_JID}")
+    console.summary(f"  Note: Set xmpp_server in agents.json for remote servers\n")
     
     # Create and start sensor agent
     sensor = SensorAgent(SENSOR_JID, SENSOR_PASSWORD)
     await sensor.start()
     
-    print("✓ Sensor agent is running")
-    print("Press Ctrl+C to stop\n")
+    console.summary("✓ Sensor agent is running")
+    console.summary("Press Ctrl+C to stop\n")
     
     try:
         # Keep agent running
         while sensor.is_alive():
             await asyncio.sleep(1)
     except KeyboardInterrupt:
-        print("\n\nStopping sensor agent...")
+        console.summary("\n\nStopping sensor agent...")
         await sensor.stop()
-        print("✓ Agent stopped successfully\n")
+        console.summary("✓ Agent stopped successfully\n")
 
 
 if __name__ == "__main__":
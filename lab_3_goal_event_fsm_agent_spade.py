@@ -3,11 +3,16 @@ LAB 3: Goal-Event FSM Agent (SPADE Version)
 
 This module implements agoal-event finite state machine (FSM) agent using SPADE 
 for disaster response scenarios.
+
+The MONITORING/ASSESSING/DISPATCHING/RECOVERY logic and its transition table
+live in response_fsm.py, which runs without SPADE; the states here are thin
+adapters that step that machine.
 """
 
 import asyncio
 import random
-from enum import Enum
+import time
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -15,126 +20,155 @@ from typing import Dict, List, Optional, Set
 
 from spade.agent import Agent
 from spade.behaviour import FSMBehaviour, State
+from agent_config import load_config
+from console import console
 from environment import DisasterEnvironment, DisasterEvent, EnvironmentPercept, Severity
+from response_fsm import (AgentGoals, ResponseContext, ResponseMachine, ResponseState, TRANSITIONS,
+                          return_resources, send_resources)
+
 
+# XMPP Configuration - override in agents.json (see agent_config.py)
+_config = load_config()
+XMPP_SERVER = _config.server
+RESPONSE_JID = _config.jid("response_agent")
+RESPONSE_PASSWORD = _config.password("response_agent")
 
-# XMPP Configuration
-XMPP_SERVER = "localhost"
-RESPONSE_JID = f"response_agent@{XMPP_SERVER}"
-RESPONSE_PASSWORD = "response123"
+# Most recent trace entries and transitions kept in memory (and saved to the trace file)
+TRACE_LIMIT = 100_000
 
 
-class ResponseState(Enum):
-    """Finite states for the disaster response agent"""
-    MONITORING = "MONITORING"
-    ASSESSING = "ASSESSING"
-    DISPATCHING = "DISPATCHING"
-    RECOVERY = "RECOVERY"
+class MachineState(State):
+    """
+    SPADE adapter for one ResponseState: runs that state's action on the
+    agent's ResponseMachine and follows the transition it takes
+    """
+    
+    def __init__(self, response_state: ResponseState):
+        super().__init__()
+        self.response_state = response_state
+        # MONITORING waits twice as long as the other states
+        self.delay_factor = 2 if response_state is ResponseState.MONITORING else 1
+    
+    async def run(self):
+        agent = self.agent
+        next_state = agent.machine.step(agent.context)
+        # The end of a cycle hands back to the controller for the next cycle
+        self.set_next_state(next_state.value if next_state is not None else "CONTROLLER")
+        await asyncio.sleep(self.delay_factor * agent.state_delay)
+
+
+# Worker FSM state that waits for the next disaster
+WORKER_CLAIM = "CLAIM"
 
 
 @dataclass
-class AgentGoals:
-    """Data class to represent the goals of the agent"""
-    rescue_people: str = "Minimize casualties through rapid rescue operations"
-    stabilize_infrastructure: str = "Stabilize critical infrastructure to prevent further damage"
-    optimize_resources: str = "Optimize resource allocation for maximum efficiency"
+class WorkerSlot:
+    """What one pool worker is handling"""
+    worker_id: str
+    disaster: Optional[DisasterEvent] = None
+    recovery_passes: int = 0
+
 
+def _finish(state: State):
+    """End the FSM a state belongs to (a state without a next state is final)"""
+    state.set_next_state(None)
+    state.kill()
 
-class MonitoringState(State):
-    """MONITORING state - continuous surveillance of all zones"""
+
+class WorkerState(State):
+    """Base of the states of one pool worker FSM"""
+    
+    def __init__(self, slot: WorkerSlot):
+        super().__init__()
+        self.slot = slot
+
+
+class WorkerClaimState(WorkerState):
+    """CLAIM - take the most urgent unowned disaster from the shared queue"""
     
     async def run(self):
-        agent_data = self.agent.agent_data
-        agent_data["_log_trace"]("Action: Continue periodic monitoring")
-        
-        # Check for events
-        events = agent_data["events"]
-        
-        if events:
-            # Transition to ASSESSING
-            agent_data["_switch_state"](ResponseState.MONITORING, ResponseState.ASSESSING,
-                                      "Disaster-related event detected")
-            self.set_next_state(ResponseState.ASSESSING.value)
-        else:
-            # Stay in MONITORING
-            self.set_next_state(ResponseState.MONITORING.value)
+        agent = self.agent
+        queue = agent.work_queue
+        if queue.closed:
+            # The simulation is over: the environment no longer changes
+            agent._log_trace(f"{self.slot.worker_id}: queue closed, stopping")
+            _finish(self)
+            return
+
+        disaster = await queue.claim(self.slot.worker_id, timeout=2 * agent.state_delay + 0.1,
+                                     is_active=agent._is_active)
+        if disaster is None:
+            self.set_next_state(WORKER_CLAIM)
+            return
         
-        await asyncio.sleep(1)
+        self.slot.disaster = disaster
+        self.slot.recovery_passes = 0
+        agent._log_trace(
+            f"{self.slot.worker_id}: Claimed {disaster.disaster_type.value} at {disaster.location.name} "
+            f"[{disaster.event_id}] (Severity {disaster.severity.name})"
+        )
+        self.set_next_state(ResponseState.ASSESSING.value)
 
 
-class AssessingState(State):
-    """ASSESSING state - evaluating disaster severity and impact"""
+class WorkerAssessingState(WorkerState):
+    """ASSESSING - evaluate the claimed disaster"""
     
     async def run(self):
-        agent_data = self.agent.agent_data
-        events = agent_data["events"]
-        
-        # Prioritize disaster
-        priority_disaster = agent_data["_prioritize_disaster"](events)
-        
-        if priority_disaster:
-            agent_data["_log_trace"](
-                f"Assessment: Prioritize {priority_disaster.disaster_type.value} at "
-                f"{priority_disaster.location.name} (Severity {priority_disaster.severity.name})"
-            )
-            agent_data["priority_disaster"] = priority_disaster
-        
-        # Transition to DISPATCHING
-        agent_data["_switch_state"](ResponseState.ASSESSING, ResponseState.DISPATCHING,
-                                  "Assessment complete")
+        disaster = self.slot.disaster
+        self.agent._log_trace(
+            f"{self.slot.worker_id}: Assessment: {disaster.casualties} casualties, "
+            f"{disaster.infrastructure_damage:.0f}% infrastructure damage"
+        )
         self.set_next_state(ResponseState.DISPATCHING.value)
-        await asyncio.sleep(0.5)
+        await asyncio.sleep(self.agent.state_delay)
 
 
-class DispatchingState(State):
-    """DISPATCHING state - allocating resources and coordinating response"""
+class WorkerDispatchingState(WorkerState):
+    """DISPATCHING - send resources to the claimed disaster"""
     
     async def run(self):
-        agent_data = self.agent.agent_data
-        priority_disaster = agent_data.get("priority_disaster")
-        goals = agent_data["goals"]
-        
-        if priority_disaster:
-            teams = priority_disaster.resources_needed.get("rescue_teams", 0)
-            medical = priority_disaster.resources_needed.get("medical_kits", 0)
-            agent_data["_log_trace"](
-                f"Dispatch: Send {teams} rescue teams and {medical} medical kits "
-                f"to {priority_disaster.location.name}"
-            )
-            agent_data["_log_trace"](f"Goal Alignment: {goals.rescue_people}")
-            agent_data["_log_trace"](f"Goal Alignment: {goals.optimize_resources}")
-        
-        # Transition to RECOVERY
-        agent_data["_switch_state"](ResponseState.DISPATCHING, ResponseState.RECOVERY,
-                                  "Initial dispatch actions completed")
+        disaster = self.slot.disaster
+        sent = send_resources(self.agent.context, disaster)
+        self.agent._log_trace(
+            f"{self.slot.worker_id}: Dispatch: Send {sent} "
+            f"to {disaster.location.name} [{disaster.event_id}]"
+        )
+        self.agent.context.dispatched += 1
         self.set_next_state(ResponseState.RECOVERY.value)
-        await asyncio.sleep(0.5)
+        await asyncio.sleep(self.agent.state_delay)
 
 
-class RecoveryState(State):
-    """RECOVERY state - stabilization and infrastructure restoration"""
+class WorkerRecoveryState(WorkerState):
+    """RECOVERY - stay with the disaster until it stabilizes or resolves, then release it"""
     
     async def run(self):
-        agent_data = self.agent.agent_data
-        priority_disaster = agent_data.get("priority_disaster")
-        goals = agent_data["goals"]
-        
-        if priority_disaster:
-            if priority_disaster.severity.value <= Severity.MODERATE.value:
-                agent_data["_log_trace"]("Recovery: Situation is stabilizing; downgrade response level")
-                agent_data["_switch_state"](ResponseState.RECOVERY, ResponseState.MONITORING,
-                                          "Disaster impact under control")
-                self.set_next_state(ResponseState.MONITORING.value)
-            else:
-                agent_data["_log_trace"]("Recovery: Continue containment and infrastructure stabilization")
-                agent_data["_log_trace"](f"Goal Alignment: {goals.stabilize_infrastructure}")
-                agent_data["_switch_state"](ResponseState.RECOVERY, ResponseState.MONITORING,
-                                          "Return to monitor after recovery cycle")
-                self.set_next_state(ResponseState.MONITORING.value)
+        agent = self.agent
+        disaster = self.slot.disaster
+        self.slot.recovery_passes += 1
+
+        if agent.work_queue.closed:
+            # Nothing will change any more; on_end hands the disaster back unfinished,
+            # but no worker will recover it, so its shipments go back now
+            agent._log_trace(f"{self.slot.worker_id}: queue closed during recovery of [{disaster.event_id}]")
+            return_resources(agent.context, disaster.event_id)
+            _finish(self)
+            return
+
+        if agent._is_active(disaster) and disaster.severity.value > Severity.MODERATE.value:
+            if self.slot.recovery_passes == 1:
+                agent._log_trace(f"{self.slot.worker_id}: Recovery: Continue containment at "
+                                 f"{disaster.location.name} [{disaster.event_id}]")
+            self.set_next_state(ResponseState.RECOVERY.value)
         else:
-            self.set_next_state(ResponseState.MONITORING.value)
-        
-        await asyncio.sleep(0.5)
+            status = "STABILIZED" if agent._is_active(disaster) else "RESOLVED"
+            agent._log_trace(f"{self.slot.worker_id}: Recovery: [{disaster.event_id}] {status} "
+                             f"after {self.slot.recovery_passes} pass(es)")
+            agent.work_queue.complete(disaster.event_id, self.slot.worker_id)
+            return_resources(agent.context, disaster.event_id)
+            agent.context.handled += 1
+            self.slot.disaster = None
+            self.set_next_state(WORKER_CLAIM)
+        await asyncio.sleep(self.agent.state_delay)
 
 
 class GoalReactiveResponseAgent(Agent):
@@ -142,23 +176,52 @@ class GoalReactiveResponseAgent(Agent):
     SPADE-based goal-reactive finite state machine (FSM) agent for disaster response
     """
     
-    def __init__(self, jid, password, environment: DisasterEnvironment, cycles: int = 8):
+    def __init__(self, jid, password, environment: DisasterEnvironment, cycles: int = 8,
+                 anomaly_detector=None, batch_size: int = 1, state_delay: float = 0.5,
+                 workers: int = 0, work_queue=None, feed_queue: bool = True, depots=None):
+        """
+        anomaly_detector: optional anomaly.AnomalyDetector. When given, TEMP_SPIKE
+        and WATER_RISE come from per-location anomaly alarms instead of the
+        fixed 42 °C / 1.5 m thresholds.
+        batch_size: with more than 1, ASSESSING ranks every pending disaster,
+        DISPATCHING plans the top batch_size in one pass and RECOVERY tracks
+        each dispatched disaster until it stabilizes or resolves.
+        state_delay: pause after each state (MONITORING and the controller wait twice as long)
+        workers: with 1 or more, run that many worker FSMs that claim disasters
+        from a shared work_queue.DisasterWorkQueue instead of the single
+        response FSM. Pass the same work_queue to several agents to share one
+        pool between them; set feed_queue=False on all but the agent that
+        perceives the environment and pushes disasters.
+        depots: optional depots.DepotNetwork to ship resources from, nearest stocked depot first
+        """
         super().__init__(jid, password)
         self.environment = environment
         self.cycles = cycles
+        self.anomaly_detector = anomaly_detector
+        self.batch_size = batch_size
+        self.state_delay = state_delay
+        self.started_at: Optional[float] = None
+        self.workers = workers
+        self.feed_queue = feed_queue
+        if workers and work_queue is None:
+            from work_queue import DisasterWorkQueue
+            work_queue = DisasterWorkQueue()
+        self.work_queue = work_queue
+        self._running_fsms = 0
         self.current_cycle = 0
         
-        # Agent data accessible to all states
+        # State shared by the FSM states; the machine itself runs without SPADE
+        self.context = ResponseContext(
+            batch_size=batch_size, goals=AgentGoals(), active_event_ids=self._active_event_ids,
+            log=self._log_trace, on_transition=self._switch_state, depots=depots
+        )
+        self.machine = ResponseMachine()
+        
+        # Agent bookkeeping outside the FSM
         self.agent_data = {
-            "goals": AgentGoals(),
-            "trace": [],
-            "transition_history": [],
+            "trace": deque(maxlen=TRACE_LIMIT),
+            "transition_history": deque(maxlen=TRACE_LIMIT),
             "last_handled_event_ids": set(),
-            "events": [],
-            "priority_disaster": None,
-            "_log_trace": self._log_trace,
-            "_switch_state": self._switch_state,
-            "_prioritize_disaster": self._prioritize_disaster
         }
         
         self.trace_file = Path("logs/LAB3_execution_logs_spade.txt")
@@ -170,7 +233,7 @@ class GoalReactiveResponseAgent(Agent):
     def _log_trace(self, message: str):
         entry = f"[{self._timestamp()}] {self.jid.localpart} | {message}"
         self.agent_data["trace"].append(entry)
-        print(entry)
+        console.info(entry)
     
     def _switch_state(self, old_state: ResponseState, new_state: ResponseState, reason: str):
         """Log state transitions"""
@@ -185,16 +248,19 @@ class GoalReactiveResponseAgent(Agent):
     def _derive_events(self, percepts: List[EnvironmentPercept]) -> List[Dict]:
         """Convert sensor percepts into internal/external event triggers"""
         derived_events = []
+        seen_event_ids = set()
+        if self.anomaly_detector is not None:
+            derived_events.extend(self.anomaly_detector.events(percepts))
         
         for percept in percepts:
-            if percept.temperature >= 42:
+            if self.anomaly_detector is None and percept.temperature >= 42:
                 derived_events.append({
                     "type": "TEMP_SPIKE",
                     "location": percept.location.name,
                     "details": f"Temperature at {percept.temperature:.1f}°C"
                 })
             
-            if percept.water_level >= 1.5:
+            if self.anomaly_detector is None and percept.water_level >= 1.5:
                 derived_events.append({
                     "type": "WATER_RISE",
                     "location": percept.location.name,
@@ -202,6 +268,7 @@ class GoalReactiveResponseAgent(Agent):
                 })
             
             for disaster in percept.active_disasters:
+                seen_event_ids.add(disaster.event_id)
                 if disaster.event_id not in self.agent_data["last_handled_event_ids"]:
                     derived_events.append({
                         "type": "DISASTER_DETECTED",
@@ -227,21 +294,59 @@ class GoalReactiveResponseAgent(Agent):
                         "details": "High rescue-team requirement"
                     })
         
+        # Event ids are never reused, so ids of disasters that have ended can go
+        self.agent_data["last_handled_event_ids"] &= seen_event_ids
         return derived_events
     
-    def _prioritize_disaster(self, events: List[Dict]) -> Optional[DisasterEvent]:
-        """Determine which disaster event to prioritize"""
-        disasters = [event["disaster"] for event in events if "disaster" in event]
-        
-        if not disasters:
-            return None
-        
-        return max(disasters, key=lambda disaster: (
-            disaster.severity.value,
-            disaster.casualties,
-            disaster.infrastructure_damage
-        ))
-    
+    def _is_active(self, disaster: DisasterEvent) -> bool:
+        return any(d.event_id == disaster.event_id for d in self.environment.active_disasters)
+
+    def _active_event_ids(self) -> Set[str]:
+        return {disaster.event_id for disaster in self.environment.active_disasters}
+
+    def throughput(self) -> Dict[str, float]:
+        """Disasters dispatched and closed, and closed per second since the FSM started"""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        handled = self.context.handled
+        if self.workers:
+            queued = len(self.work_queue)
+            recovering = self.work_queue.in_progress
+        else:
+            queued = len(self.context.pending_disasters)
+            recovering = len(self.context.recovering)
+        stats = {
+            "dispatched": self.context.dispatched,
+            "handled": handled,
+            "queued": queued,
+            "recovering": recovering,
+            "seconds": elapsed,
+            "handled_per_second": handled / elapsed if elapsed else 0.0,
+        }
+        if self.workers:
+            stats["abandoned"] = self.work_queue.stats.abandoned
+        return stats
+
+    def _fsm_started(self):
+        self._running_fsms += 1
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+
+    def _fsm_ended(self):
+        """Log throughput and save the trace once the last FSM of this agent ends"""
+        self._running_fsms -= 1
+        if self._running_fsms:
+            return
+        if self.batch_size > 1 or self.workers:
+            stats = self.throughput()
+            self._log_trace(
+                f"Throughput: {stats['handled']} disasters handled in {stats['seconds']:.1f}s "
+                f"({stats['handled_per_second']:.2f}/s)"
+            )
+            if stats.get("abandoned"):
+                self._log_trace(f"Abandoned at shutdown: {stats['abandoned']} queued disaster(s)")
+        self._save_trace()
+        self._log_trace(f"Execution trace saved to {self.trace_file}")
+
     def _save_trace(self):
         """Save execution trace to file"""
         with open(self.trace_file, "w", encoding="utf-8") as f:
@@ -251,7 +356,7 @@ class GoalReactiveResponseAgent(Agent):
             f.write(f"Generated: {datetime.now().isoformat()}\n\n")
             
             f.write("GOALS\n")
-            goals = self.agent_data["goals"]
+            goals = self.context.goals
             f.write("- " + goals.rescue_people + "\n")
             f.write("- " + goals.stabilize_infrastructure + "\n")
             f.write("- " + goals.optimize_resources + "\n\n")
@@ -266,6 +371,11 @@ class GoalReactiveResponseAgent(Agent):
             else:
                 f.write("No state transitions recorded.\n")
             
+            if self.batch_size > 1 or self.workers:
+                f.write("\nTHROUGHPUT\n")
+                for key, value in self.throughput().items():
+                    f.write(f"- {key}: {value:.3f}\n" if isinstance(value, float) else f"- {key}: {value}\n")
+            
             f.write("\nTRACE LOG\n")
             f.write("-" * 90 + "\n")
             for entry in self.agent_data["trace"]:
@@ -275,14 +385,36 @@ class GoalReactiveResponseAgent(Agent):
         """FSM Behaviour managing state transitions"""
         
         async def on_start(self):
-            agent_data = self.agent.agent_data
-            agent_data["_log_trace"]("Starting goal-driven reactive response agent")
-            agent_data["_log_trace"](f"Initial state: {ResponseState.MONITORING.name}")
+            self.agent._log_trace("Starting goal-driven reactive response agent")
+            self.agent._log_trace(f"Initial state: {ResponseState.MONITORING.name}")
+            self.agent._fsm_started()
         
         async def on_end(self):
             self.agent._log_trace("FSM Behaviour ended")
-            self.agent._save_trace()
-            self.agent._log_trace(f"Execution trace saved to {self.agent.trace_file}")
+            if self.agent.workers:
+                # No more cycles: the workers stop at their next claim or recovery
+                # pass; queued disasters are left unhandled (work_queue.stats.abandoned)
+                self.agent.work_queue.close()
+            self.agent._fsm_ended()
+    
+    class WorkerFSM(FSMBehaviour):
+        """One pool worker: CLAIM -> ASSESSING -> DISPATCHING -> RECOVERY -> CLAIM"""
+        
+        def __init__(self, slot: WorkerSlot):
+            super().__init__()
+            self.slot = slot
+        
+        async def on_start(self):
+            self.agent._log_trace(f"{self.slot.worker_id}: started")
+            self.agent._fsm_started()
+        
+        async def on_end(self):
+            if self.slot.disaster is not None and self.agent.work_queue.owners.get(
+                    self.slot.disaster.event_id) == self.slot.worker_id:
+                # Stopped mid-disaster: hand it back so another worker can take it
+                self.agent.work_queue.release(self.slot.disaster.event_id, self.slot.worker_id)
+            self.agent._log_trace(f"{self.slot.worker_id}: ended")
+            self.agent._fsm_ended()
     
     class CycleController(State):
         """Controller state that manages simulation cycles"""
@@ -290,16 +422,22 @@ class GoalReactiveResponseAgent(Agent):
         async def run(self):
             agent = self.agent
             agent.current_cycle += 1
+            agent.context.cycle = agent.current_cycle
             
             agent._log_trace(f"--- CYCLE {agent.current_cycle}/{agent.cycles} ---")
             
             # Update environment
             agent.environment.update_environment()
+            if getattr(agent.environment, "finished", False):
+                # Replayed percept recording has run out
+                agent._log_trace("Percept recording exhausted")
+                _finish(self)
+                return
             percepts = agent.environment.get_all_percepts()
             
             # Derive events
             events = agent._derive_events(percepts)
-            agent.agent_data["events"] = events
+            agent.context.events = events
             
             # Log events
             for event in events:
@@ -307,25 +445,36 @@ class GoalReactiveResponseAgent(Agent):
                     f"EVENT {event['type']} @ {event['location']} | {event['details']}"
                 )
             
+            if agent.workers:
+                # Pool mode: the workers handle disasters; the controller only feeds them
+                agent.context.events = []
+                for event in events:
+                    if event["type"] == "DISASTER_DETECTED":
+                        agent.work_queue.push(event["disaster"])
+            
             # Check if simulation should continue
             if agent.current_cycle >= agent.cycles:
                 agent._log_trace("Simulation completed")
-                self.kill()  # End FSM
+                _finish(self)  # End FSM
+            elif agent.workers:
+                self.set_next_state("CONTROLLER")
             else:
                 # Continue to MONITORING state
                 self.set_next_state(ResponseState.MONITORING.value)
             
-            await asyncio.sleep(1)
+            await asyncio.sleep(2 * agent.state_delay)
     
     async def setup(self):
         """Agent setup - called when agent starts"""
-        print("\n" + "=" * 90)
-        print("LAB 3: Goals, Events, and Reactive Behavior (SPADE Version)")
-        print("Disaster Response & Relief Coordination System")
-        print("=" * 90)
-        print(f"Agent JID: {self.jid}")
-        print(f"Cycles: {self.cycles}")
-        print("=" * 90 + "\n")
+        console.summary("\n" + "=" * 90)
+        console.summary("LAB 3: Goals, Events, and Reactive Behavior (SPADE Version)")
+        console.summary("Disaster Response & Relief Coordination System")
+        console.summary("=" * 90)
+        console.summary(f"Agent JID: {self.jid}")
+        console.summary(f"Cycles: {self.cycles}")
+        if self.workers:
+            console.summary(f"Workers: {self.workers}")
+        console.summary("=" * 90 + "\n")
         
         # Create FSM behaviour
         fsm = self.ResponseFSM()
@@ -333,52 +482,66 @@ class GoalReactiveResponseAgent(Agent):
         # Add controller state
         fsm.add_state(name="CONTROLLER", state=self.CycleController(), initial=True)
         
-        # Add FSM states
-        fsm.add_state(name=ResponseState.MONITORING.value, state=MonitoringState())
-        fsm.add_state(name=ResponseState.ASSESSING.value, state=AssessingState())
-        fsm.add_state(name=ResponseState.DISPATCHING.value, state=DispatchingState())
-        fsm.add_state(name=ResponseState.RECOVERY.value, state=RecoveryState())
+        # Add FSM states, each running its action on the shared ResponseMachine
+        for response_state in ResponseState:
+            fsm.add_state(name=response_state.value, state=MachineState(response_state))
         
-        # Add transitions
+        # Add transitions: the machine's table, with the end of a cycle going to the controller
         fsm.add_transition(source="CONTROLLER", dest=ResponseState.MONITORING.value)
-        fsm.add_transition(source=ResponseState.MONITORING.value, dest=ResponseState.MONITORING.value)
-        fsm.add_transition(source=ResponseState.MONITORING.value, dest=ResponseState.ASSESSING.value)
+        edges = {(source.value, dest.value if dest is not None else "CONTROLLER")
+                 for (source, _trigger), (dest, _reason) in TRANSITIONS.items()}
+        for source, dest in sorted(edges):
+            fsm.add_transition(source=source, dest=dest)
+        
+        if self.workers:
+            fsm.add_transition(source="CONTROLLER", dest="CONTROLLER")
+            for index in range(1, self.workers + 1):
+                self.add_behaviour(self._worker_fsm(f"worker-{self.jid.localpart}-{index}"))
+        
+        if self.feed_queue or not self.workers:
+            self.add_behaviour(fsm)
+    
+    def _worker_fsm(self, worker_id: str) -> "GoalReactiveResponseAgent.WorkerFSM":
+        slot = WorkerSlot(worker_id)
+        fsm = self.WorkerFSM(slot)
+        fsm.add_state(name=WORKER_CLAIM, state=WorkerClaimState(slot), initial=True)
+        fsm.add_state(name=ResponseState.ASSESSING.value, state=WorkerAssessingState(slot))
+        fsm.add_state(name=ResponseState.DISPATCHING.value, state=WorkerDispatchingState(slot))
+        fsm.add_state(name=ResponseState.RECOVERY.value, state=WorkerRecoveryState(slot))
+        fsm.add_transition(source=WORKER_CLAIM, dest=WORKER_CLAIM)
+        fsm.add_transition(source=WORKER_CLAIM, dest=ResponseState.ASSESSING.value)
         fsm.add_transition(source=ResponseState.ASSESSING.value, dest=ResponseState.DISPATCHING.value)
         fsm.add_transition(source=ResponseState.DISPATCHING.value, dest=ResponseState.RECOVERY.value)
-        fsm.add_transition(source=ResponseState.RECOVERY.value, dest=ResponseState.MONITORING.value)
-        fsm.add_transition(source=ResponseState.MONITORING.value, dest="CONTROLLER")
-        fsm.add_transition(source=ResponseState.ASSESSING.value, dest="CONTROLLER")
-        fsm.add_transition(source=ResponseState.DISPATCHING.value, dest="CONTROLLER")
-        fsm.add_transition(source=ResponseState.RECOVERY.value, dest="CONTROLLER")
-        
-        self.add_behaviour(fsm)
+        fsm.add_transition(source=ResponseState.RECOVERY.value, dest=ResponseState.RECOVERY.value)
+        fsm.add_transition(source=ResponseState.RECOVERY.value, dest=WORKER_CLAIM)
+        return fsm
 
 
 async def main():
     """Main entry point for Lab 3"""
     random.seed(419)
     
-    print("\nLAB 3: Goals, Events, and Reactive Behavior (SPADE Version)")
-    print("Disaster Response & Relief Coordination System\n")
+    console.summary("\nLAB 3: Goals, Events, and Reactive Behavior (SPADE Version)")
+    console.summary("Disaster Response & Relief Coordination System\n")
     
-    print(f"XMPP Configuration:")
-    print(f"  Server: {XMPP_SERVER}")
-    print(f"  Agent JID: {RESPONSE_JID}")
-    print(f"  Note: Update XMPP_SERVER variable for remote servers\n")
+    console.summary(f"XMPP Configuration:")
+    console.summary(f"  Server: {XMPP_SERVER}")
+    console.summary(f"  Agent JID: {RESPONSE_JID}")
+    console.summary(f"  Note: Set xmpp_server in agents.json for remote servers\n")
     
     environment = DisasterEnvironment()
     agent = GoalReactiveResponseAgent(RESPONSE_JID, RESPONSE_PASSWORD, environment, cycles=8)
     
     await agent.start()
     
-    print("✓ Response agent is running")
-    print("Agent will stop automatically after 8 cycles\n")
+    console.summary("✓ Response agent is running")
+    console.summary("Agent will stop automatically after 8 cycles\n")
     
     # Wait for agent to complete
     while agent.is_alive():
         await asyncio.sleep(1)
     
-    print("\n✓ Agent stopped successfully\n")
+    console.summary("\n✓ Agent stopped successfully\n")
 
 
 if __name__ == "__main__":
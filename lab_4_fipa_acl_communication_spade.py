@@ -8,24 +8,38 @@ messaging capabilities for disaster response coordination.
 import asyncio
 import json
 import random
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from spade.agent import Agent
 from spade.behaviour import CyclicBehaviour
 from spade.message import Message
 from spade.template import Template
 
+from agent_config import load_config
+from console import console
 from environment import DisasterEnvironment, DisasterEvent, Location, Severity
+from change_publisher import NOTICE_RESOLVED, AlertLedger, ChangeOnlyPublisher
+from contract_net import (CONTRACT_NET_PROTOCOL, ContractNetInitiator, Proposal, commit_proposal,
+                          make_proposal)
+from conversations import ESCALATE, ConversationTable, RetryPolicy
+from flow_control import FLOW_CONTROL_PROTOCOL, CreditGranter, CreditWindow
 
 
-# XMPP Configuration
-XMPP_SERVER = "localhost"
-SENSOR_JID = f"sensor_comm@{XMPP_SERVER}"
-RESPONSE_JID = f"response_comm@{XMPP_SERVER}"
-COORDINATOR_JID = f"coordinator_comm@{XMPP_SERVER}"
-PASSWORD = "lab4pass"
+# XMPP Configuration - override in agents.json (see agent_config.py)
+_config = load_config()
+XMPP_SERVER = _config.server
+SENSOR_JID = _config.jid("sensor_comm")
+RESPONSE_JID = _config.jid("response_comm")
+COORDINATOR_JID = _config.jid("coordinator_comm")
+SENSOR_PASSWORD = _config.password("sensor_comm")
+RESPONSE_PASSWORD = _config.password("response_comm")
+COORDINATOR_PASSWORD = _config.password("coordinator_comm")
+
+# Most recent trace entries each agent keeps in memory (and saves to the trace file)
+TRACE_LIMIT = 100_000
 
 
 class SensorCommunicatorAgent(Agent):
@@ -33,11 +47,17 @@ class SensorCommunicatorAgent(Agent):
     Sensor agent that detects disasters and sends INFORM messages via SPADE
     """
     
-    def __init__(self, jid, password, environment: DisasterEnvironment):
+    def __init__(self, jid, password, environment: DisasterEnvironment, publish_on_change: bool = False):
         super().__init__(jid, password)
         self.environment = environment
         self.conversation_counter = 0
-        self.trace = []
+        self.trace = deque(maxlen=TRACE_LIMIT)
+        # A dropped RESOLVED would leave its allocation held for good: never evict one
+        self.flow = CreditWindow(keep=lambda alert: alert.get("notice") == NOTICE_RESOLVED)
+        
+        # In publish-on-change mode only new, escalated and resolved events are sent
+        self.publish_on_change = publish_on_change
+        self.publisher = ChangeOnlyPublisher()
         
     def _generate_conversation_id(self) -> str:
         self.conversation_counter += 1
@@ -49,32 +69,86 @@ class SensorCommunicatorAgent(Agent):
     def _log_trace(self, message: str):
         entry = f"[{self._timestamp()}] {self.jid.localpart} | {message}"
         self.trace.append(entry)
-        print(entry)
+        console.info(entry)
+    
+    def flow_stats(self) -> Dict:
+        """Pending alert queue depth, credit and drop/coalesce counters"""
+        return self.flow.snapshot()
     
     class DetectAndInformBehaviour(CyclicBehaviour):
         """Detect disasters and send INFORM messages"""
         
         async def run(self):
+            # Apply any credit grants returned by the response agent
+            await self._collect_credit()
+            
             # Update environment
             self.agent.environment.update_environment()
+            if getattr(self.agent.environment, "finished", False):
+                # Replayed percept recording has run out
+                self.agent._log_trace("Percept recording exhausted")
+                self.kill()
+                return
             percepts = self.agent.environment.get_all_percepts()
             
+            if self.agent.publish_on_change:
+                self._queue_changes(percepts)
+            else:
+                self._queue_snapshot(percepts)
+            
+            # Send only as many alerts as the response agent has credited
+            for content in self.agent.flow.drain():
+                # Create FIPA-ACL INFORM message
+                msg = Message(to=RESPONSE_JID)
+                msg.set_metadata("performative", "inform")
+                msg.set_metadata("ontology", "disaster-response")
+                msg.set_metadata("protocol", "disaster-alert")
+                msg.set_metadata("conversation-id", self.agent._generate_conversation_id())
+                msg.body = json.dumps(content)
+                
+                # Send message
+                await self.send(msg)
+                if content.get("notice") == NOTICE_RESOLVED:
+                    summary = f"{content['event_id']} resolved"
+                else:
+                    summary = f"{content['disaster_type']} at {content['location']}"
+                self.agent._log_trace(
+                    f"SEND INFORM to {RESPONSE_JID.split('@')[0]} | "
+                    f"Conv:{msg.get_metadata('conversation-id')} | "
+                    f"{summary}"
+                )
+            
+            stats = self.agent.flow.snapshot()
+            if stats["queue_depth"]:
+                self.agent._log_trace(
+                    f"THROTTLED | Pending:{stats['queue_depth']} | Credit:{stats['credit']} | "
+                    f"Coalesced:{stats['coalesced']} | Dropped:{stats['dropped']}"
+                )
+            
+            await asyncio.sleep(3)
+        
+        def _queue_changes(self, percepts):
+            """Queue new, escalated and resolved notices keyed by event_id"""
+            for content in self.agent.publisher.diff(percepts):
+                evicted = self.agent.flow.offer(content["event_id"], content)
+                # An evicted announcement must be re-sent on a later tick
+                # (RESOLVED notices are kept, so only NEW and ESCALATED are evicted)
+                if evicted:
+                    self.agent.publisher.forget(evicted["event_id"])
+        
+        def _queue_snapshot(self, percepts):
+            """Queue the first active disaster of every location on every tick"""
             # Check each location for disasters
             for percept in percepts:
                 if percept.active_disasters:
                     disaster = percept.active_disasters[0]
                     
-                    # Create FIPA-ACL INFORM message
-                    msg = Message(to=RESPONSE_JID)
-                    msg.set_metadata("performative", "inform")
-                    msg.set_metadata("ontology", "disaster-response")
-                    msg.set_metadata("protocol", "disaster-alert")
-                    msg.set_metadata("conversation-id", self.agent._generate_conversation_id())
-                    
                     # Set message body with disaster information
                     content = {
                         "message_type": "disaster_detected",
                         "location": percept.location.name,
+                        "latitude": percept.location.latitude,
+                        "longitude": percept.location.longitude,
                         "disaster_type": disaster.disaster_type.value,
                         "severity": disaster.severity.name,
                         "casualties": disaster.casualties,
@@ -82,17 +156,16 @@ class SensorCommunicatorAgent(Agent):
                         "resources_needed": disaster.resources_needed,
                         "event_id": disaster.event_id
                     }
-                    msg.body = json.dumps(content)
                     
-                    # Send message
-                    await self.send(msg)
-                    self.agent._log_trace(
-                        f"SEND INFORM to {RESPONSE_JID.split('@')[0]} | "
-                        f"Conv:{msg.get_metadata('conversation-id')} | "
-                        f"{disaster.disaster_type.value} at {percept.location.name}"
-                    )
-            
-            await asyncio.sleep(3)
+                    # Queue alert; a newer alert for the same location replaces it
+                    self.agent.flow.offer(percept.location.name, content)
+        
+        async def _collect_credit(self):
+            """Drain credit grants from the mailbox without blocking"""
+            while self.mailbox_size() > 0:
+                msg = await self.receive(timeout=0)
+                if msg and msg.get_metadata("protocol") == FLOW_CONTROL_PROTOCOL:
+                    self.agent.flow.grant(json.loads(msg.body).get("credit", 0))
     
     async def setup(self):
         self._log_trace(f"SensorCommunicatorAgent started")
@@ -105,10 +178,23 @@ class ResponseAgent(Agent):
     Response agent that receives INFORM messages and sends REQUEST messages
     """
     
-    def __init__(self, jid, password):
+    def __init__(self, jid, password, retry_policy: Optional[RetryPolicy] = None,
+                 coordinators: Optional[List[str]] = None, bid_timeout: float = 2.0):
+        """
+        retry_policy: how long to wait for AGREE/REFUSE/CONFIRM, how many times
+        to resend an unanswered REQUEST and when to escalate instead
+        coordinators: JIDs of regional coordinators. When given, resources are
+        allocated by contract net (see contract_net.py): a CFP to all of them,
+        bids collected for up to bid_timeout seconds, the best one accepted.
+        """
         super().__init__(jid, password)
         self.active_disasters = {}
-        self.trace = []
+        self.ledger = AlertLedger()
+        self.trace = deque(maxlen=TRACE_LIMIT)
+        self.flow_granters: Dict[str, CreditGranter] = {}
+        self.inform_behaviour = None
+        self.conversations = ConversationTable(retry_policy)
+        self.contract_net = ContractNetInitiator(coordinators, bid_timeout) if coordinators else None
     
     def _timestamp(self) -> str:
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -116,7 +202,87 @@ class ResponseAgent(Agent):
     def _log_trace(self, message: str):
         entry = f"[{self._timestamp()}] {self.jid.localpart} | {message}"
         self.trace.append(entry)
-        print(entry)
+        console.info(entry)
+    
+    def flow_stats(self) -> Dict:
+        """Per-sender mailbox backlog and credit-grant counters"""
+        return {sender: granter.snapshot() for sender, granter in self.flow_granters.items()}
+    
+    def conversation_stats(self) -> Dict:
+        """In-flight REQUEST conversations per protocol state, and retry/escalation counters"""
+        if self.contract_net is not None:
+            return {**self.conversations.snapshot(), "contract_net": self.contract_net.snapshot()}
+        return self.conversations.snapshot()
+    
+    def _contract_net_message(self, to: str, performative: str, conversation_id: str, content: Dict) -> Message:
+        msg = Message(to=to)
+        msg.set_metadata("performative", performative)
+        msg.set_metadata("ontology", "disaster-response")
+        msg.set_metadata("protocol", CONTRACT_NET_PROTOCOL)
+        msg.set_metadata("conversation-id", conversation_id)
+        msg.body = json.dumps(content)
+        return msg
+    
+    def _award_messages(self, cfp) -> List[Message]:
+        """ACCEPT-PROPOSAL to the best remaining bid and REJECT-PROPOSAL to the rest"""
+        proposal = self.contract_net.award(cfp)
+        conversation_id = cfp.conversation_id
+        if proposal is None:
+            self._log_trace(
+                f"UNFILLED CFP | Conv:{conversation_id} | "
+                f"No usable proposal for {cfp.request.get('event_id')}"
+            )
+            return []
+        
+        messages = [self._contract_net_message(proposal.participant, "accept-proposal", conversation_id, {
+            **cfp.request, "resources": proposal.resources
+        })]
+        self._log_trace(
+            f"SEND ACCEPT-PROPOSAL to {proposal.participant.split('@')[0]} | "
+            f"Conv:{conversation_id} | "
+            f"Fit {proposal.fit:.0%}, {proposal.distance_km:.0f} km | {proposal.resources}"
+        )
+        for participant in self.contract_net.losers(cfp):
+            if participant not in cfp.tried:
+                messages.append(self._contract_net_message(participant, "reject-proposal", conversation_id, {
+                    "event_id": cfp.request.get("event_id")
+                }))
+        return messages
+    
+    def _release_messages(self, event_id: str) -> List[Message]:
+        """
+        Release notices for a resolved disaster: to the coordinator, or in
+        contract-net mode to every coordinator (a winner that confirmed
+        after its award timed out holds resources too)
+        """
+        recipients = self.contract_net.participants if self.contract_net is not None else (COORDINATOR_JID,)
+        messages = []
+        for recipient in recipients:
+            msg = Message(to=recipient)
+            msg.set_metadata("performative", "inform")
+            msg.set_metadata("ontology", "disaster-response")
+            msg.set_metadata("protocol", "resource-allocation")
+            msg.body = json.dumps({"action": "release_resources", "event_id": event_id})
+            messages.append(msg)
+        return messages
+    
+    def _credit_message(self, sender: str, credit: int) -> Message:
+        grant_msg = Message(to=sender)
+        grant_msg.set_metadata("performative", "inform")
+        grant_msg.set_metadata("ontology", "disaster-response")
+        grant_msg.set_metadata("protocol", FLOW_CONTROL_PROTOCOL)
+        grant_msg.body = json.dumps({"message_type": "credit_grant", "credit": credit})
+        return grant_msg
+    
+    def _request_message(self, conversation_id: str, request_content: Dict) -> Message:
+        request_msg = Message(to=COORDINATOR_JID)
+        request_msg.set_metadata("performative", "request")
+        request_msg.set_metadata("ontology", "disaster-response")
+        request_msg.set_metadata("protocol", "resource-allocation")
+        request_msg.set_metadata("conversation-id", conversation_id)
+        request_msg.set_metadata("in-reply-to", conversation_id)
+        request_msg.body = json.dumps(request_content)
+        return request_msg
     
     class ReceiveInformBehaviour(CyclicBehaviour):
         """Receive INFORM messages and process them"""
@@ -130,18 +296,44 @@ class ResponseAgent(Agent):
                 
                 if performative == "inform":
                     content = json.loads(msg.body)
+                    event_id = content.get("event_id")
                     self.agent._log_trace(
                         f"RECV INFORM from {msg.sender.localpart} | "
                         f"Conv:{msg.get_metadata('conversation-id')} | "
+                        f"{content.get('notice', 'new')} {event_id} | "
                         f"{content.get('disaster_type')} at {content.get('location')}"
                     )
                     
-                    # Store disaster information
-                    event_id = content.get("event_id")
-                    self.agent.active_disasters[event_id] = content
+                    # Apply the notice idempotently so repeats never re-request resources
+                    action = self.agent.ledger.apply(content)
+                    
+                    if action == "request":
+                        # Store disaster information
+                        self.agent.active_disasters[event_id] = content
+                        
+                        # Send REQUEST to coordinator
+                        await self._request_resources(msg, content)
+                    elif action == "escalate":
+                        self.agent.active_disasters[event_id] = content
+                        self.agent._log_trace(f"ESCALATED {event_id} to {content.get('severity')}")
+                    elif action == "resolve":
+                        self.agent.active_disasters.pop(event_id, None)
+                        self.agent._log_trace(f"RESOLVED {event_id}")
+                        if self.agent.conversations.cancel_event(event_id):
+                            self.agent._log_trace(f"CANCELLED open request for {event_id}")
+                        if self.agent.contract_net is not None and self.agent.contract_net.cancel_event(event_id):
+                            self.agent._log_trace(f"CANCELLED open CFP for {event_id}")
+                        # Hand the event's allocation back to the pool it came from
+                        for release_msg in self.agent._release_messages(event_id):
+                            await self.send(release_msg)
+                    else:
+                        self.agent._log_trace(f"DUPLICATE {event_id} ignored")
                     
-                    # Send REQUEST to coordinator
-                    await self._request_resources(msg, content)
+                    # Return credit to the sensor once the backlog allows it
+                    await self._grant_credit(msg)
+                
+                elif msg.get_metadata("protocol") == CONTRACT_NET_PROTOCOL:
+                    await self._handle_contract_net(msg, performative)
                 
                 elif performative == "agree":
                     content = json.loads(msg.body)
@@ -166,18 +358,77 @@ class ResponseAgent(Agent):
                         f"Conv:{msg.get_metadata('conversation-id')} | "
                         f"{content.get('message')}"
                     )
+                
+                if (performative in ("agree", "refuse", "confirm")
+                        and msg.get_metadata("protocol") != CONTRACT_NET_PROTOCOL):
+                    conversation_id = msg.get_metadata("conversation-id")
+                    if self.agent.conversations.on_reply(conversation_id, performative) is None:
+                        self.agent._log_trace(
+                            f"UNMATCHED {performative.upper()} | Conv:{conversation_id} | "
+                            f"No open conversation in a state expecting it"
+                        )
             
             await asyncio.sleep(0.1)
         
+        async def _grant_credit(self, inform_msg: Message):
+            """Send a flow-control credit grant back to the alert sender"""
+            sender = str(inform_msg.sender)
+            granter = self.agent.flow_granters.setdefault(sender, CreditGranter())
+            credit = granter.on_processed(self.mailbox_size())
+            
+            if credit:
+                await self.send(self.agent._credit_message(sender, credit))
+        
+        async def _handle_contract_net(self, msg: Message, performative: str):
+            """PROPOSE, REFUSE, CONFIRM and FAILURE replies to a CFP"""
+            contract_net = self.agent.contract_net
+            conversation_id = msg.get_metadata("conversation-id")
+            sender = str(msg.sender).split("/")[0]
+            content = json.loads(msg.body)
+            if performative == "propose":
+                summary = f"Fit {content['fit']:.0%}, {content['distance_km']:.0f} km"
+            else:
+                summary = content.get("reason", content.get("message", ""))
+            self.agent._log_trace(
+                f"RECV {performative.upper()} from {sender.split('@')[0]} | "
+                f"Conv:{conversation_id} | "
+                f"{summary}"
+            )
+            
+            cfp = None
+            if performative == "propose":
+                cfp = contract_net.on_propose(conversation_id, Proposal(
+                    participant=sender, resources=content["resources"],
+                    fit=content["fit"], distance_km=content["distance_km"]
+                ))
+            elif performative == "refuse":
+                cfp = contract_net.on_refuse(conversation_id, sender)
+            elif performative == "failure":
+                # The winner could not honour its bid: fall back to the next best
+                cfp = contract_net.on_failure(conversation_id, sender)
+            elif performative == "confirm":
+                contract_net.on_confirm(conversation_id, sender)
+            
+            if cfp is not None:
+                for award_msg in self.agent._award_messages(cfp):
+                    await self.send(award_msg)
+        
+        async def _call_for_proposals(self, conversation_id: str, request_content: Dict):
+            """Send a CFP for the request to every regional coordinator"""
+            contract_net = self.agent.contract_net
+            contract_net.start(conversation_id, request_content)
+            for participant in contract_net.participants:
+                await self.send(self.agent._contract_net_message(
+                    participant, "cfp", conversation_id, request_content
+                ))
+            self.agent._log_trace(
+                f"SEND CFP to {len(contract_net.participants)} coordinators | "
+                f"Conv:{conversation_id} | "
+                f"Request resources for {request_content['disaster_location']}"
+            )
+        
         async def _request_resources(self, inform_msg: Message, content: Dict):
             """Send REQUEST message to coordinator"""
-            request_msg = Message(to=COORDINATOR_JID)
-            request_msg.set_metadata("performative", "request")
-            request_msg.set_metadata("ontology", "disaster-response")
-            request_msg.set_metadata("protocol", "resource-allocation")
-            request_msg.set_metadata("conversation-id", inform_msg.get_metadata("conversation-id"))
-            request_msg.set_metadata("in-reply-to", inform_msg.get_metadata("conversation-id"))
-            
             request_content = {
                 "action": "allocate_resources",
                 "disaster_location": content["location"],
@@ -186,27 +437,90 @@ class ResponseAgent(Agent):
                 "resources_needed": content["resources_needed"],
                 "event_id": content["event_id"]
             }
-            request_msg.body = json.dumps(request_content)
+            conversation_id = inform_msg.get_metadata("conversation-id")
+            if self.agent.contract_net is not None:
+                request_content["latitude"] = content.get("latitude")
+                request_content["longitude"] = content.get("longitude")
+                await self._call_for_proposals(conversation_id, request_content)
+                return
+            
+            request_msg = self.agent._request_message(conversation_id, request_content)
             
             await self.send(request_msg)
+            self.agent.conversations.start(conversation_id, request_content, content["event_id"])
             self.agent._log_trace(
                 f"SEND REQUEST to {COORDINATOR_JID.split('@')[0]} | "
                 f"Conv:{request_msg.get_metadata('conversation-id')} | "
                 f"Request resources for {content['location']}"
             )
     
+    class ConversationTimeoutBehaviour(CyclicBehaviour):
+        """Resend REQUESTs whose reply is overdue, or escalate once retries run out"""
+        
+        async def run(self):
+            conversations = self.agent.conversations
+            
+            # Credit withheld while the shared INFORM mailbox was full
+            backlog = self.agent.inform_behaviour.mailbox_size() if self.agent.inform_behaviour else 0
+            for sender, granter in self.agent.flow_granters.items():
+                credit = granter.release(backlog)
+                if credit:
+                    await self.send(self.agent._credit_message(sender, credit))
+                    self.agent._log_trace(f"RELEASED {credit} withheld credit to {sender.split('@')[0]}")
+            
+            if self.agent.contract_net is not None:
+                # Bid deadline passed: award with the proposals that arrived.
+                # Confirm deadline passed: the winner counts as failed, award the next bid
+                for cfp in self.agent.contract_net.expired():
+                    if cfp.tried:
+                        self.agent._log_trace(
+                            f"CONFIRM TIMEOUT | Conv:{cfp.conversation_id} | "
+                            f"No CONFIRM or FAILURE for {cfp.request.get('event_id')}"
+                        )
+                    for award_msg in self.agent._award_messages(cfp):
+                        await self.send(award_msg)
+            
+            for conversation, action in conversations.expire():
+                if action == ESCALATE:
+                    self.agent._log_trace(
+                        f"ESCALATE Conv:{conversation.conversation_id} | "
+                        f"No reply after {conversation.attempts} attempt(s) for {conversation.event_id}"
+                    )
+                    continue
+                
+                await self.send(self.agent._request_message(conversation.conversation_id, conversation.request))
+                self.agent._log_trace(
+                    f"RETRY REQUEST to {COORDINATOR_JID.split('@')[0]} | "
+                    f"Conv:{conversation.conversation_id} | "
+                    f"Attempt {conversation.attempts}"
+                )
+            
+            # Sleep until the next deadline, but wake at least once a second
+            # (and every 0.1 s while CFPs are open; each has a bid or confirm deadline)
+            next_deadline = conversations.next_deadline()
+            delay = 1.0 if next_deadline is None else next_deadline - conversations.clock()
+            if self.agent.contract_net is not None and len(self.agent.contract_net):
+                delay = min(delay, 0.1)
+            await asyncio.sleep(min(1.0, max(0.05, delay)))
+    
     async def setup(self):
         self._log_trace(f"ResponseAgent started")
         b = self.ReceiveInformBehaviour()
         template = Template()
         template.set_metadata("performative", "inform")
         self.add_behaviour(b, template)
+        self.inform_behaviour = b
         
-        # Also listen for agree, refuse, confirm
+        # Also listen for agree, refuse, confirm (and the contract-net propose, failure)
         b2 = self.ReceiveInformBehaviour()
-        template2 = Template()
-        template2.set_metadata("performative", "agree", "refuse", "confirm")
+        template2 = Template(metadata={"performative": "agree"})
+        for performative in ("refuse", "confirm", "propose", "failure"):
+            template2 = template2 | Template(metadata={"performative": performative})
         self.add_behaviour(b2, template2)
+        
+        # Matches no message: without a template SPADE would queue a copy of every
+        # incoming message for this behaviour, which never reads them
+        self.add_behaviour(self.ConversationTimeoutBehaviour(), ~Template())
 
 
 class CoordinatorAgent(Agent):
@@ -214,16 +528,28 @@ class CoordinatorAgent(Agent):
     Coordinator agent that handles resource allocation requests
     """
     
-    def __init__(self, jid, password):
+    def __init__(self, jid, password, location: Optional[Location] = None,
+                 resources: Optional[Dict[str, int]] = None, journal=None):
+        """
+        location: where this (regional) coordinator's resources are based; bids
+        in contract-net mode report their distance to the disaster from here
+        resources: initial resource pool (the lab defaults when omitted)
+        journal: resource_journal.ResourceJournal to recover the pool from and
+        log every new allocation to (the owner closes it)
+        """
         super().__init__(jid, password)
-        self.available_resources = {
+        self.location = location
+        self.available_resources = dict(resources) if resources is not None else {
             "rescue_teams": 20,
             "medical_kits": 100,
             "fire_trucks": 10,
             "ambulances": 15
         }
         self.allocated_resources = {}
-        self.trace = []
+        self.journal = journal
+        if journal is not None:
+            self.available_resources, self.allocated_resources = journal.recover(self.available_resources)
+        self.trace = deque(maxlen=TRACE_LIMIT)
     
     def _timestamp(self) -> str:
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -231,7 +557,40 @@ class CoordinatorAgent(Agent):
     def _log_trace(self, message: str):
         entry = f"[{self._timestamp()}] {self.jid.localpart} | {message}"
         self.trace.append(entry)
-        print(entry)
+        console.info(entry)
+    
+    def allocate(self, event_id: str, resources_needed: Dict[str, int]) -> Tuple[bool, Dict[str, int], bool]:
+        """
+        Reserve the managed part of a request from the pool. Returns (granted,
+        resources, already_allocated); a repeated request for an allocated
+        event is granted its existing allocation without deducting again.
+        """
+        if event_id in self.allocated_resources:
+            return True, self.allocated_resources[event_id], True
+        
+        managed_resources = {resource: amount for resource, amount in resources_needed.items()
+                             if resource in self.available_resources}
+        if not managed_resources or any(self.available_resources[resource] < amount
+                                        for resource, amount in managed_resources.items()):
+            return False, managed_resources, False
+        
+        for resource, amount in managed_resources.items():
+            self.available_resources[resource] -= amount
+        self.allocated_resources[event_id] = managed_resources
+        if self.journal is not None:
+            self.journal.record(event_id, managed_resources)
+        return True, managed_resources, False
+    
+    def release(self, event_id: str) -> Optional[Dict[str, int]]:
+        """Return an event's allocation to the pool (None if it holds none)"""
+        resources = self.allocated_resources.pop(event_id, None)
+        if resources is None:
+            return None
+        for resource, amount in resources.items():
+            self.available_resources[resource] = self.available_resources.get(resource, 0) + amount
+        if self.journal is not None:
+            self.journal.release(event_id)
+        return resources
     
     class HandleRequestBehaviour(CyclicBehaviour):
         """Handle REQUEST messages for resource allocation"""
@@ -252,29 +611,114 @@ class CoordinatorAgent(Agent):
                     
                     if content.get("action") == "allocate_resources":
                         await self._allocate_resources(msg, content)
+                
+                elif performative == "inform":
+                    content = json.loads(msg.body)
+                    if content.get("action") == "release_resources":
+                        released = self.agent.release(content.get("event_id"))
+                        self.agent._log_trace(
+                            f"RECV RELEASE from {msg.sender.localpart} | "
+                            f"{content.get('event_id')} | "
+                            f"{f'Returned {released}' if released else 'Nothing allocated'}"
+                        )
+                
+                elif performative == "cfp":
+                    await self._propose(msg, json.loads(msg.body))
+                
+                elif performative == "accept-proposal":
+                    await self._commit(msg, json.loads(msg.body))
+                
+                elif performative == "reject-proposal":
+                    self.agent._log_trace(
+                        f"RECV REJECT-PROPOSAL from {msg.sender.localpart} | "
+                        f"Conv:{msg.get_metadata('conversation-id')}"
+                    )
             
             await asyncio.sleep(0.1)
         
-        async def _allocate_resources(self, request_msg: Message, content: Dict):
-            """Allocate resources and send AGREE/REFUSE + CONFIRM"""
-            resources_needed = content.get("resources_needed", {})
-            event_id = content.get("event_id")
+        def _reply(self, msg: Message, performative: str, content: Dict) -> Message:
+            reply = Message(to=str(msg.sender))
+            reply.set_metadata("performative", performative)
+            reply.set_metadata("ontology", "disaster-response")
+            reply.set_metadata("protocol", CONTRACT_NET_PROTOCOL)
+            reply.set_metadata("conversation-id", msg.get_metadata("conversation-id"))
+            reply.set_metadata("in-reply-to", msg.get_metadata("conversation-id"))
+            reply.body = json.dumps(content)
+            return reply
+        
+        async def _propose(self, cfp_msg: Message, content: Dict):
+            """Bid on a CFP with what this region can commit, or refuse"""
+            conversation_id = cfp_msg.get_metadata("conversation-id")
+            location = self.agent.location
+            proposal = make_proposal(
+                str(self.agent.jid), self.agent.available_resources, content,
+                location.latitude if location else None, location.longitude if location else None
+            )
+            
+            if proposal is None:
+                await self.send(self._reply(cfp_msg, "refuse", {
+                    "reason": "No managed resources available",
+                    "event_id": content.get("event_id")
+                }))
+                self.agent._log_trace(
+                    f"SEND REFUSE to {cfp_msg.sender.localpart} | "
+                    f"Conv:{conversation_id} | "
+                    f"Nothing to offer"
+                )
+                return
             
-            # Filter managed resources
-            managed_resources = {}
-            for resource, amount in resources_needed.items():
-                if resource in self.agent.available_resources:
-                    managed_resources[resource] = amount
+            await self.send(self._reply(cfp_msg, "propose", {
+                "resources": proposal.resources,
+                "fit": proposal.fit,
+                "distance_km": proposal.distance_km,
+                "event_id": content.get("event_id")
+            }))
+            self.agent._log_trace(
+                f"SEND PROPOSE to {cfp_msg.sender.localpart} | "
+                f"Conv:{conversation_id} | "
+                f"Fit {proposal.fit:.0%}, {proposal.distance_km:.0f} km"
+            )
+        
+        async def _commit(self, accept_msg: Message, content: Dict):
+            """Commit an accepted proposal and CONFIRM it, or report FAILURE"""
+            conversation_id = accept_msg.get_metadata("conversation-id")
+            event_id = content.get("event_id")
+            resources = content.get("resources", {})
             
-            # Check availability
-            can_allocate = True
-            if managed_resources:
-                for resource, amount in managed_resources.items():
-                    if self.agent.available_resources.get(resource, 0) < amount:
-                        can_allocate = False
-                        break
+            already_allocated = event_id in self.agent.allocated_resources
+            if commit_proposal(self.agent.available_resources, self.agent.allocated_resources,
+                               event_id, resources):
+                if not already_allocated and self.agent.journal is not None:
+                    self.agent.journal.record(event_id, resources)
+                await self.send(self._reply(accept_msg, "confirm", {
+                    "message": f"Resources allocated to {content.get('disaster_location')}",
+                    "allocation": self.agent.allocated_resources[event_id],
+                    "remaining_resources": self.agent.available_resources.copy()
+                }))
+                self.agent._log_trace(
+                    f"SEND CONFIRM to {accept_msg.sender.localpart} | "
+                    f"Conv:{conversation_id} | "
+                    f"Allocation complete: {resources}"
+                )
             else:
-                can_allocate = False
+                await self.send(self._reply(accept_msg, "failure", {
+                    "reason": "Resources committed elsewhere since the proposal",
+                    "available_resources": self.agent.available_resources.copy()
+                }))
+                self.agent._log_trace(
+                    f"SEND FAILURE to {accept_msg.sender.localpart} | "
+                    f"Conv:{conversation_id} | "
+                    f"Proposal no longer available"
+                )
+        
+        async def _allocate_resources(self, request_msg: Message, content: Dict):
+            """Allocate resources and send AGREE/REFUSE + CONFIRM"""
+            event_id = content.get("event_id")
+            can_allocate, managed_resources, already_allocated = self.agent.allocate(
+                event_id, content.get("resources_needed", {})
+            )
+            if already_allocated:
+                self.agent._log_trace(f"DUPLICATE REQUEST for {event_id} | Re-confirming existing allocation")
             
             conversation_id = request_msg.get_metadata("conversation-id")
             
@@ -295,12 +739,6 @@ class CoordinatorAgent(Agent):
                 }
                 agree_msg.body = json.dumps(agree_content)
                 
-                # Deduct resources
-                for resource, amount in managed_resources.items():
-                    self.agent.available_resources[resource] -= amount
-                
-                self.agent.allocated_resources[event_id] = managed_resources
-                
                 await self.send(agree_msg)
                 self.agent._log_trace(
                     f"SEND AGREE to {request_msg.sender.localpart} | "
@@ -360,55 +798,93 @@ class CoordinatorAgent(Agent):
         b = self.HandleRequestBehaviour()
         template = Template()
         template.set_metadata("performative", "request")
+        # Release notices for resolved disasters; contract-net mode: calls for
+        # proposals and the answers to our bids
+        for performative in ("inform", "cfp", "accept-proposal", "reject-proposal"):
+            template = template | Template(metadata={"performative": performative})
         self.add_behaviour(b, template)
 
 
-async def main():
-    """Main entry point for Lab 4"""
+def regional_coordinators(count: int, environment: DisasterEnvironment) -> List["CoordinatorAgent"]:
+    """Contract-net mode: `count` coordinators, each with the default pool, based at the lab locations in turn"""
+    coordinators = []
+    for index in range(1, count + 1):
+        credentials = _config.regional("coordinator_comm", index)
+        location = environment.locations[(index - 1) % len(environment.locations)]
+        coordinators.append(CoordinatorAgent(credentials.jid, credentials.password, location=location))
+    return coordinators
+
+
+async def main(coordinators: int = 1, container: bool = False):
+    """
+    Main entry point for Lab 4. With coordinators > 1, resources are
+    allocated by contract net across that many regional coordinators. With
+    container=True all agents share one AgentContainer and exchange messages
+    in memory, so no XMPP server is needed.
+    """
     random.seed(404)
     
-    print("\n" + "=" * 90)
-    print("LAB 4: Agent Communication Using FIPA-ACL (SPADE Version)")
-    print("Disaster Response & Relief Coordination System")
-    print("=" * 90 + "\n")
+    console.summary("\n" + "=" * 90)
+    console.summary("LAB 4: Agent Communication Using FIPA-ACL (SPADE Version)")
+    console.summary("Disaster Response & Relief Coordination System")
+    console.summary("=" * 90 + "\n")
     
-    print(f"XMPP Configuration:")
-    print(f"  Server: {XMPP_SERVER}")
-    print(f"  Sensor Agent: {SENSOR_JID}")
-    print(f"  Response Agent: {RESPONSE_JID}")
-    print(f"  Coordinator Agent: {COORDINATOR_JID}")
-    print(f"  Note: Update XMPP_SERVER variable for remote servers\n")
+    console.summary(f"XMPP Configuration:")
+    console.summary(f"  Server: {XMPP_SERVER}")
+    console.summary(f"  Sensor Agent: {SENSOR_JID}")
+    console.summary(f"  Response Agent: {RESPONSE_JID}")
+    console.summary(f"  Coordinator Agent: {COORDINATOR_JID}" if coordinators == 1 else
+                    f"  Coordinator Agents: {coordinators} regional (contract net)")
+    console.summary(f"  Note: Set xmpp_server in agents.json for remote servers\n")
     
     # Create environment
     environment = DisasterEnvironment()
     
     # Create and start agents
-    sensor = SensorCommunicatorAgent(SENSOR_JID, PASSWORD, environment)
-    response = ResponseAgent(RESPONSE_JID, PASSWORD)
-    coordinator = CoordinatorAgent(COORDINATOR_JID, PASSWORD)
+    sensor = SensorCommunicatorAgent(SENSOR_JID, SENSOR_PASSWORD, environment, publish_on_change=True)
+    if coordinators == 1:
+        coordinator_agents = [CoordinatorAgent(COORDINATOR_JID, COORDINATOR_PASSWORD)]
+        response = ResponseAgent(RESPONSE_JID, RESPONSE_PASSWORD)
+    else:
+        coordinator_agents = regional_coordinators(coordinators, environment)
+        response = ResponseAgent(RESPONSE_JID, RESPONSE_PASSWORD,
+                                 coordinators=[str(agent.jid) for agent in coordinator_agents])
     
-    await sensor.start()
-    await response.start()
-    await coordinator.start()
+    host = None
+    if container:
+        from agent_container import AgentContainer
+        host = AgentContainer()
+        for agent in [sensor, response] + coordinator_agents:
+            host.add(agent)
+        await host.start()
+    else:
+        await sensor.start()
+        await response.start()
+        for coordinator in coordinator_agents:
+            await coordinator.start()
     
-    print("✓ All agents started successfully\n")
-    print("=" * 90)
-    print("Agents are communicating via FIPA-ACL messages over XMPP")
-    print("Press Ctrl+C to stop")
-    print("=" * 90 + "\n")
+    console.summary("✓ All agents started successfully\n")
+    console.summary("=" * 90)
+    console.summary("Agents are communicating via FIPA-ACL messages " + ("in one agent container" if container else "over XMPP"))
+    console.summary("Press Ctrl+C to stop")
+    console.summary("=" * 90 + "\n")
     
     try:
         # Run for a specified duration
         await asyncio.sleep(30)  # Run for 30 seconds
     except KeyboardInterrupt:
-        print("\n\nStopping agents...")
+        console.summary("\n\nStopping agents...")
     
     # Stop all agents
-    await sensor.stop()
-    await response.stop()
-    await coordinator.stop()
+    if host is not None:
+        await host.stop()
+    else:
+        await sensor.stop()
+        await response.stop()
+        for coordinator in coordinator_agents:
+            await coordinator.stop()
     
-    print("\n✓ All agents stopped successfully\n")
+    console.summary("\n✓ All agents stopped successfully\n")
     
     # Save trace logs
     trace_file = Path("logs/LAB4_communication_logs_spade.txt")
@@ -422,21 +898,36 @@ async def main():
         f.write("COMBINED AGENT TRACES\n")
         f.write("=" * 90 + "\n\n")
         
-        all_traces = sensor.trace + response.trace + coordinator.trace
+        all_traces = list(sensor.trace) + list(response.trace)
+        for coordinator in coordinator_agents:
+            all_traces += coordinator.trace
         for entry in sorted(all_traces):
             f.write(entry + "\n")
         
         f.write("\n\nRESOURCE ALLOCATION SUMMARY\n")
         f.write("=" * 90 + "\n")
-        f.write("Remaining Resources:\n")
-        for resource, amount in coordinator.available_resources.items():
-            f.write(f"  {resource}: {amount}\n")
+        for coordinator in coordinator_agents:
+            if len(coordinator_agents) > 1:
+                f.write(f"\n{coordinator.jid} ({coordinator.location.name})\n")
+            f.write("Remaining Resources:\n")
+            for resource, amount in coordinator.available_resources.items():
+                f.write(f"  {resource}: {amount}\n")
+            
+            f.write("\nAllocated to Disasters:\n")
+            for event_id, resources in coordinator.allocated_resources.items():
+                f.write(f"  Event {event_id}: {resources}\n")
+        
+        f.write("\n\nFLOW CONTROL\n")
+        f.write("=" * 90 + "\n")
+        f.write(f"Sensor: {sensor.flow_stats()}\n")
+        for sender, stats in response.flow_stats().items():
+            f.write(f"Response (from {sender}): {stats}\n")
         
-        f.write("\nAllocated to Disasters:\n")
-        for event_id, resources in coordinator.allocated_resources.items():
-            f.write(f"  Event {event_id}: {resources}\n")
+        f.write("\n\nCONVERSATIONS\n")
+        f.write("=" * 90 + "\n")
+        f.write(f"Response: {response.conversation_stats()}\n")
     
-    print(f"Execution trace saved to: {trace_file}\n")
+    console.summary(f"Execution trace saved to: {trace_file}\n")
 
 
 if __name__ == "__main__":
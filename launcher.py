@@ -0,0 +1,475 @@
+"""
+Unified Launcher
+
+Single entry point for every lab agent role and for the offline tools:
+
+    python launcher.py sensor-comm
+    python launcher.py --quiet sensor
+    python launcher.py lab4
+    python launcher.py coordinator --journal coordinator_wal
+    python launcher.py simulate --ticks 100 --seed 403
+    python launcher.py record day.rec --ticks 28800
+    python launcher.py fsm-response --replay day.rec --pace max --cycles 28800
+    python launcher.py publish --interval 1.0
+    python launcher.py fsm-response --shared dcit403_percepts
+    python launcher.py trace logs/LAB4_communication_logs_spade.txt
+    python launcher.py bench environment --scale 10000
+    python launcher.py soak --ticks 2000000 --budget 1.0
+    python launcher.py import-times
+
+JIDs, passwords and the XMPP server come from agent_config.py (agents.json or
+--config). SPADE and the lab modules are imported only by the subcommands that
+start agents, so the offline tools start without loading the XMPP stack.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+from agent_config import CONFIG_ENV_VAR
+
+
+LAB4_MODULE = "lab_4_fipa_acl_communication_spade"
+
+# Modules each subcommand imports on top of this launcher; used by `import-times`
+COMMAND_MODULES: Dict[str, Tuple[str, ...]] = {
+    "basic": ("lab1_basic_agent",),
+    "sensor": ("lab2_sensor_agent",),
+    "fsm-response": ("lab_3_goal_event_fsm_agent_spade",),
+    "lab4": (LAB4_MODULE,),
+    "sensor-comm": (LAB4_MODULE,),
+    "response-comm": (LAB4_MODULE,),
+    "coordinator": (LAB4_MODULE,),
+    "simulate": ("environment",),
+    "record": ("environment", "percept_recording"),
+    "publish": ("environment", "shared_percepts"),
+    "trace": ("trace_analysis",),
+    "bench": ("benchmarks",),
+    "soak": ("soak",),
+}
+
+_IMPORT_PROBE = (
+    "import importlib, sys, time\n"
+    "start = time.perf_counter()\n"
+    "for name in sys.argv[1:]:\n"
+    "    importlib.import_module(name)\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+async def _run_agents(agents, duration=None):
+    """Start agents and keep them running until they stop, time out or Ctrl+C"""
+    import asyncio
+
+    from console import console
+
+    for agent in agents:
+        await agent.start()
+    console.summary("✓ Agents running. Press Ctrl+C to stop\n")
+
+    elapsed = 0
+    try:
+        while any(agent.is_alive() for agent in agents):
+            if duration is not None and elapsed >= duration:
+                break
+            await asyncio.sleep(1)
+            elapsed += 1
+    finally:
+        for agent in agents:
+            if agent.is_alive():
+                await agent.stop()
+        console.summary("\n✓ Agents stopped\n")
+        console.flush()
+
+
+def cmd_basic(args):
+    import asyncio
+    from lab1_basic_agent import BasicAgent
+    from agent_config import load_config
+
+    config = load_config()
+    agent = BasicAgent(config.jid("basic_agent"), config.password("basic_agent"))
+    asyncio.run(_run_agents([agent], args.duration))
+
+
+def cmd_sensor(args):
+    import asyncio
+    import lab2_sensor_agent as lab2
+
+    agent = lab2.SensorAgent(lab2.SENSOR_JID, lab2.SENSOR_PASSWORD)
+    asyncio.run(_run_agents([agent], args.duration))
+
+
+def _percept_source(args):
+    """
+    A live DisasterEnvironment, a ReplayEnvironment when --replay is given, or
+    a SharedEnvironment reading another process's `publish` when --shared is
+    """
+    if getattr(args, "replay", None):
+        from percept_recording import PerceptRecording, ReplayEnvironment
+        return ReplayEnvironment(PerceptRecording(args.replay), pace=args.pace)
+    if getattr(args, "shared", None):
+        from shared_percepts import SharedEnvironment, SharedPerceptReader
+        return SharedEnvironment(SharedPerceptReader(args.shared))
+
+    from environment import DisasterEnvironment
+    return DisasterEnvironment()
+
+
+def cmd_fsm_response(args):
+    import asyncio
+    import random
+    import lab_3_goal_event_fsm_agent_spade as lab3
+
+    random.seed(args.seed)
+    detector = None
+    if args.anomaly:
+        from anomaly import AnomalyDetector
+        detector = AnomalyDetector(method=args.anomaly)
+    environment = _percept_source(args)
+    depots = None
+    if args.depots:
+        from depots import DepotNetwork, regional_depots
+        if getattr(environment, "recording", None) is not None:
+            # A replay decodes its locations lazily; depots need them all up front
+            environment.recording.scan_all()
+        depots = DepotNetwork(regional_depots(environment.locations, args.depots), environment.locations)
+    agent = lab3.GoalReactiveResponseAgent(
+        lab3.RESPONSE_JID, lab3.RESPONSE_PASSWORD, environment, cycles=args.cycles,
+        anomaly_detector=detector, batch_size=args.batch, state_delay=args.state_delay,
+        workers=args.workers, depots=depots
+    )
+    asyncio.run(_run_agents([agent], args.duration))
+
+
+def cmd_lab4(args):
+    import asyncio
+    import importlib
+    lab4 = importlib.import_module(LAB4_MODULE)
+    asyncio.run(lab4.main(coordinators=args.coordinators, container=args.container))
+
+
+def _lab4_agent(args):
+    import importlib
+    lab4 = importlib.import_module(LAB4_MODULE)
+
+    role = args.command
+    if role == "sensor-comm":
+        return lab4.SensorCommunicatorAgent(
+            lab4.SENSOR_JID, lab4.SENSOR_PASSWORD, _percept_source(args), publish_on_change=True
+        )
+    if role == "response-comm":
+        from conversations import RetryPolicy
+        policy = RetryPolicy(timeout=args.request_timeout, max_retries=args.max_retries)
+        return lab4.ResponseAgent(lab4.RESPONSE_JID, lab4.RESPONSE_PASSWORD, retry_policy=policy)
+    journal = None
+    if args.journal:
+        from resource_journal import ResourceJournal
+        journal = ResourceJournal(args.journal)
+    return lab4.CoordinatorAgent(lab4.COORDINATOR_JID, lab4.COORDINATOR_PASSWORD, journal=journal)
+
+
+def cmd_lab4_role(args):
+    import asyncio
+    agent = _lab4_agent(args)
+    try:
+        asyncio.run(_run_agents([agent], args.duration))
+    finally:
+        if getattr(agent, "journal", None) is not None:
+            agent.journal.close()
+
+
+def _scenario(args):
+    """Synthetic geography for --locations, or None for the five lab locations"""
+    if not args.locations:
+        return None
+    from geography import GeographyConfig, load_or_generate
+    return load_or_generate(GeographyConfig(layout=args.layout, n_locations=args.locations, seed=args.seed))
+
+
+def cmd_simulate(args):
+    import random
+    from environment import DisasterEnvironment
+
+    if args.restore:
+        from environment_snapshot import load_snapshot
+        environment = load_snapshot(args.restore, reseed=args.seed if args.reseed else None,
+                                    scenario=_scenario(args))
+    else:
+        random.seed(args.seed)
+        environment = DisasterEnvironment(scenario=_scenario(args))
+
+    if args.spread_radius:
+        environment.enable_spread(radius_km=args.spread_radius)
+    if args.hazard_rates:
+        from hazard_rates import load_hazard_rates
+        environment.enable_hazard_rates(load_hazard_rates(args.hazard_rates, environment.locations))
+
+    for _ in range(args.ticks):
+        environment.update_environment()
+
+    if environment.spread_model is not None:
+        print(f"Spread: {environment.spread_model.stats}")
+    if args.save:
+        from environment_snapshot import save_snapshot
+        save_snapshot(environment, args.save)
+        print(f"Snapshot saved to {args.save}")
+    if args.report == "-":
+        environment.write_report(sys.stdout)
+    elif args.report:
+        with open(args.report, "w", encoding="utf-8") as report:
+            environment.write_report(report)
+        print(environment.get_summary())
+        print(f"Report written to {args.report}")
+    else:
+        print(environment.get_summary())
+
+
+def cmd_record(args):
+    import random
+    from environment import DisasterEnvironment
+    from percept_recording import PerceptRecorder
+
+    random.seed(args.seed)
+    environment = DisasterEnvironment()
+    with PerceptRecorder(args.path) as recorder:
+        for _ in range(args.ticks):
+            environment.update_environment()
+            recorder.record(environment.get_all_percepts())
+    print(f"Recorded {args.ticks} ticks to {args.path}")
+
+
+def cmd_publish(args):
+    import random
+    import time
+    from environment import DisasterEnvironment
+    from shared_percepts import SharedPerceptPublisher
+
+    random.seed(args.seed)
+    environment = DisasterEnvironment(scenario=_scenario(args))
+    publisher = SharedPerceptPublisher(environment, name=args.name, capacity=args.capacity)
+    print(f"Publishing {len(environment.locations)} locations to shared memory '{publisher.name}'")
+    try:
+        tick = 0
+        while args.ticks is None or tick < args.ticks:
+            environment.update_environment()
+            publisher.publish()
+            tick += 1
+            if args.interval:
+                time.sleep(args.interval)
+    finally:
+        publisher.close()
+        print(f"Published {publisher.tick} ticks")
+
+
+def cmd_trace(args):
+    from trace_analysis import analyze_file
+
+    print(json.dumps(analyze_file(args.path), indent=2))
+
+
+def cmd_bench(args):
+    from benchmarks import BENCHMARKS
+
+    if args.name not in BENCHMARKS:
+        print(f"Unknown benchmark '{args.name}'. Available: {', '.join(sorted(BENCHMARKS))}")
+        sys.exit(2)
+    results = BENCHMARKS[args.name](args.scale) if args.scale else BENCHMARKS[args.name]()
+    for key, value in results.items():
+        print(f"  {key}: {value:.4f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+def cmd_soak(args):
+    from soak import SoakConfig, run_soak
+
+    config = SoakConfig(ticks=args.ticks, warmup=args.warmup, interval=args.interval,
+                        budget_bytes_per_tick=args.budget, top=args.top)
+    print(f"Soak: {config.ticks} ticks of {', '.join(args.drivers)}, baseline after {config.warmup} or more")
+
+    def on_sample(sample):
+        print(f"  tick {sample.tick:>9}: {sample.traced_bytes / 2**20:8.2f} MiB traced, "
+              f"{sample.growth_bytes / 2**10:+10.1f} KiB since warm-up", flush=True)
+
+    try:
+        report = run_soak(config, args.drivers, on_sample)
+    except (RuntimeError, ValueError) as error:
+        print(f"Soak: {error}")
+        sys.exit(2)
+    print(f"Baseline taken at tick {report.samples[0].tick}")
+    print("Growth by allocation site since warm-up:")
+    for site in report.growth:
+        print(f"  {site.size_diff / 2**10:+10.1f} KiB {site.count_diff:+8} blocks  {site.site}")
+    verdict = "PASS" if report.passed else "FAIL"
+    print(f"{verdict}: {report.bytes_per_tick:.3f} bytes/tick steady state "
+          f"(budget {config.budget_bytes_per_tick:.3f})")
+    if not report.passed:
+        sys.exit(1)
+
+
+def measure_import_times(repeat: int = 3) -> Dict[str, object]:
+    """Best-of-`repeat` cold import time (seconds) of each subcommand, in a fresh interpreter"""
+    figures = {}
+    here = Path(__file__).resolve().parent
+    for command, modules in COMMAND_MODULES.items():
+        samples = []
+        for _ in range(repeat):
+            result = subprocess.run(
+                [sys.executable, "-c", _IMPORT_PROBE, "launcher", *modules],
+                cwd=here, capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                error = result.stderr.strip().splitlines()
+                figures[command] = f"unavailable ({error[-1] if error else 'import failed'})"
+                break
+            samples.append(float(result.stdout.strip()))
+        else:
+            figures[command] = min(samples)
+    return figures
+
+
+def cmd_import_times(args):
+    print(f"Import time per subcommand (best of {args.repeat}, fresh interpreter):")
+    for command, figure in measure_import_times(args.repeat).items():
+        if isinstance(figure, float):
+            print(f"  {command:<14} {figure * 1000:8.1f} ms")
+        else:
+            print(f"  {command:<14} {figure}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="DCIT 403 disaster response agents and tools")
+    parser.add_argument("--config", help="Agent configuration JSON (default: agents.json)")
+    parser.add_argument("--log-level", choices=("detail", "info", "summary", "silent"), default="detail",
+                        help="Agent console output: per-location detail, traces, cycle summaries or nothing")
+    parser.add_argument("--quiet", action="store_true", help="Same as --log-level summary")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    roles = {}
+    for name, handler, help_text in (
+        ("basic", cmd_basic, "Lab 1 basic agent"),
+        ("sensor", cmd_sensor, "Lab 2 sensor agent"),
+        ("sensor-comm", cmd_lab4_role, "Lab 4 sensor communicator agent"),
+        ("response-comm", cmd_lab4_role, "Lab 4 response agent"),
+        ("coordinator", cmd_lab4_role, "Lab 4 coordinator agent"),
+    ):
+        sub = roles[name] = commands.add_parser(name, help=help_text)
+        sub.add_argument("--duration", type=int, help="Stop after this many seconds")
+        sub.set_defaults(handler=handler)
+
+    roles["response-comm"].add_argument("--request-timeout", type=float, default=10.0,
+                                        help="Seconds to wait for AGREE/REFUSE/CONFIRM before resending a REQUEST")
+    roles["response-comm"].add_argument("--max-retries", type=int, default=2,
+                                        help="REQUEST resends before the conversation is escalated")
+
+    sub = roles["fsm-response"] = commands.add_parser("fsm-response", help="Lab 3 goal-event FSM response agent")
+    sub.add_argument("--cycles", type=int, default=8)
+    sub.add_argument("--seed", type=int, default=419)
+    sub.add_argument("--duration", type=int, help="Stop after this many seconds")
+    sub.add_argument("--anomaly", choices=("zscore", "cusum"),
+                     help="Derive TEMP_SPIKE/WATER_RISE from per-location anomaly alarms, not fixed thresholds")
+    sub.add_argument("--batch", type=int, default=1,
+                     help="Dispatch up to this many top-ranked disasters per cycle (batch mode when > 1)")
+    sub.add_argument("--state-delay", type=float, default=0.5, help="Pause after each FSM state, in seconds")
+    sub.add_argument("--workers", type=int, default=0,
+                     help="Handle disasters with this many concurrent worker FSMs sharing a work queue")
+    sub.add_argument("--depots", type=int, default=0,
+                     help="Ship resources from this many depots at the locations, nearest stocked depot first")
+    sub.set_defaults(handler=cmd_fsm_response)
+
+    roles["coordinator"].add_argument("--journal", metavar="DIR",
+                                      help="Recover resources from, and log allocations to, a write-ahead log in DIR")
+
+    # Agents that perceive the environment can run from a percept recording instead
+    for name in ("sensor-comm", "fsm-response"):
+        roles[name].add_argument("--replay", help="Percept recording to replay instead of a live environment")
+        roles[name].add_argument("--pace", choices=("original", "max"), default="original",
+                                 help="Replay at the recorded pace or as fast as possible")
+        roles[name].add_argument("--shared", metavar="NAME",
+                                 help="Read percepts from a `publish` process's shared memory segment")
+
+    sub = commands.add_parser("lab4", help="Lab 4 sensor, response and coordinator agents together")
+    sub.add_argument("--coordinators", type=int, default=1,
+                     help="Allocate by contract net across this many regional coordinators")
+    sub.add_argument("--container", action="store_true",
+                     help="Host all agents in one agent container (in-memory messaging, no XMPP server)")
+    sub.set_defaults(handler=cmd_lab4)
+
+    sub = commands.add_parser("simulate", help="Run the disaster environment offline")
+    sub.add_argument("--ticks", type=int, default=100)
+    sub.add_argument("--seed", type=int, default=403)
+    sub.add_argument("--restore", help="Start from an environment snapshot instead of a fresh environment")
+    sub.add_argument("--reseed", action="store_true", help="Reseed with --seed after --restore (fork a run)")
+    sub.add_argument("--save", help="Write an environment snapshot after the last tick")
+    sub.add_argument("--locations", type=int, help="Generate a synthetic geography with this many locations")
+    sub.add_argument("--layout", choices=("grid", "clustered"), default="grid")
+    sub.add_argument("--spread-radius", type=float,
+                     help="Let fires, floods and storms spread to locations within this many km")
+    sub.add_argument("--hazard-rates", metavar="JSON",
+                     help="Per-location, per-type disaster rates (see hazard_rates.py) instead of one 80%% draw")
+    sub.add_argument("--report", metavar="PATH",
+                     help="Write the summary and every active disaster to PATH ('-' for stdout)")
+    sub.set_defaults(handler=cmd_simulate)
+
+    sub = commands.add_parser("record", help="Record the percept stream of an offline simulation")
+    sub.add_argument("path")
+    sub.add_argument("--ticks", type=int, default=1000)
+    sub.add_argument("--seed", type=int, default=403)
+    sub.set_defaults(handler=cmd_record)
+
+    sub = commands.add_parser("publish", help="Run the environment and publish its ticks to shared memory")
+    sub.add_argument("--name", default="dcit403_percepts", help="Shared memory segment name")
+    sub.add_argument("--ticks", type=int, help="Stop after this many ticks (default: until Ctrl+C)")
+    sub.add_argument("--interval", type=float, default=1.0, help="Seconds between ticks (0: as fast as possible)")
+    sub.add_argument("--capacity", type=int, default=4096, help="Most active disasters one tick can carry")
+    sub.add_argument("--seed", type=int, default=403)
+    sub.add_argument("--locations", type=int, help="Generate a synthetic geography with this many locations")
+    sub.add_argument("--layout", choices=("grid", "clustered"), default="grid")
+    sub.set_defaults(handler=cmd_publish)
+
+    sub = commands.add_parser("trace", help="Summarize a Lab 3/4 execution trace")
+    sub.add_argument("path")
+    sub.set_defaults(handler=cmd_trace)
+
+    sub = commands.add_parser("bench", help="Run an offline benchmark")
+    sub.add_argument("name")
+    sub.add_argument("--scale", type=int, help="Benchmark size (ticks, locations, ...)")
+    sub.set_defaults(handler=cmd_bench)
+
+    sub = commands.add_parser("soak", help="Long headless run that fails if memory keeps growing")
+    sub.add_argument("--ticks", type=int, default=1_000_000)
+    sub.add_argument("--warmup", type=int, default=300_000,
+                     help="Ticks before the baseline at least; extended until the trace buffers are full")
+    sub.add_argument("--interval", type=int, default=100_000, help="Ticks between memory samples")
+    sub.add_argument("--budget", type=float, default=1.0, help="Allowed steady-state growth in bytes per tick")
+    sub.add_argument("--top", type=int, default=10, help="Allocation sites to report")
+    sub.add_argument("--drivers", nargs="+", choices=("lab3", "lab4"), default=["lab3", "lab4"])
+    sub.set_defaults(handler=cmd_soak)
+
+    sub = commands.add_parser("import-times", help="Report import time of each subcommand")
+    sub.add_argument("--repeat", type=int, default=3)
+    sub.set_defaults(handler=cmd_import_times)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.config:
+        # Lab modules read their JIDs from agent_config at import time
+        os.environ[CONFIG_ENV_VAR] = args.config
+    if args.quiet or args.log_level != "detail":
+        from console import LEVELS, configure
+        configure(level=LEVELS["summary" if args.quiet else args.log_level])
+
+    try:
+        args.handler(args)
+    except KeyboardInterrupt:
+        print("\nInterrupted\n")
+
+
+if __name__ == "__main__":
+    main()
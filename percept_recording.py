@@ -0,0 +1,300 @@
+"""
+Percept Stream Recording and Trace-Driven Replay
+
+`PerceptRecorder` captures what `get_all_percepts` returns, tick by tick, into a
+compact append-only file. Locations and DisasterEvents are written once, the
+first time they appear, and ticks refer to them by index, so a disaster that
+stays active for many ticks costs four bytes per tick instead of a full copy.
+A sidecar `.idx` file holds the byte offset of every tick for random access.
+
+`ReplayEnvironment` feeds a recording to an agent in place of
+DisasterEnvironment (it provides `update_environment`, `get_all_percepts`,
+`sense`, `locations` and `active_disasters`), either at the recorded pacing or
+as fast as the agent asks for ticks.
+
+Data file records (little endian): a 1-byte kind and a u32 payload length,
+followed by the payload:
+
+    L  location    latitude, longitude, UTF-8 name
+    D  disaster    environment_snapshot.DISASTER_RECORD
+    T  tick        timestamp, percept count, then per percept: location index,
+                   conditions, smoke flag, disaster count, disaster indices
+"""
+
+import mmap
+import struct
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from environment import DisasterEvent, EnvironmentPercept, Location
+from environment_snapshot import DISASTER_RECORD, pack_disaster, unpack_disaster
+
+
+MAGIC = b"PREC\x01"
+
+KIND_LOCATION = b"L"
+KIND_DISASTER = b"D"
+KIND_TICK = b"T"
+
+_FRAME = struct.Struct("<cI")
+_LOCATION = struct.Struct("<dd")
+_TICK = struct.Struct("<dI")
+_PERCEPT = struct.Struct("<I6d?H")
+
+
+def _location_key(location: Location) -> Tuple:
+    return (location.name, location.latitude, location.longitude)
+
+
+def _index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".idx")
+
+
+class PerceptRecording:
+    """
+    Read-only, memory-mapped view of a percept recording
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._view = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a percept recording")
+
+        self.locations: List[Location] = []
+        self.disasters: List[DisasterEvent] = []
+        self._scanned = len(MAGIC)
+
+        self.offsets = array("Q")
+        index_path = _index_path(self.path)
+        if index_path.exists():
+            self.offsets.frombytes(index_path.read_bytes())
+        else:
+            self.offsets = self._rebuild_index()
+
+    def _rebuild_index(self) -> array:
+        offsets = array("Q")
+        position = len(MAGIC)
+        while position < len(self._view):
+            kind, length = _FRAME.unpack_from(self._view, position)
+            if kind == KIND_TICK:
+                offsets.append(position)
+            position += _FRAME.size + length
+        return offsets
+
+    def _scan_definitions(self, upto: int):
+        """Decode location and disaster definitions that precede byte offset `upto`"""
+        position = self._scanned
+        while position < upto:
+            kind, length = _FRAME.unpack_from(self._view, position)
+            payload = position + _FRAME.size
+            if kind == KIND_LOCATION:
+                latitude, longitude = _LOCATION.unpack_from(self._view, payload)
+                name = self._view[payload + _LOCATION.size:payload + length].decode("utf-8")
+                self.locations.append(Location(latitude, longitude, name or None))
+            elif kind == KIND_DISASTER:
+                self.disasters.append(unpack_disaster(DISASTER_RECORD.unpack_from(self._view, payload), self.locations))
+            position = payload + length
+        self._scanned = max(self._scanned, position)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def timestamp(self, index: int) -> float:
+        """Recorded wall-clock time of one tick, without decoding its percepts"""
+        return _TICK.unpack_from(self._view, self.offsets[index] + _FRAME.size)[0]
+
+    def tick(self, index: int) -> Tuple[float, List[EnvironmentPercept]]:
+        """Timestamp and percepts of one recorded tick"""
+        offset = self.offsets[index]
+        self._scan_definitions(offset)
+
+        position = offset + _FRAME.size
+        timestamp, count = _TICK.unpack_from(self._view, position)
+        position += _TICK.size
+        when = datetime.fromtimestamp(timestamp)
+
+        percepts = []
+        for _ in range(count):
+            location_index, *conditions, smoke, n_disasters = _PERCEPT.unpack_from(self._view, position)
+            position += _PERCEPT.size
+            disaster_indices = struct.unpack_from(f"<{n_disasters}I", self._view, position)
+            position += 4 * n_disasters
+            percepts.append(EnvironmentPercept(when, self.locations[location_index], *conditions, smoke,
+                                               [self.disasters[i] for i in disaster_indices]))
+        return timestamp, percepts
+
+    def __iter__(self) -> Iterator[Tuple[float, List[EnvironmentPercept]]]:
+        for index in range(len(self)):
+            yield self.tick(index)
+
+    def scan_all(self):
+        """Decode every definition in the file (used when appending to a recording)"""
+        self._scan_definitions(len(self._view))
+
+    def close(self):
+        self._view.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PerceptRecorder:
+    """
+    Appends percept ticks to a recording, writing each location and disaster once
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.location_ids: Dict[Tuple, int] = {}
+        self.event_ids: Dict[str, int] = {}
+
+        if self.path.exists() and self.path.stat().st_size > len(MAGIC):
+            # Continue numbering definitions of the existing recording
+            with PerceptRecording(self.path) as existing:
+                existing.scan_all()
+                self.location_ids = {_location_key(l): i for i, l in enumerate(existing.locations)}
+                self.event_ids = {d.event_id: i for i, d in enumerate(existing.disasters)}
+                offsets = existing.offsets
+            _index_path(self.path).write_bytes(offsets.tobytes())
+            self._data = open(self.path, "ab")
+        else:
+            self._data = open(self.path, "wb")
+            self._data.write(MAGIC)
+            _index_path(self.path).write_bytes(b"")
+        self._index = open(_index_path(self.path), "ab")
+        self.ticks_recorded = 0
+
+    def _write(self, kind: bytes, payload: bytes):
+        self._data.write(_FRAME.pack(kind, len(payload)))
+        self._data.write(payload)
+
+    def _location_id(self, location: Location) -> int:
+        key = _location_key(location)
+        if key not in self.location_ids:
+            self.location_ids[key] = len(self.location_ids)
+            self._write(KIND_LOCATION, _LOCATION.pack(location.latitude, location.longitude)
+                        + (location.name or "").encode("utf-8"))
+        return self.location_ids[key]
+
+    def _event_id(self, disaster: DisasterEvent) -> int:
+        if disaster.event_id not in self.event_ids:
+            location_id = self._location_id(disaster.location)
+            self.event_ids[disaster.event_id] = len(self.event_ids)
+            self._write(KIND_DISASTER, pack_disaster(disaster, location_id))
+        return self.event_ids[disaster.event_id]
+
+    def record(self, percepts: List[EnvironmentPercept], timestamp: Optional[float] = None):
+        """Append one tick of percepts"""
+        body = bytearray()
+        for percept in percepts:
+            location_id = self._location_id(percept.location)
+            disaster_ids = [self._event_id(disaster) for disaster in percept.active_disasters]
+            body += _PERCEPT.pack(location_id, percept.temperature, percept.humidity, percept.wind_speed,
+                                  percept.air_quality, percept.seismic_activity, percept.water_level,
+                                  percept.smoke_detected, len(disaster_ids))
+            body += struct.pack(f"<{len(disaster_ids)}I", *disaster_ids)
+
+        when = timestamp if timestamp is not None else time.time()
+        self._index.write(struct.pack("<Q", self._data.tell()))
+        self._write(KIND_TICK, _TICK.pack(when, len(percepts)) + bytes(body))
+        self.ticks_recorded += 1
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordingEnvironment:
+    """
+    Wraps a DisasterEnvironment and records every get_all_percepts result
+    """
+
+    def __init__(self, environment, recorder: PerceptRecorder):
+        self.environment = environment
+        self.recorder = recorder
+
+    def get_all_percepts(self) -> List[EnvironmentPercept]:
+        percepts = self.environment.get_all_percepts()
+        self.recorder.record(percepts)
+        return percepts
+
+    def __getattr__(self, name):
+        return getattr(self.environment, name)
+
+
+class ReplayEnvironment:
+    """
+    Drop-in replacement for DisasterEnvironment that plays back a recording.
+
+    With pace="original" a call to update_environment only moves to the next
+    tick once as much time has passed since the replay started as had passed
+    in the recording, so agents see the recorded rate (never faster). With
+    pace="max" every call moves to the next tick. After the last tick the
+    environment reports no percepts and `finished` becomes True.
+    """
+
+    def __init__(self, recording: PerceptRecording, pace: str = "max"):
+        if pace not in ("max", "original"):
+            raise ValueError("pace must be 'max' or 'original'")
+        self.recording = recording
+        self.pace = pace
+        self.cursor = -1
+        self.finished = len(recording) == 0
+        self._percepts: List[EnvironmentPercept] = []
+        self._first_timestamp: Optional[float] = None
+        self._started: Optional[float] = None
+
+    @property
+    def locations(self) -> List[Location]:
+        return self.recording.locations
+
+    @property
+    def active_disasters(self) -> List[DisasterEvent]:
+        seen = {}
+        for percept in self._percepts:
+            for disaster in percept.active_disasters:
+                seen.setdefault(disaster.event_id, disaster)
+        return list(seen.values())
+
+    def update_environment(self):
+        """Advance to the next recorded tick (once it is due, under original pacing)"""
+        next_index = self.cursor + 1
+        if next_index >= len(self.recording):
+            self.finished = True
+            self._percepts = []
+            return
+
+        if self.pace == "original" and self._started is not None:
+            due = self.recording.timestamp(next_index) - self._first_timestamp
+            if time.monotonic() - self._started < due:
+                return
+
+        timestamp, self._percepts = self.recording.tick(next_index)
+        self.cursor = next_index
+        if self._started is None:
+            self._started = time.monotonic()
+            self._first_timestamp = timestamp
+
+    def get_all_percepts(self) -> List[EnvironmentPercept]:
+        return list(self._percepts)
+
+    def sense(self, location: Location) -> Optional[EnvironmentPercept]:
+        for percept in self._percepts:
+            if percept.location == location:
+                return percept
+        return None
@@ -0,0 +1,238 @@
+"""
+Bulk Agent Account Provisioning
+
+Creates the XMPP accounts for a whole agent fleet from a manifest, instead of
+one hand-written `prosodyctl register` line per agent. Accounts that already
+exist on the server (according to `prosodyctl list`) are skipped, registrations
+run concurrently up to a job limit, and the resulting credentials are written
+in the agent_config.py format so the launcher and lab scripts can use them
+directly (`python launcher.py --config fleet_credentials.json ...`).
+
+Manifest format:
+
+    {
+        "xmpp_server": "localhost",
+        "groups": [
+            {"name": "coordinator_comm", "password": "lab4pass"},
+            {"prefix": "sensor_comm", "count": 1000},
+            {"prefix": "response_comm", "count": 250}
+        ]
+    }
+
+A group with "name" is a single account; a group with "prefix" and "count"
+expands to prefix_1 .. prefix_N, the names agent_config.py looks up for
+numbered agents of a role (AgentConfig.regional). Accounts without a fixed
+password get a generated one, and passwords already present in the
+credentials file are reused so that re-running the tool is idempotent.
+
+Usage:
+    python provision_agents.py fleet.json --method docker --jobs 8
+    python provision_agents.py fleet.json --batch-size 500   # one prosodyctl shell per 500 accounts
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import secrets
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from agent_config import numbered_name
+
+
+DEFAULT_CREDENTIALS_FILE = "fleet_credentials.json"
+
+PROSODYCTL_COMMANDS = {
+    "docker": ["docker", "exec", "-i", "prosody", "prosodyctl"],
+    "native": ["sudo", "prosodyctl"],
+    "local": ["prosodyctl"],
+}
+
+
+@dataclass
+class Account:
+    """One XMPP account to provision"""
+    localpart: str
+    password: str
+    generated: bool = False
+
+
+def expand_manifest(manifest: Dict, known_passwords: Dict[str, str]) -> List[Account]:
+    """Expand manifest groups into accounts, reusing known passwords"""
+    accounts = []
+    for group in manifest.get("groups", []):
+        if "name" in group:
+            names = [group["name"]]
+        else:
+            names = [numbered_name(group["prefix"], i) for i in range(1, group["count"] + 1)]
+
+        for name in names:
+            password = group.get("password") or known_passwords.get(name)
+            if password:
+                accounts.append(Account(name, password))
+            else:
+                accounts.append(Account(name, secrets.token_urlsafe(12), generated=True))
+    return accounts
+
+
+def load_known_passwords(credentials_path: Path) -> Dict[str, str]:
+    """Passwords from an earlier run's credentials file, keyed by localpart"""
+    if not credentials_path.exists():
+        return {}
+    with open(credentials_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        entry["jid"].split("@")[0]: entry["password"]
+        for entry in data.get("agents", {}).values()
+    }
+
+
+def write_credentials(path: Path, server: str, accounts: List[Account]):
+    """Write credentials in the agent_config.py format, readable by the owner only"""
+    data = {
+        "xmpp_server": server,
+        "agents": {
+            account.localpart: {"jid": f"{account.localpart}@{server}", "password": account.password}
+            for account in accounts
+        }
+    }
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def _lua_string(value: str) -> str:
+    """
+    A double-quoted Lua string literal for `value`. Quotes, backslashes and
+    control characters are escaped as \\ddd (json.dumps would give \\uXXXX,
+    which Lua does not read); other characters pass through as UTF-8.
+    """
+    return '"' + "".join(
+        f"\\{ord(char):03d}" if char in '"\\' or ord(char) < 32 or ord(char) == 127 else char
+        for char in value
+    ) + '"'
+
+
+class ProsodyProvisioner:
+    """
+    Runs prosodyctl directly (no intermediate shell) with bounded concurrency
+    """
+
+    def __init__(self, prosodyctl: List[str], server: str, jobs: int = 8):
+        self.prosodyctl = prosodyctl
+        self.server = server
+        self.semaphore = asyncio.Semaphore(jobs)
+
+    async def _run(self, *args: str, stdin: Optional[str] = None) -> Tuple[int, str]:
+        async with self.semaphore:
+            process = await asyncio.create_subprocess_exec(
+                *self.prosodyctl, *args,
+                stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT
+            )
+            output, _ = await process.communicate(stdin.encode() if stdin is not None else None)
+            return process.returncode, output.decode(errors="replace")
+
+    async def existing_accounts(self) -> Set[str]:
+        """Localparts already registered on the server"""
+        code, output = await self._run("list", self.server)
+        if code != 0:
+            raise RuntimeError(f"prosodyctl list failed: {output.strip()}")
+        return {line.strip().split("@")[0] for line in output.splitlines() if line.strip()}
+
+    async def register(self, account: Account) -> bool:
+        code, _ = await self._run("register", account.localpart, self.server, account.password)
+        return code == 0
+
+    async def register_batch(self, accounts: List[Account]) -> bool:
+        """
+        Create many accounts through a single `prosodyctl shell` session.
+        The shell exits 0 even when single user:create calls fail, so True
+        only means the session ran: check existing_accounts() afterwards.
+        """
+        script = "".join(
+            f"user:create({_lua_string(f'{account.localpart}@{self.server}')}, "
+            f"{_lua_string(account.password)})\n"
+            for account in accounts
+        )
+        code, _ = await self._run("shell", stdin=script)
+        return code == 0
+
+
+async def provision(accounts: List[Account], provisioner: ProsodyProvisioner,
+                    batch_size: int = 0, dry_run: bool = False) -> Dict[str, List[str]]:
+    """Register every account the server does not have yet"""
+    existing = await provisioner.existing_accounts()
+    missing = [account for account in accounts if account.localpart not in existing]
+    report = {
+        "existing": sorted(a.localpart for a in accounts if a.localpart in existing),
+        # Registered earlier, but neither the manifest nor the credentials file knows the password
+        "unknown_password": sorted(
+            a.localpart for a in accounts if a.localpart in existing and a.generated
+        ),
+        "created": [],
+        "failed": [],
+    }
+
+    if dry_run or not missing:
+        report["pending"] = [account.localpart for account in missing]
+        return report
+
+    if batch_size:
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        await asyncio.gather(*(provisioner.register_batch(batch) for batch in batches))
+        # Count only the accounts the server now lists, whatever the shell sessions reported
+        registered = await provisioner.existing_accounts()
+        for account in missing:
+            report["created" if account.localpart in registered else "failed"].append(account.localpart)
+    else:
+        results = await asyncio.gather(*(provisioner.register(account) for account in missing))
+        for account, ok in zip(missing, results):
+            report["created" if ok else "failed"].append(account.localpart)
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Provision XMPP accounts for an agent fleet")
+    parser.add_argument("manifest", help="Fleet manifest JSON")
+    parser.add_argument("--method", choices=sorted(PROSODYCTL_COMMANDS), default="docker")
+    parser.add_argument("--jobs", type=int, default=8, help="Maximum concurrent prosodyctl processes")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="Accounts per prosodyctl shell session (0 = one register call per account)")
+    parser.add_argument("--output", default=DEFAULT_CREDENTIALS_FILE, help="Credentials file to write")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be created")
+    args = parser.parse_args(argv)
+
+    with open(args.manifest, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    server = manifest.get("xmpp_server", "localhost")
+    output = Path(args.output)
+
+    accounts = expand_manifest(manifest, load_known_passwords(output))
+    provisioner = ProsodyProvisioner(PROSODYCTL_COMMANDS[args.method], server, args.jobs)
+    report = asyncio.run(provision(accounts, provisioner, args.batch_size, args.dry_run))
+
+    print(f"Accounts in manifest: {len(accounts)}")
+    print(f"  Already registered: {len(report['existing'])}")
+    if args.dry_run:
+        print(f"  Would create: {len(report.get('pending', []))}")
+        return
+    print(f"  Created: {len(report['created'])}")
+    print(f"  Failed: {len(report['failed'])}")
+    for localpart in report["failed"][:20]:
+        print(f"    ✗ {localpart}@{server}")
+    if report["unknown_password"]:
+        print(f"  Registered with unknown password (left out of credentials): "
+              f"{len(report['unknown_password'])}")
+
+    excluded = set(report["failed"]) | set(report["unknown_password"])
+    write_credentials(output, server, [a for a in accounts if a.localpart not in excluded])
+    print(f"Credentials written to {output}")
+
+
+if __name__ == "__main__":
+    main()
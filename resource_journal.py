@@ -0,0 +1,208 @@
+"""
+Write-Ahead Log for Coordinator Resource State
+
+CoordinatorAgent keeps `available_resources` and `allocated_resources` in
+memory, so a restart used to forget every allocation and hand out the initial
+pool again. A `ResourceJournal` makes that state durable without putting disk
+I/O on the request path:
+
+    record()   appends the allocation (or release()) to an in-memory batch and returns
+    writer     a background thread writes each batch to wal.log and fsyncs it
+               once (group commit), at most every `flush_interval` seconds
+    snapshot   every `snapshot_every` records the writer stores the compacted
+               state in snapshot.json (write, fsync, rename) and truncates
+               the WAL
+    recover()  loads the snapshot and replays the WAL records after it
+
+Every record carries a sequence number and the snapshot stores the last one
+it includes, so a crash between writing the snapshot and truncating the WAL
+only replays records that are then skipped. A torn last line (the process
+died mid-write) is ignored. An AGREE sent less than `flush_interval` before a
+crash can be lost; sync() waits for everything recorded so far to be on disk.
+
+Files in the journal directory (JSON, one WAL record per line):
+
+    snapshot.json   {"seq": N, "available": {...}, "allocated": {event_id: {...}}}
+    wal.log         {"seq": n, "event_id": "...", "resources": {...}}
+                    {"seq": n, "event_id": "...", "released": true}
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+SNAPSHOT_FILE = "snapshot.json"
+WAL_FILE = "wal.log"
+
+
+def _fsync_directory(directory: Path):
+    """Make a rename in `directory` durable (not possible on Windows)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ResourceJournal:
+    """
+    Durable allocation log for one coordinator: recover() once, then record()
+    each new allocation and close() on shutdown
+    """
+
+    def __init__(self, directory: str, flush_interval: float = 0.05, snapshot_every: int = 1000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+
+        # The writer's own copy of the state, so snapshots never read the agent's dicts mid-update
+        self.available: Dict[str, int] = {}
+        self.allocated: Dict[str, Dict[str, int]] = {}
+        self.seq = 0
+        self.snapshot_seq = 0
+        self.stats = {"records": 0, "commits": 0, "snapshots": 0, "replayed": 0}
+
+        self._pending: List[Dict] = []
+        self._written_seq = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._written = threading.Condition(self._lock)
+        self._closed = False
+        self._wal = None
+        self._writer: Optional[threading.Thread] = None
+
+    def recover(self, initial: Dict[str, int]) -> Tuple[Dict[str, int], Dict[str, Dict[str, int]]]:
+        """
+        (available, allocated) as of the last durable record, starting from
+        `initial` when the journal is empty. Starts the background writer.
+        """
+        snapshot_path = self.directory / SNAPSHOT_FILE
+        if snapshot_path.exists():
+            snapshot = json.loads(snapshot_path.read_text())
+            self.available = snapshot["available"]
+            self.allocated = snapshot["allocated"]
+            self.seq = self.snapshot_seq = snapshot["seq"]
+        else:
+            self.available = dict(initial)
+            self.allocated = {}
+
+        wal_path = self.directory / WAL_FILE
+        valid_bytes = 0
+        if wal_path.exists():
+            with open(wal_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    valid_bytes += len(line)
+                    if record["seq"] > self.seq:
+                        self._apply(record)
+                        self.seq = record["seq"]
+                        self.stats["replayed"] += 1
+
+        # Drop a torn tail so new records start on a line of their own
+        self._wal = open(wal_path, "ab")
+        self._wal.truncate(valid_bytes)
+        self._written_seq = self.seq
+
+        self._writer = threading.Thread(target=self._run, name=f"journal-{self.directory.name}", daemon=True)
+        self._writer.start()
+        return dict(self.available), {event_id: dict(r) for event_id, r in self.allocated.items()}
+
+    def _apply(self, record: Dict):
+        if record.get("released"):
+            for resource, amount in self.allocated.pop(record["event_id"], {}).items():
+                self.available[resource] = self.available.get(resource, 0) + amount
+            return
+        for resource, amount in record["resources"].items():
+            self.available[resource] = self.available.get(resource, 0) - amount
+        self.allocated[record["event_id"]] = record["resources"]
+
+    def record(self, event_id: str, resources: Dict[str, int]):
+        """Log a new allocation; returns at once, the writer makes it durable"""
+        self._append({"event_id": event_id, "resources": dict(resources)})
+
+    def release(self, event_id: str):
+        """Log that an event's allocation went back to the pool"""
+        self._append({"event_id": event_id, "released": True})
+
+    def _append(self, record: Dict):
+        with self._lock:
+            self.seq += 1
+            record["seq"] = self.seq
+            self._pending.append(record)
+            self.stats["records"] += 1
+            self._wake.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._wake.wait()
+                if not self._pending and self._closed:
+                    return
+            if not self._closed and self.flush_interval:
+                # Let the batch grow for one flush interval: one fsync covers it all
+                time.sleep(self.flush_interval)
+            with self._lock:
+                batch, self._pending = self._pending, []
+            self._commit(batch)
+
+    def _commit(self, batch: List[Dict]):
+        self._wal.write(b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in batch))
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+        for record in batch:
+            self._apply(record)
+        self.stats["commits"] += 1
+
+        last = batch[-1]["seq"]
+        if last - self.snapshot_seq >= self.snapshot_every:
+            self._snapshot(last)
+        with self._lock:
+            self._written_seq = last
+            self._written.notify_all()
+
+    def _snapshot(self, seq: int):
+        snapshot_path = self.directory / SNAPSHOT_FILE
+        temporary = snapshot_path.with_name(SNAPSHOT_FILE + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump({"seq": seq, "available": self.available, "allocated": self.allocated}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, snapshot_path)
+        _fsync_directory(self.directory)
+
+        self._wal.truncate(0)
+        self.snapshot_seq = seq
+        self.stats["snapshots"] += 1
+
+    def sync(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything recorded so far is on disk; False on timeout"""
+        with self._lock:
+            target = self.seq
+            return self._written.wait_for(lambda: self._written_seq >= target, timeout)
+
+    def close(self):
+        """Flush what is pending and stop the writer"""
+        if self._writer is None:
+            return
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._writer.join()
+        self._writer = None
+        self._wal.close()
@@ -0,0 +1,412 @@
+"""
+Response FSM Core
+
+The Lab 3 MONITORING -> ASSESSING -> DISPATCHING -> RECOVERY machine as
+plain Python, with no SPADE or asyncio involved, so it can run headless in
+tests, benchmarks and offline simulations:
+
+    TRANSITIONS       (state, trigger) -> (next state, reason). A next state of
+                      None hands control back to the cycle controller; a
+                      reason of None is a transition that is not logged.
+    ResponseContext   everything the states share, as __slots__ attributes
+    actions           one function per state, action(context) -> Trigger
+
+ResponseMachine compiles the table into tuples indexed by state and
+trigger, so a transition costs one action call and two index lookups. Any
+state's action can be replaced:
+
+    machine = ResponseMachine()
+    context = ResponseContext(batch_size=4, active_event_ids=lambda: active)
+    context.events = events
+    machine.run_cycle(context)
+
+The Lab 3 SPADE agent drives the same machine, one state per SPADE State
+run (see lab_3_goal_event_fsm_agent_spade.py).
+"""
+
+from dataclasses import dataclass
+from enum import Enum, IntEnum
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from environment import DisasterEvent, Severity
+
+
+class ResponseState(Enum):
+    """Finite states for the disaster response agent"""
+    MONITORING = "MONITORING"
+    ASSESSING = "ASSESSING"
+    DISPATCHING = "DISPATCHING"
+    RECOVERY = "RECOVERY"
+
+
+class Trigger(IntEnum):
+    """Outcome of a state's action; selects the transition taken"""
+    IDLE = 0             # nothing to do
+    EVENTS = 1           # disaster-related events arrived
+    BACKLOG = 2          # batch mode: disasters pending or in recovery
+    COMPLETE = 3         # the state's work is done
+    PASS_COMPLETE = 4    # batch mode: one recovery pass over every dispatched disaster
+    UNDER_CONTROL = 5    # the prioritized disaster is stabilizing
+    CONTAINING = 6       # the prioritized disaster still needs containment
+
+
+TRANSITIONS: Dict[Tuple[ResponseState, Trigger], Tuple[Optional[ResponseState], Optional[str]]] = {
+    (ResponseState.MONITORING, Trigger.EVENTS): (ResponseState.ASSESSING, "Disaster-related event detected"),
+    (ResponseState.MONITORING, Trigger.BACKLOG): (ResponseState.ASSESSING, "Disasters pending or in recovery"),
+    (ResponseState.MONITORING, Trigger.IDLE): (None, None),
+    (ResponseState.ASSESSING, Trigger.COMPLETE): (ResponseState.DISPATCHING, "Assessment complete"),
+    (ResponseState.DISPATCHING, Trigger.COMPLETE): (ResponseState.RECOVERY, "Initial dispatch actions completed"),
+    (ResponseState.RECOVERY, Trigger.PASS_COMPLETE): (ResponseState.MONITORING, "Recovery pass complete"),
+    (ResponseState.RECOVERY, Trigger.UNDER_CONTROL): (ResponseState.MONITORING, "Disaster impact under control"),
+    (ResponseState.RECOVERY, Trigger.CONTAINING): (ResponseState.MONITORING, "Return to monitor after recovery cycle"),
+    (ResponseState.RECOVERY, Trigger.IDLE): (ResponseState.MONITORING, None),
+}
+
+
+@dataclass
+class AgentGoals:
+    """Data class to represent the goals of the agent"""
+    rescue_people: str = "Minimize casualties through rapid rescue operations"
+    stabilize_infrastructure: str = "Stabilize critical infrastructure to prevent further damage"
+    optimize_resources: str = "Optimize resource allocation for maximum efficiency"
+
+
+@dataclass
+class DisasterRecovery:
+    """Recovery progress of one dispatched disaster (batch mode)"""
+    disaster: DisasterEvent
+    dispatched_cycle: int
+    recovery_passes: int = 0
+    status: str = "DISPATCHED"          # DISPATCHED -> CONTAINING -> STABILIZED / RESOLVED
+
+
+def _no_active_events() -> Set[str]:
+    return set()
+
+
+class ResponseContext:
+    """
+    State shared by the FSM states.
+
+    log(message) receives trace lines and on_transition(old, new, reason)
+    receives logged transitions; both may be None (headless runs). An action
+    can set `detail` to have it appended to the reason of its transition.
+    """
+
+    __slots__ = (
+        "batch_size", "cycle", "goals", "events", "priority_disaster",
+        "pending_disasters", "dispatch_batch", "recovering", "dispatched_event_ids",
+        "last_pass_cycle", "dispatched", "handled", "resolved_before_dispatch",
+        "active_event_ids", "log", "on_transition", "detail", "depots",
+    )
+
+    def __init__(self, batch_size: int = 1, goals: Optional[AgentGoals] = None,
+                 active_event_ids: Callable[[], Set[str]] = _no_active_events,
+                 log: Optional[Callable[[str], None]] = None,
+                 on_transition: Optional[Callable[[ResponseState, ResponseState, str], None]] = None,
+                 depots=None):
+        """
+        active_event_ids: returns the ids of the disasters still active in the environment
+        depots: optional depots.DepotNetwork; dispatches then draw rescue teams
+        and medical kits from the nearest stocked depots, and they go back
+        once recovery of the disaster ends
+        """
+        self.batch_size = batch_size
+        self.cycle = 0
+        self.goals = goals or AgentGoals()
+        self.events: List[Dict] = []
+        self.priority_disaster: Optional[DisasterEvent] = None
+        # Batch mode
+        self.pending_disasters: Dict[str, DisasterEvent] = {}    # awaiting dispatch
+        self.dispatch_batch: List[DisasterEvent] = []
+        self.recovering: Dict[str, DisasterRecovery] = {}
+        # Dispatched in batch mode (recovering or closed) and still active:
+        # repeat events for them are not queued again
+        self.dispatched_event_ids: Set[str] = set()
+        self.last_pass_cycle = 0
+        self.dispatched = 0
+        self.handled = 0
+        self.resolved_before_dispatch = 0
+        self.active_event_ids = active_event_ids
+        self.log = log
+        self.on_transition = on_transition
+        self.detail: Optional[str] = None
+        self.depots = depots
+
+
+def rank_key(disaster: DisasterEvent):
+    """Lab 3 priority order: severity, then casualties, then infrastructure damage"""
+    return (disaster.severity.value, disaster.casualties, disaster.infrastructure_damage)
+
+
+def prioritize_disaster(events: List[Dict]) -> Optional[DisasterEvent]:
+    """Determine which disaster event to prioritize"""
+    disasters = [event["disaster"] for event in events if "disaster" in event]
+    if not disasters:
+        return None
+    return max(disasters, key=rank_key)
+
+
+# --- Default actions (the Lab 3 behaviour) ---
+
+def monitor(context: ResponseContext) -> Trigger:
+    """MONITORING - continuous surveillance of all zones"""
+    if context.log is not None:
+        context.log("Action: Continue periodic monitoring")
+    if context.events:
+        return Trigger.EVENTS
+    # In batch mode, queued and recovering disasters also get one pass per cycle
+    if (context.batch_size > 1 and (context.pending_disasters or context.recovering)
+            and context.last_pass_cycle != context.cycle):
+        return Trigger.BACKLOG
+    return Trigger.IDLE
+
+
+def assess(context: ResponseContext) -> Trigger:
+    """ASSESSING - evaluating disaster severity and impact"""
+    events = context.events
+    # Events are handled by this pass; MONITORING should not see them again
+    context.events = []
+
+    if context.batch_size > 1:
+        context.last_pass_cycle = context.cycle
+        batch = _assess_batch(context, events)
+        if context.on_transition is not None:
+            context.detail = f"{len(batch)} selected, {len(context.pending_disasters)} queued"
+        return Trigger.COMPLETE
+
+    priority_disaster = prioritize_disaster(events)
+    if priority_disaster:
+        if context.log is not None:
+            context.log(
+                f"Assessment: Prioritize {priority_disaster.disaster_type.value} at "
+                f"{priority_disaster.location.name} (Severity {priority_disaster.severity.name})"
+            )
+        context.priority_disaster = priority_disaster
+    return Trigger.COMPLETE
+
+
+def dispatch(context: ResponseContext) -> Trigger:
+    """DISPATCHING - allocating resources and coordinating response"""
+    priority_disaster = context.priority_disaster
+    if context.batch_size > 1:
+        _dispatch_batch(context)
+    elif priority_disaster:
+        _send_resources(context, priority_disaster, "")
+        if context.log is not None:
+            context.log(f"Goal Alignment: {context.goals.rescue_people}")
+            context.log(f"Goal Alignment: {context.goals.optimize_resources}")
+    return Trigger.COMPLETE
+
+
+def send_resources(context: ResponseContext, disaster: DisasterEvent) -> str:
+    """
+    The rescue teams and medical kits a disaster needs, shipped from the
+    nearest stocked depots when the context has a depot network; returns
+    what was sent, for the trace
+    """
+    teams = disaster.resources_needed.get("rescue_teams", 0)
+    medical = disaster.resources_needed.get("medical_kits", 0)
+    if context.depots is None:
+        return f"{teams} rescue teams and {medical} medical kits"
+    shipments = context.depots.dispatch(disaster.location, {"rescue_teams": teams, "medical_kits": medical},
+                                        disaster.event_id)
+    if shipments:
+        return ", ".join(str(shipment) for shipment in shipments)
+    if disaster.event_id in context.depots.shipped:
+        return "nothing more (already sent)"
+    return "nothing (depots empty)"
+
+
+def return_resources(context: ResponseContext, event_id: str):
+    """Recovery of a disaster is over: its shipments go back to their depots"""
+    if context.depots is None:
+        return
+    shipments = context.depots.return_shipments(event_id)
+    if shipments and context.log is not None:
+        context.log(f"Recovery: Returned {', '.join(str(s) for s in shipments)} [{event_id}]")
+
+
+def _return_resolved(context: ResponseContext):
+    """Return the shipments of every disaster that is no longer active"""
+    if context.depots is None or not context.depots.shipped:
+        return
+    active = context.active_event_ids()
+    for event_id in [event_id for event_id in context.depots.shipped if event_id not in active]:
+        return_resources(context, event_id)
+
+
+def _send_resources(context: ResponseContext, disaster: DisasterEvent, suffix: str):
+    sent = send_resources(context, disaster)
+    if context.log is not None:
+        context.log(f"Dispatch: Send {sent} to {disaster.location.name}{suffix}")
+
+
+def recover(context: ResponseContext) -> Trigger:
+    """RECOVERY - stabilization and infrastructure restoration"""
+    priority_disaster = context.priority_disaster
+    context.priority_disaster = None
+
+    if context.batch_size > 1:
+        completed = _recover_batch(context)
+        if context.on_transition is not None:
+            context.detail = f"{completed} closed, {len(context.recovering)} still recovering"
+        return Trigger.PASS_COMPLETE
+    # One disaster at a time: a priority left containing is only known to be
+    # over once it resolves, so shipments go back when their disaster does
+    _return_resolved(context)
+    if not priority_disaster:
+        return Trigger.IDLE
+    if priority_disaster.severity.value <= Severity.MODERATE.value:
+        if context.log is not None:
+            context.log("Recovery: Situation is stabilizing; downgrade response level")
+        return_resources(context, priority_disaster.event_id)
+        return Trigger.UNDER_CONTROL
+    if context.log is not None:
+        context.log("Recovery: Continue containment and infrastructure stabilization")
+        context.log(f"Goal Alignment: {context.goals.stabilize_infrastructure}")
+    return Trigger.CONTAINING
+
+
+DEFAULT_ACTIONS: Dict[ResponseState, Callable[[ResponseContext], Trigger]] = {
+    ResponseState.MONITORING: monitor,
+    ResponseState.ASSESSING: assess,
+    ResponseState.DISPATCHING: dispatch,
+    ResponseState.RECOVERY: recover,
+}
+
+
+# --- Batch mode ---
+
+def _assess_batch(context: ResponseContext, events: List[Dict]) -> List[DisasterEvent]:
+    """Queue newly reported disasters, rank the queue and pick the top batch_size"""
+    pending = context.pending_disasters
+    dispatched = context.dispatched_event_ids
+    for event in events:
+        disaster = event.get("disaster")
+        if disaster is not None and disaster.event_id not in dispatched:
+            pending.setdefault(disaster.event_id, disaster)
+
+    active = context.active_event_ids()
+    # Resolved disasters raise no more events; forgetting them keeps the set bounded
+    dispatched &= active
+    for event_id in [event_id for event_id in pending if event_id not in active]:
+        del pending[event_id]
+        context.resolved_before_dispatch += 1
+
+    ranked = sorted(pending.values(), key=rank_key, reverse=True)
+    batch = ranked[:context.batch_size]
+    for disaster in batch:
+        del pending[disaster.event_id]
+        if context.log is not None:
+            context.log(
+                f"Assessment: Rank {disaster.disaster_type.value} at {disaster.location.name} "
+                f"(Severity {disaster.severity.name}, {disaster.casualties} casualties)"
+            )
+    context.dispatch_batch = batch
+    return batch
+
+
+def _dispatch_batch(context: ResponseContext):
+    """Issue one dispatch plan per selected disaster"""
+    for disaster in context.dispatch_batch:
+        _send_resources(context, disaster, f" [{disaster.event_id}]")
+        context.recovering[disaster.event_id] = DisasterRecovery(disaster, context.cycle)
+        context.dispatched_event_ids.add(disaster.event_id)
+    context.dispatched += len(context.dispatch_batch)
+    if context.dispatch_batch and context.log is not None:
+        context.log(f"Goal Alignment: {context.goals.rescue_people}")
+        context.log(f"Goal Alignment: {context.goals.optimize_resources}")
+    context.dispatch_batch = []
+
+
+def _recover_batch(context: ResponseContext) -> int:
+    """Advance recovery of every dispatched disaster; returns how many closed"""
+    recovering = context.recovering
+    active = context.active_event_ids()
+    closed = []
+    for event_id, recovery in recovering.items():
+        recovery.recovery_passes += 1
+        if event_id not in active:
+            recovery.status = "RESOLVED"
+        elif recovery.disaster.severity.value <= Severity.MODERATE.value:
+            recovery.status = "STABILIZED"
+        else:
+            recovery.status = "CONTAINING"
+            continue
+        closed.append(event_id)
+        if context.log is not None:
+            context.log(
+                f"Recovery: {recovery.disaster.disaster_type.value} at {recovery.disaster.location.name} "
+                f"[{event_id}] {recovery.status} after {recovery.recovery_passes} pass(es)"
+            )
+    for event_id in closed:
+        del recovering[event_id]
+        return_resources(context, event_id)
+    context.handled += len(closed)
+    if recovering and context.log is not None:
+        context.log(f"Recovery: Continue containment at {len(recovering)} site(s)")
+        context.log(f"Goal Alignment: {context.goals.stabilize_infrastructure}")
+    return len(closed)
+
+
+class ResponseMachine:
+    """
+    Table-driven FSM over ResponseState with pluggable per-state actions
+    """
+
+    def __init__(self, actions: Optional[Dict[ResponseState, Callable[[ResponseContext], Trigger]]] = None,
+                 transitions=TRANSITIONS, initial: ResponseState = ResponseState.MONITORING):
+        """actions: replacements for some or all of DEFAULT_ACTIONS"""
+        actions = {**DEFAULT_ACTIONS, **(actions or {})}
+        self.states = tuple(ResponseState)
+        self.index = {state: i for i, state in enumerate(self.states)}
+
+        # _table[state][trigger] -> (next state index, or -1 to end the cycle; reason)
+        table = [[None] * len(Trigger) for _ in self.states]
+        for (state, trigger), (destination, reason) in transitions.items():
+            table[self.index[state]][trigger] = (
+                -1 if destination is None else self.index[destination], reason
+            )
+        self._table = tuple(tuple(row) for row in table)
+        self._actions = tuple(actions[state] for state in self.states)
+        self.initial = self.index[initial]
+        self.state = self.initial
+        self.transitions = 0
+
+    @property
+    def current(self) -> ResponseState:
+        return self.states[self.state]
+
+    def step(self, context: ResponseContext) -> Optional[ResponseState]:
+        """
+        Run the current state's action and take the transition it triggers.
+        Returns the new state, or None when the cycle is over (the machine is
+        then back in its initial state).
+        """
+        state = self.state
+        trigger = self._actions[state](context)
+        entry = self._table[state][trigger]
+        if entry is None:
+            raise ValueError(f"No transition from {self.states[state].name} on {Trigger(trigger).name}")
+        destination, reason = entry
+        self.transitions += 1
+        if reason is not None:
+            if context.on_transition is not None:
+                if context.detail is not None:
+                    reason = f"{reason} ({context.detail})"
+                context.on_transition(self.states[state],
+                                      self.states[destination if destination >= 0 else self.initial], reason)
+            context.detail = None
+        if destination < 0:
+            self.state = self.initial
+            return None
+        self.state = destination
+        return self.states[destination]
+
+    def run_cycle(self, context: ResponseContext) -> int:
+        """Step until the cycle is over; returns the number of transitions"""
+        steps = 1
+        while self.step(context) is not None:
+            steps += 1
+        return steps
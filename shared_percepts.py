@@ -0,0 +1,345 @@
+"""
+Shared-Memory Percept Publishing
+
+When the environment and the agents run in separate processes, handing each
+agent its percepts through a pipe or a socket means pickling or JSON-encoding
+every tick once per consumer. `SharedPerceptPublisher` instead writes each
+tick's condition arrays and active-disaster records into one
+multiprocessing.shared_memory segment that any number of reader processes
+attach to. Nothing is serialized per consumer: readers decode fixed-layout
+records straight from the shared buffer, or look at the condition array in
+place through a memoryview.
+
+Segment layout (little endian):
+
+    header      magic, version, active buffer, closed flag, location count,
+                disaster capacity, string table size
+    locations   latitude, longitude, name offset/length   (one fixed record each)
+    strings     UTF-8 location names
+    buffer 0/1  seq, tick, timestamp, disaster count, truncated count
+                conditions  n x (temperature ... water_level, smoke) float64
+                disasters   capacity x environment_snapshot.DISASTER_RECORD
+
+Double buffer with a seqlock per buffer: the publisher fills the buffer that
+is not active, bracketing the writes by making its sequence number odd and
+then even again, and only then flips the active index. A reader takes the
+active buffer, decodes it and checks the sequence number is unchanged; it
+only has to retry if the publisher went round both buffers while it was
+reading (a reader more than a whole tick behind). Loads and stores on
+shared memory are not fenced from Python, so this relies on the
+store ordering of x86 and of CPython's single-threaded writes.
+"""
+
+import struct
+import time
+from array import array
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from environment import DisasterEnvironment, DisasterEvent, EnvironmentPercept, Location
+from environment_snapshot import CONDITION_KEYS, DISASTER_RECORD, pack_disaster, unpack_disaster
+
+
+MAGIC = b"DSHM"
+VERSION = 1
+DEFAULT_NAME = "dcit403_percepts"
+
+# Condition columns per location: CONDITION_KEYS, then the smoke flag as 0.0/1.0
+CONDITION_COLUMNS = len(CONDITION_KEYS) + 1
+
+_HEADER = struct.Struct("<4sHHIIII")
+_ACTIVE = struct.Struct("<H")
+_ACTIVE_OFFSET = 6
+_CLOSED_OFFSET = 8
+_LOCATION = struct.Struct("<ddII")
+_BUFFER = struct.Struct("<QQdII")
+_SEQ = struct.Struct("<Q")
+# Location index of a packed DISASTER_RECORD, after its event id and type
+_RECORD_LOCATION = struct.Struct("<I")
+_RECORD_LOCATION_OFFSET = 17
+
+
+# Segments published by this process (their resource tracker entry belongs to the publisher)
+_PUBLISHED = set()
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class _Layout:
+    """Offsets of every region for a given location count and disaster capacity"""
+
+    def __init__(self, n_locations: int, capacity: int, names_size: int):
+        self.n_locations = n_locations
+        self.capacity = capacity
+        self.locations = _HEADER.size
+        self.strings = self.locations + n_locations * _LOCATION.size
+        conditions_size = n_locations * CONDITION_COLUMNS * 8
+        disasters_size = capacity * DISASTER_RECORD.size
+        self.buffer_size = _align(_BUFFER.size) + conditions_size + _align(disasters_size)
+        first = _align(self.strings + names_size)
+        self.buffers = (first, first + self.buffer_size)
+        self.total = first + 2 * self.buffer_size
+
+    def conditions(self, buffer: int) -> int:
+        return self.buffers[buffer] + _align(_BUFFER.size)
+
+    def disasters(self, buffer: int) -> int:
+        return self.conditions(buffer) + self.n_locations * CONDITION_COLUMNS * 8
+
+
+class SharedPerceptPublisher:
+    """
+    Environment-side writer: publish() after every update_environment()
+    """
+
+    def __init__(self, environment: DisasterEnvironment, name: str = DEFAULT_NAME, capacity: int = 4096):
+        """capacity: most active disasters one tick can carry (the rest are counted as truncated)"""
+        self.environment = environment
+        self.tick = 0
+        locations = environment.locations
+        self._location_index = {id(location): i for i, location in enumerate(locations)}
+
+        names = bytearray()
+        location_records = []
+        for location in locations:
+            encoded = (location.name or "").encode("utf-8")
+            location_records.append(_LOCATION.pack(location.latitude, location.longitude, len(names), len(encoded)))
+            names += encoded
+
+        self.layout = _Layout(len(locations), capacity, len(names))
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=self.layout.total)
+        _PUBLISHED.add(self.shm.name)
+        buf = self.shm.buf
+        _HEADER.pack_into(buf, 0, MAGIC, VERSION, 0, 0, len(locations), capacity, len(names))
+        buf[self.layout.locations:self.layout.strings] = b"".join(location_records)
+        buf[self.layout.strings:self.layout.strings + len(names)] = names
+        self._conditions = array("d", bytes(len(locations) * CONDITION_COLUMNS * 8))
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def publish(self):
+        """Write the environment's current tick into the inactive buffer and make it active"""
+        environment = self.environment
+        layout = self.layout
+        buf = self.shm.buf
+        active = _ACTIVE.unpack_from(buf, _ACTIVE_OFFSET)[0]
+        target = 1 - active
+        start = layout.buffers[target]
+        seq = _SEQ.unpack_from(buf, start)[0]
+        _SEQ.pack_into(buf, start, seq + 1)
+
+        conditions = self._conditions
+        column = 0
+        for location in environment.locations:
+            cond = environment.current_conditions[location.name]
+            for key in CONDITION_KEYS:
+                conditions[column] = cond[key]
+                column += 1
+            conditions[column] = 1.0 if cond["smoke_detected"] else 0.0
+            column += 1
+        offset = layout.conditions(target)
+        buf[offset:offset + len(conditions) * 8] = memoryview(conditions).cast("B")
+
+        disasters = environment.active_disasters
+        count = min(len(disasters), layout.capacity)
+        offset = layout.disasters(target)
+        for disaster in disasters[:count]:
+            index = self._location_index.get(id(disaster.location))
+            if index is None:
+                index = environment.locations.index(disaster.location)
+            buf[offset:offset + DISASTER_RECORD.size] = pack_disaster(disaster, index)
+            offset += DISASTER_RECORD.size
+
+        self.tick += 1
+        _BUFFER.pack_into(buf, start, seq + 1, self.tick, time.time(), count, len(disasters) - count)
+        _SEQ.pack_into(buf, start, seq + 2)
+        _ACTIVE.pack_into(buf, _ACTIVE_OFFSET, target)
+
+    def close(self, unlink: bool = True):
+        """Tell readers no more ticks are coming, then release the segment"""
+        self.shm.buf[_CLOSED_OFFSET] = 1
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+        _PUBLISHED.discard(self.shm.name)
+
+
+class SharedTickView:
+    """
+    Zero-copy view of one published tick. `conditions[i, c]` is condition
+    column c of location i. The view is only meaningful while valid() is true.
+    """
+
+    def __init__(self, reader: "SharedPerceptReader", buffer: int, seq: int, tick: int,
+                 timestamp: float, disaster_count: int, truncated: int):
+        layout = reader.layout
+        self._reader = reader
+        self._buffer = buffer
+        self.seq = seq
+        self.tick = tick
+        self.timestamp = timestamp
+        self.disaster_count = disaster_count
+        self.truncated = truncated
+        offset = layout.conditions(buffer)
+        self.conditions = reader.shm.buf[offset:offset + layout.n_locations * CONDITION_COLUMNS * 8].cast(
+            "d", shape=[layout.n_locations, CONDITION_COLUMNS])
+        offset = layout.disasters(buffer)
+        self.disasters = reader.shm.buf[offset:offset + disaster_count * DISASTER_RECORD.size]
+
+    def valid(self) -> bool:
+        """False once the publisher has started overwriting this buffer"""
+        return self._reader._seq(self._buffer) == self.seq
+
+    def release(self):
+        """Drop the memoryviews (the segment cannot be closed while any exist)"""
+        self.conditions.release()
+        self.disasters.release()
+
+
+class SharedPerceptReader:
+    """
+    Agent-side reader attached to a publisher's segment
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13: stop the resource tracker unlinking the publisher's segment when we exit
+            self.shm = shared_memory.SharedMemory(name=name)
+            if self.shm.name not in _PUBLISHED:
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+        buf = self.shm.buf
+        magic, version, _, _, n_locations, capacity, names_size = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{name} is not a version {VERSION} percept segment")
+        self.layout = _Layout(n_locations, capacity, names_size)
+
+        self.locations: List[Location] = []
+        for i in range(n_locations):
+            latitude, longitude, name_offset, name_length = _LOCATION.unpack_from(
+                buf, self.layout.locations + i * _LOCATION.size)
+            start = self.layout.strings + name_offset
+            self.locations.append(Location(latitude, longitude, bytes(buf[start:start + name_length]).decode("utf-8")))
+        self._disasters: Dict[bytes, DisasterEvent] = {}
+        self.retries = 0
+
+    @property
+    def closed(self) -> bool:
+        return self.shm.buf[_CLOSED_OFFSET] == 1
+
+    def _seq(self, buffer: int) -> int:
+        return _SEQ.unpack_from(self.shm.buf, self.layout.buffers[buffer])[0]
+
+    def _active(self) -> Tuple[int, Tuple]:
+        """The active buffer and its header, waiting out a write in progress"""
+        buf = self.shm.buf
+        while True:
+            buffer = _ACTIVE.unpack_from(buf, _ACTIVE_OFFSET)[0]
+            header = _BUFFER.unpack_from(buf, self.layout.buffers[buffer])
+            if not header[0] & 1:
+                return buffer, header
+            self.retries += 1
+
+    def view(self) -> SharedTickView:
+        """The latest tick, in place"""
+        buffer, header = self._active()
+        return SharedTickView(self, buffer, *header)
+
+    def read(self) -> Tuple[int, List[EnvironmentPercept]]:
+        """
+        A consistent copy of the latest tick as (tick, percepts), like
+        get_all_percepts(). Tick 0 (no percepts) means nothing is published yet.
+        """
+        while True:
+            buffer, (seq, tick, timestamp, count, _) = self._active()
+            percepts = self._decode(buffer, timestamp, count)
+            if self._seq(buffer) == seq:
+                return tick, percepts
+            self.retries += 1
+
+    def _decode(self, buffer: int, timestamp: float, count: int) -> List[EnvironmentPercept]:
+        buf = self.shm.buf
+        layout = self.layout
+        by_location: Dict[int, List[DisasterEvent]] = {}
+        known = self._disasters
+        current = {}
+        offset = layout.disasters(buffer)
+        for _ in range(count):
+            record = bytes(buf[offset:offset + DISASTER_RECORD.size])
+            offset += DISASTER_RECORD.size
+            # A disaster whose record has not changed keeps its DisasterEvent object
+            disaster = known.get(record)
+            if disaster is None:
+                disaster = unpack_disaster(DISASTER_RECORD.unpack(record), self.locations)
+            current[record] = disaster
+            location_index = _RECORD_LOCATION.unpack_from(record, _RECORD_LOCATION_OFFSET)[0]
+            by_location.setdefault(location_index, []).append(disaster)
+        self._disasters = current
+
+        when = datetime.fromtimestamp(timestamp)
+        values = struct.unpack_from(f"<{layout.n_locations * CONDITION_COLUMNS}d", buf, layout.conditions(buffer))
+        percepts = []
+        for i, location in enumerate(self.locations):
+            row = values[i * CONDITION_COLUMNS:(i + 1) * CONDITION_COLUMNS]
+            percepts.append(EnvironmentPercept(when, location, *row[:-1], bool(row[-1]),
+                                               tuple(by_location.get(i, ()))))
+        return percepts
+
+    def close(self):
+        self.shm.close()
+
+
+class SharedEnvironment:
+    """
+    Drop-in replacement for DisasterEnvironment in an agent process, fed by a
+    SharedPerceptPublisher in the environment process. update_environment()
+    takes the latest published tick; ticks published in between are skipped,
+    and if none has been published since, the agent sees the same tick again.
+    `finished` becomes True once the publisher closes.
+    """
+
+    def __init__(self, reader: SharedPerceptReader):
+        self.reader = reader
+        self.tick = 0
+        self.finished = False
+        self.skipped = 0
+        self._percepts: List[EnvironmentPercept] = []
+
+    @property
+    def locations(self) -> List[Location]:
+        return self.reader.locations
+
+    @property
+    def active_disasters(self) -> List[DisasterEvent]:
+        seen = {}
+        for percept in self._percepts:
+            for disaster in percept.active_disasters:
+                seen.setdefault(disaster.event_id, disaster)
+        return list(seen.values())
+
+    def update_environment(self):
+        if self.reader.closed:
+            self.finished = True
+            self._percepts = []
+            return
+        tick, percepts = self.reader.read()
+        if tick != self.tick:
+            if self.tick:
+                self.skipped += max(0, tick - self.tick - 1)
+            self.tick = tick
+            self._percepts = percepts
+
+    def get_all_percepts(self) -> List[EnvironmentPercept]:
+        return list(self._percepts)
+
+    def sense(self, location: Location) -> Optional[EnvironmentPercept]:
+        for percept in self._percepts:
+            if percept.location == location:
+                return percept
+        return None
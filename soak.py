@@ -0,0 +1,256 @@
+"""
+Long-Run Memory Soak
+
+The lab runs last 8 cycles or 30 seconds, so nothing checks that a long run
+stays within a memory budget. This harness drives the environment and the
+Lab 3 and Lab 4 agent logic headlessly for as many simulated ticks as asked:
+no XMPP server, no event loop, the agents' own state and helpers fed
+directly. It takes tracemalloc snapshots at intervals and reports growth by
+allocation site. The drivers build the agents of the SPADE 3 lab scripts
+(never started), so SPADE 3 must be installed; run_soak checks that first.
+
+The baseline snapshot is taken after a warm-up so that caches and bounded
+buffers (trace buffers, closed-conversation memory, severity caches) are
+already full; whatever still grows afterwards is a leak. The warm-up runs
+on, one interval at a time, until every driver's trace buffers are full,
+since a buffer still filling reads as growth. Steady-state growth
+is the least-squares slope of traced memory over the samples, and the run
+fails when it exceeds the budget in bytes per tick:
+
+    python launcher.py soak --ticks 2000000 --budget 1.0
+"""
+
+import random
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from console import SILENT, console
+from environment import DisasterEnvironment, EnvironmentPercept
+from flow_control import CreditGranter
+
+
+@dataclass
+class SoakConfig:
+    """
+    ticks: simulated environment ticks in total
+    warmup: ticks before the baseline snapshot at least (extended until the
+            trace buffers are full)
+    interval: ticks between samples after the warm-up
+    budget_bytes_per_tick: steady-state growth allowed
+    top: allocation sites to report
+    frames: traceback depth recorded per allocation (more is slower)
+    """
+    ticks: int = 1_000_000
+    warmup: int = 300_000
+    interval: int = 100_000
+    budget_bytes_per_tick: float = 1.0
+    top: int = 10
+    frames: int = 1
+    seed: int = 403
+
+
+@dataclass
+class SoakSample:
+    """Traced memory at one point of the run"""
+    tick: int
+    traced_bytes: int
+    growth_bytes: int                # since the baseline
+
+
+@dataclass
+class SiteGrowth:
+    """Growth attributed to one allocation site between the baseline and the end"""
+    site: str
+    size_diff: int
+    count_diff: int
+
+
+@dataclass
+class SoakReport:
+    config: SoakConfig
+    drivers: List[str]
+    samples: List[SoakSample] = field(default_factory=list)
+    growth: List[SiteGrowth] = field(default_factory=list)
+    bytes_per_tick: float = 0.0
+
+    @property
+    def passed(self) -> bool:
+        return self.bytes_per_tick <= self.config.budget_bytes_per_tick
+
+
+def check_spade():
+    """Raise RuntimeError unless SPADE 3, which the drivers' lab agents are written for, is installed"""
+    try:
+        import spade
+    except ImportError:
+        raise RuntimeError("the soak drives the SPADE lab agents: install SPADE 3 (pip install 'spade<4')") from None
+    version = getattr(spade, "__version__", "")
+    if version.split(".")[0] != "3":
+        raise RuntimeError(f"the soak drives the SPADE 3 lab agents, found SPADE {version or 'of unknown version'}")
+
+
+class Lab3Driver:
+    """The Lab 3 controller and response FSM cycle, on an agent that is never started"""
+
+    def __init__(self, environment: DisasterEnvironment):
+        from lab_3_goal_event_fsm_agent_spade import GoalReactiveResponseAgent
+        self.agent = GoalReactiveResponseAgent("soak_response@localhost", "soak", environment)
+        # Bounded buffers that must be full before the baseline
+        self.buffers = [self.agent.agent_data["trace"], self.agent.agent_data["transition_history"]]
+
+    def step(self, percepts: List[EnvironmentPercept]):
+        agent = self.agent
+        agent.current_cycle += 1
+        agent.context.cycle = agent.current_cycle
+        agent._log_trace(f"--- CYCLE {agent.current_cycle} ---")
+        events = agent._derive_events(percepts)
+        agent.context.events = events
+        for event in events:
+            agent._log_trace(f"EVENT {event['type']} @ {event['location']} | {event['details']}")
+        agent.machine.run_cycle(agent.context)
+
+
+class Lab4Driver:
+    """
+    The Lab 4 alert, request and allocation flow over the state of a sensor,
+    response and coordinator agent that are never started. Messages are
+    replaced by direct calls to the agents' own handlers; every REQUEST is
+    answered at once and every resolve releases the event's allocation.
+    """
+
+    def __init__(self, environment: DisasterEnvironment):
+        import lab_4_fipa_acl_communication_spade as lab4
+        self.sensor = lab4.SensorCommunicatorAgent(lab4.SENSOR_JID, lab4.SENSOR_PASSWORD, environment,
+                                                   publish_on_change=True)
+        self.response = lab4.ResponseAgent(lab4.RESPONSE_JID, lab4.RESPONSE_PASSWORD)
+        self.coordinator = lab4.CoordinatorAgent(lab4.COORDINATOR_JID, lab4.COORDINATOR_PASSWORD)
+        self.granter = self.response.flow_granters.setdefault(lab4.SENSOR_JID, CreditGranter())
+        self.buffers = [self.sensor.trace, self.response.trace, self.coordinator.trace]
+
+    def step(self, percepts: List[EnvironmentPercept]):
+        sensor = self.sensor
+        for content in sensor.publisher.diff(percepts):
+            evicted = sensor.flow.offer(content["event_id"], content)
+            if evicted:
+                sensor.publisher.forget(evicted["event_id"])
+        for content in sensor.flow.drain():
+            conversation_id = sensor._generate_conversation_id()
+            sensor._log_trace(f"SEND INFORM | Conv:{conversation_id} | {content['event_id']}")
+            self._inform(conversation_id, content)
+            credit = self.granter.on_processed(0)
+            if credit:
+                sensor.flow.grant(credit)
+
+    def _inform(self, conversation_id: str, content: Dict):
+        response = self.response
+        event_id = content["event_id"]
+        response._log_trace(f"RECV INFORM | Conv:{conversation_id} | {content.get('notice', 'new')} {event_id}")
+        action = response.ledger.apply(content)
+        if action == "request":
+            response.active_disasters[event_id] = content
+            response.conversations.start(conversation_id, content, event_id)
+            for performative in self._allocate(conversation_id, content):
+                response.conversations.on_reply(conversation_id, performative)
+        elif action == "escalate":
+            response.active_disasters[event_id] = content
+        elif action == "resolve":
+            response.active_disasters.pop(event_id, None)
+            response.conversations.cancel_event(event_id)
+            released = self.coordinator.release(event_id)
+            self.coordinator._log_trace(f"RECV RELEASE | {event_id} | {released}")
+
+    def _allocate(self, conversation_id: str, content: Dict) -> Sequence[str]:
+        coordinator = self.coordinator
+        granted, resources, _ = coordinator.allocate(content["event_id"], content["resources_needed"])
+        if granted:
+            coordinator._log_trace(f"SEND AGREE | Conv:{conversation_id} | Resources: {resources}")
+            return ("agree", "confirm")
+        coordinator._log_trace(f"SEND REFUSE | Conv:{conversation_id}")
+        return ("refuse",)
+
+
+DRIVERS: Dict[str, Callable[[DisasterEnvironment], object]] = {
+    "lab3": Lab3Driver,
+    "lab4": Lab4Driver,
+}
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _slope(samples: List[SoakSample]) -> float:
+    """Least-squares growth in bytes per tick"""
+    if len(samples) < 2:
+        return 0.0
+    mean_tick = sum(s.tick for s in samples) / len(samples)
+    mean_bytes = sum(s.traced_bytes for s in samples) / len(samples)
+    covariance = sum((s.tick - mean_tick) * (s.traced_bytes - mean_bytes) for s in samples)
+    variance = sum((s.tick - mean_tick) ** 2 for s in samples)
+    return covariance / variance
+
+
+def run_soak(config: SoakConfig, drivers: Sequence[str] = ("lab3", "lab4"),
+             on_sample: Optional[Callable[[SoakSample], None]] = None) -> SoakReport:
+    """
+    Run the soak. on_sample is called after each sample (for progress
+    output); the agents' own console output is discarded while ticking.
+    Raises RuntimeError without SPADE 3, and ValueError when the trace
+    buffers are not full before the last interval.
+    """
+    if config.warmup >= config.ticks:
+        raise ValueError("warmup must be shorter than the run")
+    check_spade()
+    random.seed(config.seed)
+    environment = DisasterEnvironment()
+    active = [DRIVERS[name](environment) for name in drivers]
+    report = SoakReport(config, list(drivers))
+
+    def advance(ticks: int):
+        with console.at_level(SILENT):
+            for _ in range(ticks):
+                environment.update_environment()
+                percepts = environment.get_all_percepts()
+                for driver in active:
+                    driver.step(percepts)
+
+    def unfilled() -> int:
+        return sum(buffer.maxlen - len(buffer) for driver in active for buffer in driver.buffers)
+
+    tracemalloc.start(config.frames)
+    try:
+        advance(config.warmup)
+        tick = config.warmup
+        while unfilled() and tick + config.interval < config.ticks:
+            advance(config.interval)
+            tick += config.interval
+        if unfilled():
+            raise ValueError(f"trace buffers still {unfilled()} entries short of full after {tick} ticks; "
+                             "run more ticks")
+        baseline = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        report.samples.append(SoakSample(tick, baseline_bytes, 0))
+
+        while tick < config.ticks:
+            step = min(config.interval, config.ticks - tick)
+            advance(step)
+            tick += step
+            traced = tracemalloc.get_traced_memory()[0]
+            sample = SoakSample(tick, traced, traced - baseline_bytes)
+            report.samples.append(sample)
+            if on_sample is not None:
+                on_sample(sample)
+
+        final = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+    finally:
+        tracemalloc.stop()
+
+    for stat in final.compare_to(baseline, "lineno")[:config.top]:
+        frame = stat.traceback[0]
+        report.growth.append(SiteGrowth(f"{frame.filename}:{frame.lineno}", stat.size_diff, stat.count_diff))
+    report.bytes_per_tick = _slope(report.samples)
+    return report
@@ -0,0 +1,325 @@
+"""
+Spatial Disaster Propagation
+
+By default a disaster only affects the location it starts at. With a spread
+model attached, fires, floods and storms also push on nearby locations: heat
+and smoke drift downwind, water runs into the neighbouring lowlands and storm
+winds reach the next town, and with enough pressure a neighbour catches its
+own disaster of the same type.
+
+Neighbours come from a sparse graph precomputed once from the location
+latitudes/longitudes: every pair within `radius_km` (nearest `max_neighbours`
+per location), weighted by distance and stored in CSR form, row = source
+location. Each tick the active disasters of a type form a sparse intensity
+vector, and the pressure on every neighbour is that vector times the
+adjacency matrix, computed over the source rows only. Work per tick is
+therefore proportional to the active disasters and their degree, not to the
+number of locations.
+
+    environment = DisasterEnvironment(scenario=scenario)
+    environment.enable_spread(radius_km=15)
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from environment import DisasterType, Location, Severity
+
+
+EARTH_RADIUS_KM = 6371.0
+# Length of a degree of latitude on the sphere haversine_km measures on
+KM_PER_DEGREE = 2 * np.pi * EARTH_RADIUS_KM / 360
+
+# Disaster types that spread, and their condition change per unit of pressure at a neighbouring location
+PRESSURE_EFFECTS: Dict[DisasterType, Dict[str, float]] = {
+    DisasterType.FIRE: {"temperature": 2.0, "air_quality": 15.0},
+    DisasterType.FLOOD: {"water_level": 0.4, "humidity": 3.0},
+    DisasterType.STORM: {"wind_speed": 6.0, "humidity": 2.0},
+}
+
+# Same limits update_environment keeps conditions within
+CONDITION_LIMITS = {
+    "temperature": (20, 45),
+    "humidity": (30, 100),
+    "air_quality": (0, 500),
+    "wind_speed": (0, None),
+    "water_level": (0, None),
+}
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; works element-wise on arrays"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+@dataclass
+class Neighbourhood:
+    """Sparse distance-weighted adjacency in CSR form (row = source location)"""
+    indptr: np.ndarray      # (n + 1,) int64
+    indices: np.ndarray     # (nnz,) int32, target location of each edge
+    weights: np.ndarray     # (nnz,) float64, each row sums to 1
+    distances: np.ndarray   # (nnz,) float32, km
+
+    @property
+    def n_locations(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.indices)
+
+    def edges_from(self, sources: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Positions of all edges leaving `sources`, and which entry of `sources`
+        each one belongs to (the CSR rows gathered without a Python loop)
+        """
+        starts = self.indptr[sources]
+        counts = self.indptr[sources + 1] - starts
+        owner = np.repeat(np.arange(len(sources)), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return starts[owner] + within, owner
+
+
+def _ring_offsets(ring: int) -> List[Tuple[int, int]]:
+    """Cell offsets at Chebyshev distance `ring` (the centre cell for ring 0)"""
+    if ring == 0:
+        return [(0, 0)]
+    return [(d_lat, d_lon) for d_lat in range(-ring, ring + 1) for d_lon in range(-ring, ring + 1)
+            if max(abs(d_lat), abs(d_lon)) == ring]
+
+
+def _nearest_first(src, dst, distance, limit):
+    """Sort edges by source then distance, keeping the first `limit` per source"""
+    by_source = np.lexsort((distance, src))
+    src, dst, distance = src[by_source], dst[by_source], distance[by_source]
+    rank = np.arange(len(src)) - np.searchsorted(src, src, side="left")
+    keep = rank < limit
+    return src[keep], dst[keep], distance[keep]
+
+
+class _CellGrid:
+    """Points bucketed into square cells `cell_km` wide, sorted by cell key"""
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray, cell_km: float, margin: int):
+        # Degrees of longitude shrink towards the poles; size cells for the widest latitude
+        min_cos = max(np.cos(np.radians(np.abs(latitude).max())), 0.01)
+        self.cell_lat = np.floor(latitude / (cell_km / KM_PER_DEGREE)).astype(np.int64)
+        self.cell_lon = np.floor(longitude / (cell_km / (KM_PER_DEGREE * min_cos))).astype(np.int64)
+        self.cell_lon -= self.cell_lon.min() - margin
+        self.span = int(self.cell_lon.max()) + margin + 1
+        keys = self.cell_lat * self.span + self.cell_lon
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def occupancy(self) -> np.ndarray:
+        """Number of points sharing each point's cell"""
+        _, inverse, counts = np.unique(self.sorted_keys, return_inverse=True, return_counts=True)
+        result = np.empty(len(self.order), dtype=np.int64)
+        result[self.order] = counts[inverse]
+        return result
+
+    def pairs(self, sources: np.ndarray, d_lat: int, d_lon: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(source, point) for every point in the cell at the given offset from each source's"""
+        wanted = (self.cell_lat[sources] + d_lat) * self.span + (self.cell_lon[sources] + d_lon)
+        lo = np.searchsorted(self.sorted_keys, wanted, side="left")
+        counts = np.searchsorted(self.sorted_keys, wanted, side="right") - lo
+        owner = np.repeat(np.arange(len(sources)), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return sources[owner], self.order[lo[owner] + within]
+
+
+def _ring_search(latitude, longitude, grid: _CellGrid, cell_km: float, rings: int,
+                 sources: np.ndarray, radius_km: float, limit: int):
+    """
+    Nearest `limit` neighbours within radius_km of each source, searching
+    cell rings outwards. After ring r every point closer than r cells has been
+    seen, so a source stops once its limit-th nearest is inside that distance.
+    """
+    done_src, done_dst, done_dist = [], [], []
+    pending = sources
+    kept_src = np.empty(0, dtype=np.int64)
+    kept_dst = np.empty(0, dtype=np.int64)
+    kept_dist = np.empty(0)
+
+    for ring in range(rings + 1):
+        found = [grid.pairs(pending, d_lat, d_lon) for d_lat, d_lon in _ring_offsets(ring)]
+        src = np.concatenate([f[0] for f in found])
+        dst = np.concatenate([f[1] for f in found])
+        keep = src != dst
+        src, dst = src[keep], dst[keep]
+        distance = haversine_km(latitude[src], longitude[src], latitude[dst], longitude[dst])
+        keep = distance <= radius_km
+        kept_src, kept_dst, kept_dist = _nearest_first(
+            np.concatenate((kept_src, src[keep])), np.concatenate((kept_dst, dst[keep])),
+            np.concatenate((kept_dist, distance[keep])), limit
+        )
+        if ring == 0 or ring == rings:
+            continue
+
+        # kept_* is sorted by source then distance: the last edge of a group is its farthest
+        group_end = np.flatnonzero(np.append(kept_src[1:] != kept_src[:-1], True)) if len(kept_src) else kept_src
+        group_src = kept_src[group_end]
+        group_size = np.diff(np.append(-1, group_end))
+        complete = group_src[(group_size >= limit) & (kept_dist[group_end] <= ring * cell_km)]
+        if len(complete):
+            finished = np.isin(kept_src, complete)
+            done_src.append(kept_src[finished])
+            done_dst.append(kept_dst[finished])
+            done_dist.append(kept_dist[finished])
+            kept_src, kept_dst, kept_dist = kept_src[~finished], kept_dst[~finished], kept_dist[~finished]
+            pending = pending[~np.isin(pending, complete)]
+            if len(pending) == 0:
+                break
+
+    done_src.append(kept_src)
+    done_dst.append(kept_dst)
+    done_dist.append(kept_dist)
+    return np.concatenate(done_src), np.concatenate(done_dst), np.concatenate(done_dist)
+
+
+def build_neighbourhood(latitude: np.ndarray, longitude: np.ndarray, radius_km: float,
+                        max_neighbours: int = 8, chunk_size: int = 50_000) -> Neighbourhood:
+    """
+    Link every location to its nearest `max_neighbours` within `radius_km`.
+
+    Points are bucketed into grid cells and only compared with points in
+    nearby cells. A single cell size does not suit clustered geographies (a
+    city cell would hold thousands of candidates, a rural one none), so each
+    location is searched on a grid whose cells hold about max_neighbours
+    points around it: radius-sized cells in sparse areas, down to 1/64 of the
+    radius in dense ones.
+    """
+    latitude = np.asarray(latitude, dtype=np.float64)
+    longitude = np.asarray(longitude, dtype=np.float64)
+    n = len(latitude)
+    if n == 0:
+        return Neighbourhood(np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0),
+                             np.empty(0, dtype=np.float32))
+
+    # Level l uses cells radius / 2**l wide, a quarter of the area per level
+    occupancy = _CellGrid(latitude, longitude, radius_km, 1).occupancy()
+    level = np.clip(np.ceil(np.log(np.maximum(occupancy, 1) / max_neighbours) / np.log(4)), 0, 6).astype(int)
+
+    rows, cols, dists = [], [], []
+    for resolution in np.unique(level).tolist():
+        cells_per_radius = 2 ** resolution
+        cell_km = radius_km / cells_per_radius
+        grid = _CellGrid(latitude, longitude, cell_km, cells_per_radius + 1)
+        members = np.flatnonzero(level == resolution)
+        for start in range(0, len(members), chunk_size):
+            src, dst, distance = _ring_search(latitude, longitude, grid, cell_km, cells_per_radius + 1,
+                                              members[start:start + chunk_size], radius_km, max_neighbours)
+            rows.append(src)
+            cols.append(dst)
+            dists.append(distance)
+
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    dists = np.concatenate(dists)
+    by_source = np.lexsort((dists, rows))
+    rows, cols, dists = rows[by_source], cols[by_source], dists[by_source]
+
+    # Closer neighbours get more of the pressure; each source's weights sum to 1
+    kernel = np.exp(-dists / (radius_km / 2))
+    row_totals = np.bincount(rows, weights=kernel, minlength=n)
+    weights = kernel / np.where(row_totals > 0, row_totals, 1)[rows]
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return Neighbourhood(indptr, cols.astype(np.int32), weights, dists.astype(np.float32))
+
+
+@dataclass
+class SpreadStats:
+    """Propagation counters since the model was attached"""
+    ticks: int = 0
+    pressured_locations: int = 0
+    spread_disasters: Dict[str, int] = field(default_factory=dict)
+
+
+class SpreadModel:
+    """
+    Propagates active disasters over a precomputed neighbourhood graph
+    """
+
+    def __init__(self, locations: List[Location], radius_km: float = 15.0, max_neighbours: int = 8,
+                 spread_rate: float = 0.08, seed=None):
+        """
+        spread_rate: ignition hazard per unit of pressure per tick. Weights of
+        each source sum to 1, so a severity-s disaster ignites about
+        spread_rate * s neighbours per tick and the default stays subcritical.
+        """
+        self.locations = locations
+        self.index = {location.name: i for i, location in enumerate(locations)}
+        self.neighbourhood = build_neighbourhood(
+            np.fromiter((l.latitude for l in locations), dtype=np.float64, count=len(locations)),
+            np.fromiter((l.longitude for l in locations), dtype=np.float64, count=len(locations)),
+            radius_km, max_neighbours
+        )
+        self.spread_rate = spread_rate
+        # Seeded from `random` unless given, so random.seed() keeps runs repeatable
+        self.rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+        self.stats = SpreadStats()
+
+    def pressure(self, sources: np.ndarray, intensity: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sparse vector-matrix product: pressure on each location reached from
+        `sources`. Returns the reached location indices and their pressure.
+        """
+        edges, owner = self.neighbourhood.edges_from(sources)
+        if len(edges) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        targets, slot = np.unique(self.neighbourhood.indices[edges], return_inverse=True)
+        pressure = np.bincount(slot, weights=self.neighbourhood.weights[edges] * intensity[owner],
+                               minlength=len(targets))
+        return targets, pressure
+
+    def step(self, environment):
+        """Apply one tick of spread for every spreading disaster type"""
+        self.stats.ticks += 1
+        by_type: Dict[DisasterType, Dict[int, float]] = {}
+        for disaster in environment.active_disasters:
+            if disaster.disaster_type in PRESSURE_EFFECTS:
+                index = self.index.get(disaster.location.name)
+                if index is not None:
+                    per_location = by_type.setdefault(disaster.disaster_type, {})
+                    per_location[index] = per_location.get(index, 0.0) + disaster.severity.value
+
+        for disaster_type, per_location in by_type.items():
+            sources = np.fromiter(per_location.keys(), dtype=np.int64, count=len(per_location))
+            intensity = np.fromiter(per_location.values(), dtype=np.float64, count=len(per_location))
+            targets, pressure = self.pressure(sources, intensity)
+            if len(targets):
+                self._apply(environment, disaster_type, targets, pressure, sources)
+
+    def _apply(self, environment, disaster_type: DisasterType, targets: np.ndarray,
+               pressure: np.ndarray, sources: np.ndarray):
+        self.stats.pressured_locations += len(targets)
+
+        # Condition changes are computed as arrays, then written to the reached locations only
+        increments = {key: (pressure * per_unit).tolist() for key, per_unit in PRESSURE_EFFECTS[disaster_type].items()}
+        conditions = environment.current_conditions
+        names = [self.locations[i].name for i in targets.tolist()]
+        for position, name in enumerate(names):
+            cond = conditions[name]
+            for key, values in increments.items():
+                low, high = CONDITION_LIMITS[key]
+                value = cond[key] + values[position]
+                cond[key] = max(low, value) if high is None else max(low, min(high, value))
+            if disaster_type == DisasterType.FIRE:
+                cond["smoke_detected"] = True
+
+        # Ignition: a reached location without this disaster type catches it
+        # with probability 1 - exp(-spread_rate * pressure)
+        ignite = self.rng.random(len(targets)) < -np.expm1(-self.spread_rate * pressure)
+        ignite &= ~np.isin(targets, sources)
+        for index, level in zip(targets[ignite].tolist(), pressure[ignite].tolist()):
+            severity = Severity(int(min(5, max(1, round(level)))))
+            environment._spawn_disaster(self.locations[index], disaster_type, severity)
+            counts = self.stats.spread_disasters
+            counts[disaster_type.value] = counts.get(disaster_type.value, 0) + 1
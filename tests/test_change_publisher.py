@@ -0,0 +1,35 @@
+from change_publisher import NOTICE_ESCALATED, NOTICE_NEW, NOTICE_RESOLVED, AlertLedger
+
+
+def _notice(notice, event_id="EVT0001", severity="HIGH"):
+    return {"notice": notice, "event_id": event_id, "severity": severity}
+
+
+def test_ledger_ignores_repeated_new():
+    ledger = AlertLedger()
+    assert ledger.apply(_notice(NOTICE_NEW)) == "request"
+    assert ledger.apply(_notice(NOTICE_NEW)) == "ignore"
+    assert ledger.apply(_notice(NOTICE_ESCALATED, severity="CRITICAL")) == "escalate"
+    assert ledger.apply(_notice(NOTICE_RESOLVED)) == "resolve"
+
+
+def test_ledger_ignores_new_after_resolved():
+    ledger = AlertLedger()
+    assert ledger.apply(_notice(NOTICE_NEW)) == "request"
+    assert ledger.apply(_notice(NOTICE_RESOLVED)) == "resolve"
+    assert ledger.apply(_notice(NOTICE_NEW)) == "ignore"
+    assert ledger.apply(_notice(NOTICE_ESCALATED, severity="CRITICAL")) == "ignore"
+
+
+def test_ledger_ignores_new_overtaken_by_its_resolved():
+    ledger = AlertLedger()
+    assert ledger.apply(_notice(NOTICE_RESOLVED)) == "ignore"
+    assert ledger.apply(_notice(NOTICE_NEW)) == "ignore"
+
+
+def test_ledger_forgets_oldest_resolved():
+    ledger = AlertLedger(remember_resolved=2)
+    for event_id in ("A", "B", "C"):
+        ledger.apply(_notice(NOTICE_RESOLVED, event_id))
+    assert list(ledger.resolved) == ["B", "C"]
+    assert ledger.apply(_notice(NOTICE_NEW, "A")) == "request"
@@ -0,0 +1,29 @@
+from depots import Depot, DepotNetwork
+from environment import Location
+
+
+def _network(stock):
+    locations = [Location(5.60, -0.19, "Accra"), Location(6.69, -1.62, "Kumasi")]
+    depots = [Depot("depot_1", locations[0], dict(stock)), Depot("depot_2", locations[1], dict(stock))]
+    return DepotNetwork(depots, locations, cache_dir=None)
+
+
+def test_repeated_dispatch_for_an_event_deducts_stock_once():
+    network = _network({"rescue_teams": 10, "medical_kits": 20})
+    needs = {"rescue_teams": 4, "medical_kits": 5}
+    assert network.dispatch(Location(5.60, -0.19, "Accra"), needs, "EVT_1")
+    assert network.dispatch(Location(5.60, -0.19, "Accra"), needs, "EVT_1") == []
+    assert network.total_stock() == {"medical_kits": 35, "rescue_teams": 16}
+
+    network.return_shipments("EVT_1")
+    assert network.total_stock() == {"medical_kits": 40, "rescue_teams": 20}
+
+
+def test_repeated_dispatch_ships_only_the_shortfall():
+    network = _network({"rescue_teams": 2, "medical_kits": 0})
+    accra = Location(5.60, -0.19, "Accra")
+    network.dispatch(accra, {"rescue_teams": 6}, "EVT_1")
+    network.restock("depot_1", "rescue_teams", 5)
+    shipments = network.dispatch(accra, {"rescue_teams": 6}, "EVT_1")
+    assert sum(shipment.amount for shipment in shipments) == 2
+    assert sum(shipment.amount for shipment in network.shipped["EVT_1"]) == 6
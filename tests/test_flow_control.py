@@ -0,0 +1,31 @@
+from change_publisher import NOTICE_NEW, NOTICE_RESOLVED
+from flow_control import CreditGranter, CreditWindow
+
+
+def _keep_resolved(alert):
+    return alert.get("notice") == NOTICE_RESOLVED
+
+
+def test_window_evicts_oldest_unkept_alert():
+    window = CreditWindow(window=0, max_pending=2, keep=_keep_resolved)
+    window.offer("A", {"notice": NOTICE_RESOLVED, "event_id": "A"})
+    window.offer("B", {"notice": NOTICE_NEW, "event_id": "B"})
+    evicted = window.offer("C", {"notice": NOTICE_NEW, "event_id": "C"})
+    assert evicted["event_id"] == "B"
+    assert list(window.pending) == ["A", "C"]
+
+
+def test_window_never_evicts_resolved_notices():
+    window = CreditWindow(window=0, max_pending=2, keep=_keep_resolved)
+    for event_id in ("A", "B", "C"):
+        assert window.offer(event_id, {"notice": NOTICE_RESOLVED, "event_id": event_id}) is None
+    assert list(window.pending) == ["A", "B", "C"]
+    assert window.stats.dropped == 0
+
+
+def test_granter_releases_withheld_credit():
+    granter = CreditGranter(window=4)
+    assert [granter.on_processed(10) for _ in range(3)] == [0, 0, 0]
+    assert granter.release(10) == 0
+    assert granter.release(0) == 3
+    assert granter.release(0) == 0
@@ -0,0 +1,15 @@
+from agent_config import load_config
+from provision_agents import expand_manifest, write_credentials
+
+
+def test_provisioned_names_match_config_lookup(tmp_path):
+    manifest = {"groups": [{"prefix": "coordinator_comm", "count": 12}]}
+    accounts = expand_manifest(manifest, {})
+    credentials_path = tmp_path / "fleet_credentials.json"
+    write_credentials(credentials_path, "example.org", accounts)
+
+    config = load_config(str(credentials_path))
+    for index, account in enumerate(accounts, start=1):
+        credentials = config.regional("coordinator_comm", index)
+        assert credentials.jid == f"{account.localpart}@example.org"
+        assert credentials.password == account.password
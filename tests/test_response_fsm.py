@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from environment import DisasterEvent, DisasterType, Location, Severity
+from response_fsm import ResponseContext, ResponseMachine
+
+
+def _disaster(event_id, severity=Severity.MODERATE):
+    return DisasterEvent(
+        event_id=event_id, disaster_type=DisasterType.FLOOD, location=Location(0.0, 0.0, "Zone A"),
+        severity=severity, timestamp=datetime(2024, 1, 1), affected_area=1.0, casualties=3,
+        infrastructure_damage=10.0, resources_needed={"rescue_teams": 2, "medical_kits": 5},
+    )
+
+
+def test_batch_mode_dispatches_a_repeated_event_once():
+    active = {"D1"}
+    machine = ResponseMachine()
+    context = ResponseContext(batch_size=4, active_event_ids=lambda: active)
+    disaster = _disaster("D1")
+    for cycle in range(5):
+        # A stabilized disaster that is still active keeps raising events
+        context.cycle = cycle
+        context.events = [{"disaster": disaster}]
+        machine.run_cycle(context)
+    assert context.dispatched == 1
+    assert context.handled == 1
+    assert not context.pending_disasters
+
+
+def test_batch_mode_forgets_resolved_events():
+    active = {"D1"}
+    machine = ResponseMachine()
+    context = ResponseContext(batch_size=4, active_event_ids=lambda: active)
+    context.events = [{"disaster": _disaster("D1")}]
+    machine.run_cycle(context)
+    active.clear()
+    context.cycle = 1
+    context.events = [{"disaster": _disaster("D2")}]
+    machine.run_cycle(context)
+    assert context.dispatched_event_ids == set()
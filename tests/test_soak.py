@@ -0,0 +1,33 @@
+from collections import deque
+
+import pytest
+
+import soak
+from soak import SoakConfig, run_soak
+
+
+class BufferDriver:
+    """Appends one trace entry per tick to a bounded buffer"""
+
+    def __init__(self, environment):
+        self.buffers = [deque(maxlen=50)]
+
+    def step(self, percepts):
+        self.buffers[0].append("entry")
+
+
+@pytest.fixture
+def buffer_driver(monkeypatch):
+    monkeypatch.setattr(soak, "check_spade", lambda: None)
+    monkeypatch.setitem(soak.DRIVERS, "buffer", BufferDriver)
+
+
+def test_warmup_extends_until_buffers_are_full(buffer_driver):
+    report = run_soak(SoakConfig(ticks=100, warmup=10, interval=10), drivers=["buffer"])
+    assert report.samples[0].tick == 50
+    assert report.samples[-1].tick == 100
+
+
+def test_run_too_short_to_fill_buffers_is_rejected(buffer_driver):
+    with pytest.raises(ValueError):
+        run_soak(SoakConfig(ticks=40, warmup=10, interval=10), drivers=["buffer"])
@@ -0,0 +1,67 @@
+"""
+Execution Trace Analysis
+
+Offline summary of the trace logs written by Labs 3 and 4. Every trace entry
+has the form `[YYYY-MM-DD HH:MM:SS] agent | message`; entries are grouped by
+agent and by action (SEND/RECV performative, STATE transition or EVENT type)
+so a run can be compared with another without reading the whole log.
+"""
+
+import re
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+TRACE_LINE = re.compile(r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (\S+) \| (.*)$")
+
+
+def _action(message: str) -> str:
+    """Reduce a trace message to the action it records"""
+    words = message.split()
+    if not words:
+        return "OTHER"
+    if words[0] in ("SEND", "RECV", "RETRY", "UNMATCHED") and len(words) > 1:
+        return f"{words[0]} {words[1]}"
+    if words[0] == "ESCALATE":
+        return "ESCALATE"
+    if words[0] == "STATE" and len(words) > 3:
+        return f"STATE {words[1]} -> {words[3]}"
+    if words[0] == "EVENT" and len(words) > 1:
+        return f"EVENT {words[1]}"
+    return "OTHER"
+
+
+def analyze_lines(lines: Iterable[str]) -> Dict:
+    """Count trace entries per agent and per action"""
+    by_agent = Counter()
+    by_action = Counter()
+    first: Optional[datetime] = None
+    last: Optional[datetime] = None
+
+    for line in lines:
+        match = TRACE_LINE.match(line.strip())
+        if not match:
+            continue
+        timestamp = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S")
+        first = first or timestamp
+        last = timestamp
+        by_agent[match.group(2)] += 1
+        by_action[_action(match.group(3))] += 1
+
+    total = sum(by_agent.values())
+    duration = (last - first).total_seconds() if first and last else 0.0
+    return {
+        "entries": total,
+        "duration_seconds": duration,
+        "entries_per_second": total / duration if duration else 0.0,
+        "by_agent": dict(by_agent.most_common()),
+        "by_action": dict(by_action.most_common()),
+    }
+
+
+def analyze_file(path: str) -> Dict:
+    """Analyze a trace log file"""
+    with open(Path(path), "r", encoding="utf-8", errors="replace") as f:
+        return analyze_lines(f)
@@ -0,0 +1,147 @@
+"""
+Shared Disaster Work Queue
+
+Lets a pool of response workers (several FSMs in one agent, or several
+agents in one process) divide disasters between them. Event derivation
+pushes disasters in; each worker claims the most urgent unclaimed one and
+owns it until it completes or releases it. A disaster that is queued,
+owned or recently finished is never handed out again, so no disaster is
+handled twice even when several agents derive the same events.
+
+Urgency is the Lab 3 priority order: severity, then casualties, then
+infrastructure damage. The queue is a heap with lazy deletion, so push and
+claim are O(log n).
+"""
+
+import asyncio
+import heapq
+import itertools
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from environment import DisasterEvent
+
+
+@dataclass
+class WorkQueueStats:
+    """Counters since the queue was created"""
+    pushed: int = 0
+    duplicates: int = 0
+    claimed: int = 0
+    completed: int = 0
+    released: int = 0
+    dropped: int = 0                # no longer active when it reached the front
+    abandoned: int = 0              # still queued, or handed back, after close()
+    completed_by: Dict[str, int] = field(default_factory=dict)
+
+
+class DisasterWorkQueue:
+    """
+    Priority queue of disasters with per-disaster ownership
+    """
+
+    def __init__(self, remember_finished: int = 100_000):
+        """remember_finished: how many finished event ids to keep for duplicate detection"""
+        self._heap: List[Tuple[int, int, float, int, str]] = []
+        self._sequence = itertools.count()
+        self._queued: Dict[str, DisasterEvent] = {}
+        self.owners: Dict[str, str] = {}             # event_id -> worker id
+        self._owned: Dict[str, DisasterEvent] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._remember_finished = remember_finished
+        self._changed = asyncio.Event()
+        self.closed = False
+        self.stats = WorkQueueStats()
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    @property
+    def in_progress(self) -> int:
+        return len(self.owners)
+
+    def push(self, disaster: DisasterEvent) -> bool:
+        """Queue a disaster; False if it is already queued, owned or finished"""
+        event_id = disaster.event_id
+        if event_id in self._queued or event_id in self.owners or event_id in self._finished:
+            self.stats.duplicates += 1
+            return False
+        self._queued[event_id] = disaster
+        heapq.heappush(self._heap, (-disaster.severity.value, -disaster.casualties,
+                                    -disaster.infrastructure_damage, next(self._sequence), event_id))
+        self.stats.pushed += 1
+        self._changed.set()
+        return True
+
+    def try_claim(self, worker: str, is_active: Optional[Callable[[DisasterEvent], bool]] = None
+                  ) -> Optional[DisasterEvent]:
+        """
+        Take ownership of the most urgent queued disaster, or None if the queue
+        is empty. Disasters for which is_active() is False are dropped on the way.
+        """
+        while self._heap:
+            event_id = heapq.heappop(self._heap)[-1]
+            disaster = self._queued.pop(event_id, None)
+            if disaster is None:
+                continue   # stale heap entry
+            if is_active is not None and not is_active(disaster):
+                self.stats.dropped += 1
+                self._remember(event_id)
+                continue
+            self.owners[event_id] = worker
+            self._owned[event_id] = disaster
+            self.stats.claimed += 1
+            return disaster
+        return None
+
+    async def claim(self, worker: str, timeout: float = 1.0,
+                    is_active: Optional[Callable[[DisasterEvent], bool]] = None) -> Optional[DisasterEvent]:
+        """Like try_claim, but wait up to `timeout` seconds for work to arrive"""
+        disaster = self.try_claim(worker, is_active)
+        if disaster is not None or self.closed:
+            return disaster
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.try_claim(worker, is_active)
+
+    def complete(self, event_id: str, worker: str):
+        """Mark an owned disaster as handled"""
+        if self.owners.get(event_id) != worker:
+            raise ValueError(f"{worker} does not own {event_id}")
+        del self.owners[event_id]
+        del self._owned[event_id]
+        self._remember(event_id)
+        self.stats.completed += 1
+        self.stats.completed_by[worker] = self.stats.completed_by.get(worker, 0) + 1
+        self._changed.set()
+
+    def release(self, event_id: str, worker: str):
+        """Give an owned disaster back to the queue for another worker"""
+        if self.owners.get(event_id) != worker:
+            raise ValueError(f"{worker} does not own {event_id}")
+        del self.owners[event_id]
+        disaster = self._owned.pop(event_id)
+        self.stats.released += 1
+        self.push(disaster)
+        self.stats.pushed -= 1
+        if self.closed:
+            self.stats.abandoned += 1
+
+    def close(self):
+        """
+        No more work will be pushed; waiting claims return at once. Workers
+        stop rather than drain, so what is still queued counts as abandoned.
+        """
+        if not self.closed:
+            self.stats.abandoned += len(self._queued)
+        self.closed = True
+        self._changed.set()
+
+    def _remember(self, event_id: str):
+        self._finished[event_id] = None
+        if len(self._finished) > self._remember_finished:
+            self._finished.popitem(last=False)